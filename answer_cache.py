@@ -0,0 +1,253 @@
+"""
+Semantic answer cache for TimeTraveler AI.
+Visitors ask the same narrator the same questions all day ("Who built this?",
+"How old is it?"). Early in a conversation, a question close enough to one
+already answered for the same (persona, landmark) is served from the cache
+instead of a model call.
+
+- Questions are normalized and embedded on the CPU with a small
+  sentence-transformers model (EMBEDDING_MODEL), loaded in the background at
+  startup; until it is ready every question goes to the model. Without the
+  sentence-transformers package the cache is off: lexical similarity can't
+  tell "Who built the temple?" from "Who destroyed the temple?".
+- A hit needs cosine similarity >= ANSWER_CACHE_THRESHOLD.
+- Only conversations with at most ANSWER_CACHE_MAX_HISTORY messages use it;
+  later questions lean on the conversation and always go to the model.
+- Each question keeps up to ANSWER_VARIANTS answers. Until it has them all,
+  askers get fresh answers; afterwards the variants are served in rotation.
+  Entries expire after ANSWER_CACHE_TTL seconds.
+
+Per (persona, landmark), an index of question vectors is stored under one key
+and each question's answers under their own key, so a hit only reads.
+"""
+
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from config import get_setting, get_bool_setting
+from models import ChatHistory, Landmark, Persona
+from shared_cache import get_cache, cache_key
+from tracing import traced, current_span
+from utils import generate_persona_response, fading_reply
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MAX_HISTORY = 3         # greeting + one exchange
+DEFAULT_VARIANTS = 3
+DEFAULT_TTL_SECONDS = 24 * 3600
+# Questions kept per (persona, landmark), most recent first
+MAX_QUESTIONS = 200
+# Shorter questions ("why?", "and then?") depend on the conversation
+MIN_QUESTION_WORDS = 2
+# Rotation counters are per process; dropped wholesale past this many
+MAX_ROTATION_COUNTERS = 10000
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+# Politeness and filler that doesn't change what is being asked
+_FILLER = re.compile(
+    r"^(?:(?:please|so|ok|okay|hey|hi|and|um|well)\s+)*"
+    r"(?:(?:can|could|would|will) you (?:please )?(?:tell me|explain|share)\s+)?"
+)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, punctuation-free question without leading filler."""
+    text = _PUNCTUATION.sub(" ", (question or "").lower().replace("'", ""))
+    text = _SPACES.sub(" ", text).strip()
+    return _FILLER.sub("", text).strip() or text
+
+
+def similarity(a: List[float], b: List[float]) -> float:
+    """Cosine similarity of two unit vectors."""
+    return sum(x * y for x, y in zip(a, b))
+
+
+class Embedder(ABC):
+    """Turns a normalized question into a unit vector."""
+
+    name = "base"
+
+    @abstractmethod
+    def embed(self, text: str) -> List[float]:
+        ...
+
+
+class MiniLMEmbedder(Embedder):
+    """A small sentence-transformers model (CPU); needs the sentence-transformers package."""
+
+    def __init__(self):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = get_setting("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        self.model = SentenceTransformer(self.model_name, device="cpu")
+        self.name = f"minilm:{self.model_name}"
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self.model.encode(text, normalize_embeddings=True)
+        return [float(v) for v in vector]
+
+
+_embedder: Optional[Embedder] = None
+_embedder_started = False
+_embedder_lock = threading.Lock()
+
+
+def _load_embedder():
+    global _embedder
+    try:
+        _embedder = MiniLMEmbedder()
+        print(f"[INFO] Answer cache embedding model loaded: {_embedder.model_name}")
+    except ImportError:
+        print("[WARNING] sentence-transformers not installed, answer cache disabled")
+    except Exception as e:
+        print(f"[WARNING] Could not load embedding model, answer cache disabled: {e}")
+
+
+def warm_embedder():
+    """Start loading the embedding model on a background thread (once per process)."""
+    global _embedder_started
+    if not get_bool_setting("ANSWER_CACHE", True):
+        return
+    with _embedder_lock:
+        if _embedder_started:
+            return
+        _embedder_started = True
+    threading.Thread(target=_load_embedder, daemon=True).start()
+
+
+def get_embedder() -> Optional[Embedder]:
+    """The embedding model; None (cache off) while it loads or if it can't be loaded."""
+    warm_embedder()
+    return _embedder
+
+
+def answer_cache_enabled(history: ChatHistory) -> bool:
+    max_history = int(get_setting("ANSWER_CACHE_MAX_HISTORY", DEFAULT_MAX_HISTORY))
+    return (
+        get_bool_setting("ANSWER_CACHE", True)
+        and len(history) <= max_history
+        and get_embedder() is not None
+    )
+
+
+def _index_key(persona: Persona, landmark_info: Landmark, embedder: Embedder) -> str:
+    return cache_key(
+        "index", embedder.name, persona.name, persona.title,
+        (landmark_info or Landmark()).get("landmark_name", "")
+    )
+
+
+def _answers_key(index_key: str, entry: Dict) -> str:
+    # The creation time keeps a re-added question from reviving expired answers
+    return cache_key("answers", index_key, entry["question"], entry["created"])
+
+
+def _live_entries(entries: List[Dict]) -> List[Dict]:
+    ttl = float(get_setting("ANSWER_CACHE_TTL", DEFAULT_TTL_SECONDS))
+    cutoff = time.time() - ttl
+    return [e for e in entries if e["created"] >= cutoff]
+
+
+def _closest(entries: List[Dict], vector: List[float]):
+    best, best_score = None, -1.0
+    for entry in entries:
+        score = similarity(entry["vector"], vector)
+        if score > best_score:
+            best, best_score = entry, score
+    return best, best_score
+
+
+def _prepare(question: str, history: ChatHistory):
+    """(embedder, normalized question), or None when the cache doesn't apply."""
+    normalized = normalize_question(question)
+    if len(normalized.split()) < MIN_QUESTION_WORDS or not answer_cache_enabled(history):
+        return None
+    return get_embedder(), normalized
+
+
+_served: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+@traced()
+def lookup_answer(question: str, history: ChatHistory, persona: Persona, landmark_info: Landmark) -> Optional[str]:
+    """A cached answer to a question like this one, or None to ask the model."""
+    prepared = _prepare(question, history)
+    if prepared is None:
+        current_span().set(skipped=True)
+        return None
+
+    embedder, normalized = prepared
+    threshold = float(get_setting("ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+    variants = int(get_setting("ANSWER_VARIANTS", DEFAULT_VARIANTS))
+    cache = get_cache("answers")
+    index_key = _index_key(persona, landmark_info, embedder)
+
+    entry, score = _closest(_live_entries(cache.get(index_key) or []), embedder.embed(normalized))
+    answers = cache.get(_answers_key(index_key, entry)) if entry and score >= threshold else None
+    hit = bool(answers) and len(answers) >= variants
+    current_span().set(cache_hit=hit, similarity=round(score, 3))
+    if not hit:
+        return None
+
+    # Rotate through the variants so repeat askers don't hear the same words
+    key = _answers_key(index_key, entry)
+    with _lock:
+        if len(_served) > MAX_ROTATION_COUNTERS:
+            _served.clear()
+        served = _served[key] = _served.get(key, -1) + 1
+    return answers[served % len(answers)]
+
+
+def remember_answer(question: str, answer: str, history: ChatHistory, persona: Persona, landmark_info: Landmark):
+    """Keep a fresh model answer as a variant of the closest cached question (or a new one)."""
+    if not answer:
+        return
+    try:
+        prepared = _prepare(question, history)
+        if prepared is None:
+            return
+
+        embedder, normalized = prepared
+        threshold = float(get_setting("ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+        variants = int(get_setting("ANSWER_VARIANTS", DEFAULT_VARIANTS))
+        cache = get_cache("answers")
+        index_key = _index_key(persona, landmark_info, embedder)
+        vector = embedder.embed(normalized)
+
+        # Concurrent writers (other threads or worker processes) may drop each
+        # other's additions; that only costs a later model call.
+        with _lock:
+            entries = _live_entries(cache.get(index_key) or [])
+            entry, score = _closest(entries, vector)
+            if entry is None or score < threshold:
+                entry = {"question": normalized, "vector": vector, "created": time.time()}
+                cache.set(index_key, ([entry] + entries)[:MAX_QUESTIONS])
+
+            key = _answers_key(index_key, entry)
+            answers = cache.get(key) or []
+            if answer not in answers and len(answers) < variants:
+                cache.set(key, answers + [answer])
+    except Exception as e:
+        print(f"[WARNING] Could not cache answer: {e}")
+
+
+def cached_persona_response(question: str, history: ChatHistory, model, persona: Persona,
+                            landmark_info: Landmark) -> str:
+    """generate_persona_response behind the answer cache; failed calls are never cached."""
+    answer = lookup_answer(question, history, persona, landmark_info)
+    if answer is not None:
+        return answer
+    try:
+        answer = generate_persona_response(
+            None, None, question, history, model, persona, landmark_info, raise_errors=True
+        )
+    except Exception as e:
+        return fading_reply(persona.get("name", "Guide"), e)
+    remember_answer(question, answer, history, persona, landmark_info)
+    return answer
@@ -7,21 +7,33 @@ KEY FEATURE:   Dynamic persona generation - the AI identifies the most relevant
 historical figure for ANY monument uploaded.  
 """
 
+from typing import Optional
+
 import streamlit as st
-from PIL import Image
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 from utils import (
-    configure_gemini, get_gemini_model, analyze_image,
+    get_gemini_model, analyze_image,
     generate_dynamic_persona, generate_related_personas,
-    generate_full_persona_from_brief, generate_persona_response,
-    generate_greeting, get_suggested_questions, DEFAULT_MODEL
+    generate_full_persona_from_brief,
+    generate_greeting, get_suggested_questions, generate_suggested_questions,
+    answer_suggested_question, DEFAULT_MODEL
 )
 from voice_engine import (
-    generate_persona_speech, get_audio_player_html,
+    generate_persona_speech, stream_persona_speech,
     get_voice_settings_for_dynamic_persona
 )
-from image_fetcher import fetch_landmark_images, init_image_cache, get_fallback_images
-from immersive_view import render_immersive_view
+from audio_profiles import AUDIO_PROFILES, choose_audio_profile
+from image_fetcher import fetch_landmark_images, get_fallback_images
+from batch_identify import identify_batch
+from metrics import record_session
+from chat_view import render_chat_history, render_message, render_latest_reply, LIVE_MESSAGES
+from journey_store import get_journey_store, journey_fields, save_turns
+from answer_cache import cached_persona_response, remember_answer, warm_embedder
+from jobs import submit_job, get_job, promote_job, job_id_for, DONE, FAILED
+from config import get_setting
+from models import ChatHistory, ChatTurn, Landmark, Persona
+from templates import compile_template, render
 
 # Page config
 st.set_page_config(
@@ -129,13 +141,29 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Markup with model-generated fields (escaped, see templates.py)
+LANDMARK_BADGE_TEMPLATE = compile_template(
+    "landmark_badge", '<div class="landmark-badge">📍 {{ landmark_name }}</div>'
+)
+PERSONA_CARD_TEMPLATE = compile_template("persona_card", """
+        <div class="persona-card">
+            <div class="persona-avatar">{{ avatar }}</div>
+            <div class="persona-name">{{ name }}</div>
+            <div class="persona-title">{{ title }}</div>
+            <div class="persona-era">Era: {{ era }} • {{ region }}</div>
+            <div class="persona-title" style="margin-top: 10px; font-style: italic;">"{{ relationship }}"</div>
+        </div>
+        """)
+
 
 # Session State
 def init_session_state():
     defaults = {
-        "chat_history": [],
+        "chat_history": ChatHistory(),
         "api_configured": False,
         "audio_enabled": True,
+        # Audio delivery profile (see audio_profiles); picked from client hints on first run
+        "audio_profile": None,
         "immersive_mode": False,
         "model": None,
         "greeted": False,
@@ -145,13 +173,483 @@ def init_session_state():
         "landmark_info": None,
         "landmark_images": [],
         "voice_settings": None,
+        # Batch identification results (multi-photo uploads)
+        "batch": None,
+        # Persistent journey (see journey_store), mirrored in the ?journey= URL param
+        "journey_id": None,
+        # Background jobs in flight (see jobs); reruns pick them up again
+        "pending_reply": None,
+        "pending_summon": None,
+        # Contextual suggestions for the narrator: {"job": id, "questions": list or None}
+        "suggestions": None,
     }
     for key, val in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = val
 
 init_session_state()
-init_image_cache()
+
+if st.session_state.audio_profile is None:
+    try:
+        st.session_state.audio_profile = choose_audio_profile(st.context.headers)
+    except Exception as e:
+        print(f"[WARNING] Could not read client hints: {e}")
+        st.session_state.audio_profile = choose_audio_profile({})
+
+
+def rehydrate_journey():
+    """Restore a saved journey after a reconnect instead of regenerating it."""
+    journey_id = st.query_params.get("journey")
+    if not journey_id or journey_id == st.session_state.journey_id:
+        return
+    try:
+        data = get_journey_store().load(journey_id)
+    except Exception as e:
+        print(f"[ERROR] Could not load journey {journey_id}: {e}")
+        data = None
+    if not data:
+        del st.query_params["journey"]
+        return
+    for key, value in data.items():
+        st.session_state[key] = value
+    st.session_state.journey_id = journey_id
+    # A journey saved before its greeting has no turns and still needs one
+    st.session_state.greeted = bool(data["chat_history"])
+
+
+def save_journey(clear_turns: bool = False):
+    """Create or update the journey for the current narrator."""
+    try:
+        store = get_journey_store()
+        fields = journey_fields(st.session_state)
+        if st.session_state.journey_id:
+            store.update(st.session_state.journey_id, fields, clear_turns=clear_turns)
+        else:
+            st.session_state.journey_id = store.create(fields)
+        st.query_params["journey"] = st.session_state.journey_id
+    except Exception as e:
+        print(f"[ERROR] Could not save journey: {e}")
+
+
+def save_chat():
+    """Write new turns (and audio that has finished) to the journey store."""
+    if not st.session_state.journey_id:
+        return
+    try:
+        save_turns(st.session_state.journey_id, st.session_state.chat_history, LIVE_MESSAGES)
+    except Exception as e:
+        print(f"[ERROR] Could not save chat turns: {e}")
+
+
+rehydrate_journey()
+
+# Load the answer cache's embedding model off the request path
+warm_embedder()
+
+# Feed the operator dashboard (pages/1_Performance.py)
+_ctx = get_script_run_ctx()
+_session_id = _ctx.session_id if _ctx else ""
+if _ctx:
+    record_session(_session_id, st.session_state)
+
+
+# Chat
+# How long a run waits on a background job before polling again
+JOB_POLL_SECONDS = 0.5
+# Suggested questions answered ahead of a click (SPECULATIVE_ANSWERS; 0 disables)
+DEFAULT_SPECULATIVE_ANSWERS = 3
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_poller(job_id: str, label: str):
+    """
+    Rerun the app once a job is done. Rendered only while the job is pending,
+    so its timer stops with the next full run.
+    """
+    if label:
+        st.caption(label)
+    job = get_job(job_id)
+    if job is None or job.done:
+        st.rerun()
+
+
+def poll_job(job_id: str, label: str):
+    """Check a pending job again shortly."""
+    ctx = get_script_run_ctx()
+    if ctx and ctx.fragment_ids_this_run:
+        st.rerun(scope="fragment")
+    # A fragment-scoped rerun is not allowed during a full-app run
+    job_poller(job_id, label)
+
+
+def speak(text: str, voice_settings, audio_enabled: bool, audio_profile: Optional[str] = None) -> dict:
+    """
+    Voice a reply with the narrator's voice.
+    Streams to the browser when possible, otherwise synthesizes the whole clip.
+    Runs inside jobs, so settings are passed in rather than read from session_state.
+    """
+    if not audio_enabled:
+        return {"audio": None}
+    
+    token = stream_persona_speech(text, "dynamic", voice_settings, audio_profile)
+    if token:
+        return {"audio": None, "audio_stream": token}
+    return {"audio": generate_persona_speech(text, "dynamic", voice_settings, audio_profile)}
+
+
+def reply_job(question: Optional[str], history: ChatHistory, model, persona: Persona,
+              landmark_info: Landmark, voice_settings, audio_enabled: bool,
+              audio_profile: Optional[str] = None) -> dict:
+    """Text and speech for the next assistant turn; the greeting when question is None."""
+    if question is None:
+        text = generate_greeting(None, None, model, persona, landmark_info)
+    else:
+        # The history is passed as-is; the question joins it once answered
+        text = cached_persona_response(question, history, model, persona, landmark_info)
+    return {"content": text, **speak(text, voice_settings, audio_enabled, audio_profile)}
+
+
+def submit_reply(question: Optional[str]):
+    """Queue the next reply (or the greeting) and remember its job."""
+    history = st.session_state.chat_history
+    persona = st.session_state.current_persona
+    # Same session, narrator, position and question -> same job
+    key = f"{_session_id}|{id(history)}|{persona.name}|{len(history)}|{question}"
+    job_id = submit_job(
+        "reply", key, reply_job,
+        question, history, st.session_state.model, persona,
+        st.session_state.landmark_info, st.session_state.voice_settings,
+        st.session_state.audio_enabled, st.session_state.audio_profile
+    )
+    st.session_state.pending_reply = {"job": job_id, "question": question}
+
+
+def suggestion_key(persona: Persona) -> str:
+    landmark_info = st.session_state.landmark_info or Landmark()
+    return f"{persona.name}|{persona.title}|{landmark_info.get('landmark_name')}"
+
+
+def answer_key(persona: Persona, question: str) -> str:
+    # Shared by every session with the same narrator, landmark and voice
+    return (f"{suggestion_key(persona)}|{question}|{st.session_state.voice_settings}|"
+            f"{st.session_state.audio_enabled}|{st.session_state.audio_profile}")
+
+
+def answer_job(question: str, persona: Persona, landmark_info: Landmark, model,
+               voice_settings, audio_enabled: bool, audio_profile: Optional[str]) -> dict:
+    """A suggested question's reply, text and full clip, prepared before it is clicked."""
+    text = answer_suggested_question(question, persona, landmark_info, model)
+    # Typed questions close to a suggestion can reuse its answer
+    remember_answer(question, text, ChatHistory(), persona, landmark_info)
+    audio = generate_persona_speech(text, "dynamic", voice_settings, audio_profile) if audio_enabled else None
+    return {"content": text, "audio": audio}
+
+
+def load_suggestions(persona: Persona) -> Optional[list]:
+    """
+    Suggested questions for the narrator, written by a background job.
+    Once they are known, their answers are prepared speculatively.
+    Returns None while the job is still running.
+    """
+    landmark_info = st.session_state.landmark_info or Landmark()
+    state = st.session_state.suggestions
+    if state is None:
+        job_id = submit_job(
+            "suggestions", suggestion_key(persona), generate_suggested_questions,
+            persona, landmark_info, st.session_state.model
+        )
+        state = st.session_state.suggestions = {"job": job_id, "questions": None}
+    
+    if state["questions"] is None:
+        job = get_job(state["job"])
+        if job and not job.done:
+            return None
+        ok = job and job.status == DONE and job.result
+        state["questions"] = job.result if ok else get_suggested_questions(dynamic_persona=persona)
+        
+        limit = int(get_setting("SPECULATIVE_ANSWERS", DEFAULT_SPECULATIVE_ANSWERS))
+        for question in state["questions"][:limit]:
+            submit_job(
+                "answer", answer_key(persona, question), answer_job,
+                question, persona, landmark_info, st.session_state.model,
+                st.session_state.voice_settings, st.session_state.audio_enabled,
+                st.session_state.audio_profile, speculative=True
+            )
+    return state["questions"]
+
+
+def ask(persona: Persona, question: str):
+    """Queue a reply to the question, reusing a suggestion's prepared answer if there is one."""
+    asked = {turn.content for turn in st.session_state.chat_history if turn.role == "user"}
+    job = get_job(job_id_for("answer", answer_key(persona, question)))
+    if job and job.status != FAILED and question not in asked:
+        # Someone is waiting on it now; don't leave it queued behind other prefetches
+        promote_job(job.id)
+        st.session_state.pending_reply = {"job": job.id, "question": question}
+    else:
+        submit_reply(question)
+
+
+def collect_reply() -> Optional[ChatTurn]:
+    """
+    Append the pending reply to the history once its job is done.
+    Returns the reply, or None while it is still running.
+    """
+    pending = st.session_state.pending_reply
+    job = get_job(pending["job"])
+    if job and not job.wait(JOB_POLL_SECONDS):
+        return None
+    
+    st.session_state.pending_reply = None
+    if not job or job.status != DONE:
+        st.warning("The past is silent for a moment... please ask again.")
+        return None
+    
+    history = st.session_state.chat_history
+    if pending["question"] is not None:
+        history.append(ChatTurn("user", pending["question"]))
+    reply = ChatTurn("assistant", **job.result)
+    history.append(reply)
+    save_chat()
+    return reply
+
+
+@st.fragment
+def chat_panel(persona: Persona):
+    """
+    Chat history, input and suggestions.
+    Runs as a fragment: a submit reruns only this panel, not the whole page.
+    Replies are generated by background jobs; the panel polls until they land.
+    """
+    # Audio streamed during the last render is complete by now
+    save_chat()
+    
+    history_box = st.container()
+    input_box = st.container()
+    
+    # Draw inputs first so a pending question is known before history renders
+    question = None
+    with input_box:
+        st.markdown("---")
+        
+        with st.form("chat_form", clear_on_submit=True):
+            user_input = st.text_input(
+                "Ask a question:",
+                placeholder="Why did you build this monument?",
+                label_visibility="collapsed"
+            )
+            submitted = st.form_submit_button("📤 Send", use_container_width=True)
+        
+        if submitted and user_input:
+            question = user_input
+        
+        # Suggested questions
+        st.markdown("---")
+        st.markdown("**💡 Ask about:**")
+        if st.session_state.api_configured:
+            suggestions = load_suggestions(persona)
+        else:
+            suggestions = get_suggested_questions(dynamic_persona=persona)
+        if suggestions is None:
+            st.caption("✨ Thinking of questions...")
+        else:
+            cols = st.columns(len(suggestions))
+            for i, (col, sug) in enumerate(zip(cols, suggestions)):
+                with col: 
+                    if st.button(sug[: 18] + "...", key=f"sug_{i}", help=sug, use_container_width=True):
+                        question = sug
+    
+    if st.session_state.api_configured and not st.session_state.pending_reply:
+        if not st.session_state.greeted:
+            submit_reply(None)
+            st.session_state.greeted = True
+        elif question:
+            ask(persona, question)
+    
+    history = st.session_state.chat_history
+    pending = st.session_state.pending_reply
+    with history_box:
+        render_chat_history(
+            history,
+            persona,
+            audio_enabled=st.session_state.audio_enabled,
+            immersive_mode=st.session_state.immersive_mode,
+            landmark_images=st.session_state.landmark_images,
+            latest_index=None if pending else len(history) - 1
+        )
+        
+        if pending:
+            # Only the new turn is rendered; no full-page rerun needed
+            if pending["question"] is not None:
+                render_message(ChatTurn("user", pending["question"]), len(history), persona)
+            with st.spinner("✨ Channeling the past..." if pending["question"] else f"✨ {persona.name} is awakening..."):
+                reply = collect_reply()
+            if st.session_state.pending_reply:
+                # Still running: poll again without blocking other interactions
+                poll_job(pending["job"], "✨ Channeling the past...")
+            if reply:
+                render_latest_reply(
+                    reply, len(history) - 1, persona,
+                    audio_enabled=st.session_state.audio_enabled,
+                    immersive_mode=st.session_state.immersive_mode,
+                    landmark_images=st.session_state.landmark_images
+                )
+    
+    if suggestions is None and not st.session_state.pending_reply:
+        # Suggestions are still being written: poll until they land
+        job_id = st.session_state.suggestions["job"]
+        job = get_job(job_id)
+        if job:
+            job.wait(JOB_POLL_SECONDS)
+        poll_job(job_id, "")
+
+
+def start_new_chat():
+    """Fresh history for a new narrator; a reply still running for the old one is dropped."""
+    st.session_state.chat_history = ChatHistory()
+    st.session_state.greeted = False
+    st.session_state.pending_reply = None
+    st.session_state.suggestions = None
+
+
+def gallery_job(landmark_name: str) -> list:
+    images = fetch_landmark_images(landmark_name, {"wikipedia_search": landmark_name})
+    return images or get_fallback_images(landmark_name, 4)
+
+
+def summon_guide(analysis: Landmark):
+    """
+    Steps 2-4 after identification: persona, related narrators and images.
+    All three run as background jobs in parallel; summon_progress picks them up.
+    """
+    st.session_state.landmark_info = analysis
+    model = st.session_state.model
+    # Keyed by landmark, so visitors at the same monument share the work
+    landmark_key = f"{analysis.get('landmark_name')}|{analysis.get('location')}|{analysis.get('era')}"
+    landmark_name = analysis.get("landmark_name", "monument")
+    st.session_state.pending_summon = {
+        "persona": submit_job("persona", landmark_key, generate_dynamic_persona, analysis, model, progress_arg="on_field"),
+        "related": submit_job("related", landmark_key, generate_related_personas, analysis, model),
+        "images": submit_job("images", landmark_name, gallery_job, landmark_name),
+        "switch": False,
+    }
+
+
+def switch_narrator(brief: dict):
+    """Expand a related persona into the narrator, in the background."""
+    landmark_info = st.session_state.landmark_info or Landmark()
+    key = f"{landmark_info.get('landmark_name')}|{brief.get('name')}|{brief.get('title')}"
+    st.session_state.pending_summon = {
+        "persona": submit_job("persona_brief", key, generate_full_persona_from_brief, brief, landmark_info, st.session_state.model),
+        "related": None,
+        "images": None,
+        "switch": True,
+    }
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def summon_progress():
+    """
+    Show the guide as its fields stream in, and install the new narrator
+    once every summon job is done. Rendered only while a summon is pending;
+    its timer reruns it until then.
+    """
+    pending = st.session_state.pending_summon
+    persona_job = get_job(pending["persona"])
+    if persona_job is None:
+        st.session_state.pending_summon = None
+        st.rerun()
+    
+    early = persona_job.progress
+    if "name" in early:
+        st.success(f"**Guide Found:** {early.get('avatar', '👤')} {early['name']} - {early.get('title', '')}")
+    if early.get("relationship_to_landmark"):
+        st.info(f"*{early['relationship_to_landmark']}*")
+    
+    jobs = [get_job(pending[k]) for k in ("persona", "related", "images") if pending[k]]
+    label = "🎭 Summoning your guide..." if pending["switch"] else "✨ Summoning the most relevant historical figure..."
+    st.markdown(label)
+    if any(job and not job.done for job in jobs):
+        return
+    
+    if persona_job.status == DONE and persona_job.result:
+        persona = persona_job.result
+        st.session_state.current_persona = persona
+        st.session_state.voice_settings = get_voice_settings_for_dynamic_persona(persona)
+    related_job = get_job(pending["related"])
+    if related_job and related_job.status == DONE:
+        st.session_state.related_personas = related_job.result
+    images_job = get_job(pending["images"])
+    if images_job and images_job.status == DONE:
+        st.session_state.landmark_images = images_job.result
+    
+    st.session_state.pending_summon = None
+    start_new_chat()
+    if pending["switch"]:
+        save_journey(clear_turns=True)
+    else:
+        # A new landmark starts a new journey
+        st.session_state.journey_id = None
+        save_journey()
+    st.rerun()
+
+
+BATCH_GALLERY_COLUMNS = 4
+
+
+def batch_panel(uploads: list):
+    """
+    Batch identification for tour operators: identify every uploaded photo,
+    stream results into a gallery, then start a tour from any of them.
+    """
+    from PIL import Image
+    
+    upload_ids = [u.file_id for u in uploads]
+    batch = st.session_state.batch
+    if batch and batch["upload_ids"] != upload_ids:
+        batch = st.session_state.batch = None
+    
+    st.caption(f"{len(uploads)} photos selected")
+    if not batch and st.session_state.api_configured:
+        if st.button(f"🗂️ Identify all {len(uploads)} photos", use_container_width=True):
+            images = [Image.open(u) for u in uploads]
+            progress = st.progress(0.0, text="Identifying...")
+            cells = []
+            for row in range(0, len(images), BATCH_GALLERY_COLUMNS):
+                cols = st.columns(BATCH_GALLERY_COLUMNS)
+                cells.extend(col.empty() for col in cols[:len(images) - row])
+            done = []
+            
+            def on_result(index, analysis):
+                done.append(index)
+                progress.progress(len(done) / len(images), text=f"Identified {len(done)} of {len(images)}")
+                with cells[index].container():
+                    st.image(images[index], use_container_width=True)
+                    st.caption(f"📍 {analysis.get('landmark_name', 'Unknown')}")
+            
+            summary = identify_batch(images, st.session_state.model, on_result=on_result)
+            st.session_state.batch = {"upload_ids": upload_ids, **summary}
+            st.rerun()
+        return
+    
+    if not batch:
+        return
+    
+    st.caption(
+        f"⚡ {batch['images_per_minute']} images/min • {batch['requests']} requests • "
+        f"{batch['duplicates']} duplicates skipped"
+    )
+    for row in range(0, len(uploads), BATCH_GALLERY_COLUMNS):
+        cols = st.columns(BATCH_GALLERY_COLUMNS)
+        for offset, col in enumerate(cols[:len(uploads) - row]):
+            index = row + offset
+            analysis = batch["results"][index] or {}
+            with col:
+                st.image(uploads[index], use_container_width=True)
+                st.caption(f"📍 {analysis.get('landmark_name', 'Unknown')}")
+                if st.button("Start tour", key=f"batch_tour_{index}", use_container_width=True):
+                    summon_guide(analysis)
+                    st.rerun()
 
 
 # Sidebar
@@ -160,19 +658,18 @@ with st.sidebar:
     
     # API Key
     st.markdown("### 🔑 API Key")
-    has_secret = "GEMINI_API_KEY" in st.secrets
+    api_key = get_setting("GEMINI_API_KEY")
     
-    if has_secret:
-        api_key = st.secrets["GEMINI_API_KEY"]
+    if api_key:
         st.success("✅ API Key loaded")
     else:
         api_key = st.text_input("Gemini API Key", type="password")
     
     if api_key:
         try:
-            configure_gemini(api_key)
-            st.session_state. model = get_gemini_model()
-            st.session_state. api_configured = True
+            # Shared across reruns and sessions via the model registry
+            st.session_state.model = get_gemini_model(api_key=api_key)
+            st.session_state.api_configured = True
             st.caption(f"Model: `{DEFAULT_MODEL}`")
         except Exception as e:
             st.error(f"Error: {e}")
@@ -185,6 +682,14 @@ with st.sidebar:
     # Voice toggle
     st. markdown("### 🔊 Voice")
     st.session_state. audio_enabled = st.checkbox("Enable Voice", value=st.session_state.audio_enabled)
+    if st.session_state.audio_enabled:
+        profiles = list(AUDIO_PROFILES)
+        st.session_state.audio_profile = st.selectbox(
+            "Audio quality", profiles,
+            index=profiles.index(st.session_state.audio_profile),
+            format_func=lambda name: AUDIO_PROFILES[name].label,
+            help="Data saver modes send 3-5x less audio, for mobile connections."
+        )
     
     # Immersive mode
     st.markdown("### 🎬 Immersive Mode")
@@ -200,29 +705,22 @@ with st.sidebar:
         for i, p in enumerate(st.session_state.related_personas):
             btn_label = f"{p. get('avatar', '👤')} {p.get('name', 'Unknown')}"
             if st.button(btn_label, key=f"persona_{i}", use_container_width=True):
-                with st.spinner(f"Summoning {p.get('name')}..."):
-                    full_persona = generate_full_persona_from_brief(
-                        p, 
-                        st.session_state.landmark_info or {},
-                        st.session_state.model
-                    )
-                    st.session_state. current_persona = full_persona
-                    st.session_state. voice_settings = get_voice_settings_for_dynamic_persona(full_persona)
-                    st. session_state.chat_history = []
-                    st.session_state.greeted = False
-                    st.rerun()
+                switch_narrator(p)
+                st.rerun()
     
     st.markdown("---")
     
     # Reset
     if st.button("🔄 New Journey", use_container_width=True):
-        st.session_state.chat_history = []
+        start_new_chat()
+        st.session_state.pending_summon = None
         st.session_state.current_persona = None
         st.session_state. related_personas = []
         st.session_state.landmark_info = None
         st.session_state.landmark_images = []
         st.session_state.voice_settings = None
-        st. session_state.greeted = False
+        st.session_state.journey_id = None
+        st.query_params.pop("journey", None)
         st.rerun()
     
     st.markdown("---")
@@ -239,14 +737,18 @@ col_left, col_right = st. columns([1, 1], gap="large")
 with col_left:
     st.markdown("### 📸 Discover Any Monument")
     
-    uploaded = st.file_uploader(
+    uploads = st.file_uploader(
         "Upload a photo of ANY historical landmark worldwide",
         type=["jpg", "jpeg", "png", "webp"],
-        help="The AI will identify the monument and summon the most relevant historical figure!"
+        accept_multiple_files=True,
+        help="The AI will identify the monument and summon the most relevant historical figure! Upload several photos to identify a whole itinerary."
     )
     
-    if uploaded:
-        image = Image.open(uploaded)
+    if len(uploads) > 1:
+        batch_panel(uploads)
+    elif uploads:
+        from PIL import Image
+        image = Image.open(uploads[0])
         st.image(image, caption="Your Discovery", use_container_width=True)
         
         if st.session_state.api_configured:
@@ -262,43 +764,17 @@ with col_left:
                     else:
                         st.warning("Could not identify clearly, but will try to find a guide...")
                 
-                # Step 2: Generate the most relevant persona
-                with st.spinner("✨ Summoning the most relevant historical figure..."):
-                    persona = generate_dynamic_persona(analysis, st.session_state.model)
-                    
-                    if persona:
-                        st.session_state.current_persona = persona
-                        st.session_state.voice_settings = get_voice_settings_for_dynamic_persona(persona)
-                        st. success(f"**Guide Found:** {persona.get('avatar', '👤')} {persona.get('name')} - {persona.get('title')}")
-                        st.info(f"*{persona.get('relationship_to_landmark', '')}*")
-                
-                # Step 3: Get related personas (for switching)
-                with st.spinner("🎭 Finding other connected historical figures..."):
-                    related = generate_related_personas(analysis, st.session_state.model)
-                    st.session_state.related_personas = related
-                    if related:
-                        names = [f"{p.get('avatar', '')} {p.get('name', '')}" for p in related[: 4]]
-                        st.caption(f"Also available: {', '.join(names)}")
+                summon_guide(analysis)
                 
-                # Step 4: Fetch images
-                with st.spinner("🖼️ Loading images..."):
-                    landmark_name = analysis.get("landmark_name", "monument")
-                    images = fetch_landmark_images(landmark_name, {"wikipedia_search": landmark_name})
-                    if images:
-                        st.session_state.landmark_images = images
-                    else:
-                        st.session_state.landmark_images = get_fallback_images(landmark_name, 4)
-                
-                # Reset chat
-                st.session_state. chat_history = []
-                st.session_state.greeted = False
                 st.rerun()
     
     # Show landmark info and images
     if st.session_state.landmark_info:
         info = st.session_state.landmark_info
         st.markdown("---")
-        st.markdown(f'<div class="landmark-badge">📍 {info.get("landmark_name", "Unknown Monument")}</div>', unsafe_allow_html=True)
+        st.markdown(render(
+            LANDMARK_BADGE_TEMPLATE, landmark_name=info.get("landmark_name", "Unknown Monument")
+        ), unsafe_allow_html=True)
         st.caption(f"📍 {info.get('location', 'Unknown')} | 🏛️ {info.get('architectural_style', 'Unknown')} | ⏰ {info.get('era', 'Unknown')}")
         
         # Image gallery
@@ -315,149 +791,24 @@ with col_left:
 with col_right:
     st.markdown("### 💬 Speak with History")
     
-    if st.session_state.current_persona:
+    if st.session_state.pending_summon:
+        summon_progress()
+    
+    elif st.session_state.current_persona:
         persona = st.session_state.current_persona
         
         # Persona Card
-        st.markdown(f"""
-        <div class="persona-card">
-            <div class="persona-avatar">{persona.get('avatar', '👤')}</div>
-            <div class="persona-name">{persona.get('name', 'Historical Guide')}</div>
-            <div class="persona-title">{persona.get('title', '')}</div>
-            <div class="persona-era">Era: {persona.get('era', 'Unknown')} • {persona.get('region', 'Unknown')}</div>
-            <div class="persona-title" style="margin-top: 10px; font-style: italic;">"{persona.get('relationship_to_landmark', '')}"</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Generate greeting
-        if not st.session_state.greeted and st.session_state.api_configured:
-            with st.spinner(f"✨ {persona.get('name')} is awakening..."):
-                greeting = generate_greeting(
-                    None, None, st.session_state.model,
-                    persona, st.session_state.landmark_info
-                )
-                
-                audio_b64 = None
-                if st.session_state.audio_enabled:
-                    audio_b64 = generate_persona_speech(
-                        greeting, "dynamic", st.session_state.voice_settings
-                    )
-                
-                st.session_state.chat_history.append({
-                    "role": "assistant",
-                    "content": greeting,
-                    "audio": audio_b64
-                })
-                st.session_state.greeted = True
-        
-        # Chat History
-        for i, msg in enumerate(st.session_state.chat_history):
-            if msg["role"] == "user": 
-                st.markdown(f'<div class="chat-user"><strong>🧑 You:</strong><br>{msg["content"]}</div>', unsafe_allow_html=True)
-            else:
-                is_latest = (i == len(st.session_state.chat_history) - 1)
-                
-                # Immersive mode for latest message
-                if is_latest and st.session_state.immersive_mode and st.session_state.landmark_images:
-                    render_immersive_view(
-                        images=st.session_state.landmark_images,
-                        persona_data=persona,
-                        subtitle_text=msg["content"],
-                        show_audio_visualizer=st.session_state. audio_enabled and msg. get("audio") is not None
-                    )
-                    
-                    # Audio player below immersive view
-                    if st.session_state.audio_enabled and msg.get("audio"):
-                        st.markdown(
-                            f'<div class="audio-container">{get_audio_player_html(msg["audio"], autoplay=True)}</div>',
-                            unsafe_allow_html=True
-                        )
-                else:
-                    # Regular chat display
-                    st.markdown(f'<div class="chat-ai"><strong>{persona.get("avatar", "👤")} {persona.get("name", "Guide")}:</strong><br>{msg["content"]}</div>', unsafe_allow_html=True)
-                    
-                    if st.session_state.audio_enabled and msg.get("audio"):
-                        st.markdown(
-                            f'<div class="audio-container">{get_audio_player_html(msg["audio"], autoplay=is_latest)}</div>',
-                            unsafe_allow_html=True
-                        )
-        
-        # Chat Input
-        st.markdown("---")
-        
-        with st.form("chat_form", clear_on_submit=True):
-            user_input = st.text_input(
-                "Ask a question:",
-                placeholder="Why did you build this monument?",
-                label_visibility="collapsed"
-            )
-            submitted = st.form_submit_button("📤 Send", use_container_width=True)
-        
-        if submitted and user_input and st.session_state.api_configured:
-            st.session_state.chat_history.append({
-                "role":  "user",
-                "content":  user_input,
-                "audio": None
-            })
-            
-            with st. spinner("✨ Channeling the past..."):
-                response = generate_persona_response(
-                    None, None, user_input,
-                    [{"role": m["role"], "content": m["content"]} for m in st. session_state.chat_history[:-1]],
-                    st.session_state.model,
-                    persona,
-                    st.session_state.landmark_info
-                )
-                
-                audio_b64 = None
-                if st.session_state.audio_enabled:
-                    audio_b64 = generate_persona_speech(
-                        response, "dynamic", st. session_state.voice_settings
-                    )
-                
-                st.session_state.chat_history.append({
-                    "role": "assistant",
-                    "content": response,
-                    "audio": audio_b64
-                })
-            
-            st.rerun()
+        st.markdown(render(
+            PERSONA_CARD_TEMPLATE,
+            avatar=persona.get("avatar", "👤"),
+            name=persona.get("name", "Historical Guide"),
+            title=persona.get("title", ""),
+            era=persona.get("era", "Unknown"),
+            region=persona.get("region", "Unknown"),
+            relationship=persona.get("relationship_to_landmark", ""),
+        ), unsafe_allow_html=True)
         
-        # Suggested questions
-        st.markdown("---")
-        st.markdown("**💡 Ask about:**")
-        suggestions = [
-            "Why did you build this? ",
-            "What was your life like?",
-            "Tell me a secret about this place"
-        ]
-        cols = st.columns(3)
-        for i, (col, sug) in enumerate(zip(cols, suggestions)):
-            with col: 
-                if st.button(sug[: 18] + ".. .", key=f"sug_{i}", use_container_width=True):
-                    st.session_state.chat_history.append({"role": "user", "content": sug, "audio": None})
-                    
-                    with st.spinner("✨"):
-                        response = generate_persona_response(
-                            None, None, sug,
-                            [{"role": m["role"], "content": m["content"]} for m in st.session_state.chat_history[:-1]],
-                            st.session_state.model,
-                            persona,
-                            st.session_state.landmark_info
-                        )
-                        
-                        audio_b64 = None
-                        if st.session_state. audio_enabled:
-                            audio_b64 = generate_persona_speech(
-                                response, "dynamic", st.session_state.voice_settings
-                            )
-                        
-                        st. session_state.chat_history. append({
-                            "role":  "assistant",
-                            "content": response,
-                            "audio": audio_b64
-                        })
-                    st.rerun()
+        chat_panel(persona)
     
     else:
         # Welcome Screen
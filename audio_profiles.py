@@ -0,0 +1,158 @@
+"""
+Audio delivery profiles for TimeTraveler AI.
+The TTS backend's output (48 kbps MP3 for Edge-TTS) is sent as-is on the
+standard profile. Data-saving profiles transcode locally with ffmpeg to
+Opus in WebM at 16-24 kbps, or to low-bitrate MP3 for browsers without WebM
+playback (Safari/iOS), cutting audio bytes per reply several times over.
+
+A profile is chosen per session from client hints (Save-Data, ECT, a mobile
+user agent) unless AUDIO_PROFILE pins one. Without ffmpeg, audio passes
+through unchanged.
+"""
+
+import shutil
+import subprocess
+import threading
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from config import get_setting
+
+
+class AudioProfile(NamedTuple):
+    name: str
+    label: str
+    container: Optional[str]    # ffmpeg output format; None passes audio through
+    codec: Optional[str]
+    bitrate: Optional[str]
+    mime_type: Optional[str]
+
+
+AUDIO_PROFILES: Dict[str, AudioProfile] = {
+    "standard": AudioProfile("standard", "Standard quality", None, None, None, None),
+    "data_saver": AudioProfile("data_saver", "Data saver (24 kbps Opus)", "webm", "libopus", "24k", "audio/webm"),
+    "low": AudioProfile("low", "Low data (16 kbps Opus)", "webm", "libopus", "16k", "audio/webm"),
+    # For browsers that cannot play WebM
+    "data_saver_mp3": AudioProfile("data_saver_mp3", "Data saver (32 kbps MP3)", "mp3", "libmp3lame", "32k", "audio/mpeg"),
+}
+DEFAULT_PROFILE = "standard"
+# Effective connection types (ECT client hint) that get the lowest bitrate
+SLOW_CONNECTIONS = ("slow-2g", "2g")
+TRANSCODE_TIMEOUT = 60
+
+_ffmpeg_checked = False
+_ffmpeg: Optional[str] = None
+_lock = threading.Lock()
+
+
+def ffmpeg_binary() -> Optional[str]:
+    global _ffmpeg, _ffmpeg_checked
+    with _lock:
+        if not _ffmpeg_checked:
+            _ffmpeg = get_setting("FFMPEG_BINARY") or shutil.which("ffmpeg")
+            _ffmpeg_checked = True
+            if not _ffmpeg:
+                print("[WARNING] ffmpeg not found; data-saving audio profiles will send original audio")
+    return _ffmpeg
+
+
+def get_audio_profile(name: Optional[str]) -> Optional[AudioProfile]:
+    """The profile to transcode with, or None to pass audio through."""
+    profile = AUDIO_PROFILES.get(name or DEFAULT_PROFILE)
+    if not profile or not profile.container or not ffmpeg_binary():
+        return None
+    return profile
+
+
+def _supports_webm(user_agent: str) -> bool:
+    # Safari (and every iOS browser, which runs WebKit) lacks reliable WebM/Opus playback
+    ua = user_agent.lower()
+    if "iphone" in ua or "ipad" in ua:
+        return False
+    return not ("safari" in ua and "chrome" not in ua and "chromium" not in ua and "android" not in ua)
+
+
+def choose_audio_profile(headers) -> str:
+    """Pick a profile from request headers (st.context.headers) and AUDIO_PROFILE."""
+    pinned = str(get_setting("AUDIO_PROFILE", "auto")).lower()
+    if pinned in AUDIO_PROFILES:
+        return pinned
+
+    headers = headers or {}
+    user_agent = headers.get("User-Agent", "") or ""
+    save_data = (headers.get("Save-Data", "") or "").lower() == "on"
+    ect = (headers.get("ECT", "") or "").lower()
+    mobile = "mobi" in user_agent.lower() or "android" in user_agent.lower()
+
+    if ect in SLOW_CONNECTIONS:
+        name = "low"
+    elif save_data or mobile or ect == "3g":
+        name = "data_saver"
+    else:
+        return DEFAULT_PROFILE
+    return name if _supports_webm(user_agent) else "data_saver_mp3"
+
+
+def _ffmpeg_args(profile: AudioProfile):
+    return [
+        ffmpeg_binary(), "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0", "-vn", "-ac", "1",
+        "-c:a", profile.codec, "-b:a", profile.bitrate,
+        *(["-application", "voip"] if profile.codec == "libopus" else []),
+        "-f", profile.container, "pipe:1",
+    ]
+
+
+def transcode(audio: bytes, profile: Optional[AudioProfile]) -> Optional[bytes]:
+    """Whole clip in the profile's format, or the original audio if transcoding fails."""
+    if not audio or not profile:
+        return audio
+    try:
+        result = subprocess.run(_ffmpeg_args(profile), input=audio, capture_output=True, timeout=TRANSCODE_TIMEOUT)
+        if result.returncode == 0 and result.stdout:
+            return result.stdout
+        print(f"[WARNING] ffmpeg exited {result.returncode}: {result.stderr.decode(errors='ignore')[:200]}")
+    except Exception as e:
+        print(f"[WARNING] Audio transcode failed: {e}")
+    return audio
+
+
+def transcode_stream(chunks: Iterator[bytes], profile: AudioProfile) -> Iterator[bytes]:
+    """Transcode a chunk stream through one ffmpeg process, yielding output as it is produced."""
+    proc = subprocess.Popen(_ffmpeg_args(profile), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def feed():
+        try:
+            for chunk in chunks:
+                proc.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    threading.Thread(target=feed, daemon=True).start()
+    try:
+        while True:
+            data = proc.stdout.read1(4096)
+            if not data:
+                break
+            yield data
+    finally:
+        proc.stdout.close()
+        if proc.wait(timeout=TRANSCODE_TIMEOUT) != 0:
+            print(f"[WARNING] ffmpeg stream exited {proc.returncode}")
+
+
+def sniff_audio_mime(audio: bytes, default: str = "audio/mpeg") -> str:
+    """MIME type from a clip's leading bytes (clips of several profiles share the chat)."""
+    if audio[:4] == b"\x1a\x45\xdf\xa3":
+        return "audio/webm"
+    if audio[:4] == b"RIFF":
+        return "audio/wav"
+    if audio[:4] == b"OggS":
+        return "audio/ogg"
+    if audio[:3] == b"ID3" or audio[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return default
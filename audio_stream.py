@@ -0,0 +1,219 @@
+"""
+Streaming audio delivery for TimeTraveler AI.
+Forwards TTS audio chunks to the browser as they are synthesized, so playback
+starts on the first chunk instead of after the whole reply is encoded.
+
+A small threaded HTTP server (one per process) serves each utterance as a
+chunked response at /audio/<token>; a static component plays it. With a
+data-saving profile the chunks are transcoded on the fly (see audio_profiles).
+
+The server listens on AUDIO_STREAM_HOST (loopback by default) and is reached
+through a reverse proxy at AUDIO_STREAM_URL, as serve.py sets up. Streaming is
+off unless AUDIO_STREAM_URL is set (or STREAMING_AUDIO forces it): a bare
+host:port URL is blocked on HTTPS pages and unreachable behind proxies.
+"""
+
+import base64
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import streamlit.components.v1 as components
+
+from config import get_setting, get_bool_setting
+from tts_backends import get_tts_backend, stream_speech
+from tracing import span
+from metrics import track_inflight
+from shared_cache import get_cache
+from audio_profiles import AudioProfile, transcode_stream
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Finished streams kept for replay / late readers
+MAX_RETAINED_STREAMS = 64
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_stream_component")
+_audio_stream_component = components.declare_component("audio_stream", path=COMPONENT_DIR)
+
+
+class AudioStream:
+    """Chunks of one utterance, readable while the producer is still writing."""
+
+    def __init__(self, mime_type: str):
+        self.mime_type = mime_type
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self.cond = threading.Condition()
+
+    def append(self, chunk: bytes):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, failed: bool = False):
+        with self.cond:
+            self.done = True
+            self.failed = failed
+            self.cond.notify_all()
+
+    def iter_chunks(self, timeout: float = 30.0):
+        """Yield every chunk from the start, blocking until the stream ends."""
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.chunks) and not self.done:
+                    if not self.cond.wait(timeout):
+                        return
+                if index >= len(self.chunks):
+                    return
+                chunk = self.chunks[index]
+            index += 1
+            yield chunk
+
+    def audio_bytes(self) -> Optional[bytes]:
+        """Full audio once the stream has finished successfully."""
+        if not self.done or self.failed or not self.chunks:
+            return None
+        return b"".join(self.chunks)
+
+
+_streams: "OrderedDict[str, AudioStream]" = OrderedDict()
+_streams_lock = threading.Lock()
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+class _AudioStreamHandler(BaseHTTPRequestHandler):
+    """Serves /audio/<token> as a chunked HTTP response."""
+
+    def do_GET(self):
+        token = self.path.rsplit("/", 1)[-1].split("?", 1)[0]
+        with _streams_lock:
+            stream = _streams.get(token)
+        if not self.path.startswith("/audio/") or stream is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", stream.mime_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        try:
+            for chunk in stream.iter_chunks():
+                self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Browser stopped listening (seek, reload, new reply)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def get_stream_port() -> int:
+    return int(get_setting("AUDIO_STREAM_PORT", DEFAULT_PORT))
+
+
+def ensure_stream_server():
+    """Start the per-process audio stream server if it is not running yet."""
+    global _server, _server_failed
+    with _server_lock:
+        if _server is None and not _server_failed:
+            host = get_setting("AUDIO_STREAM_HOST", DEFAULT_HOST)
+            try:
+                _server = ThreadingHTTPServer((host, get_stream_port()), _AudioStreamHandler)
+            except OSError as e:
+                print(f"[ERROR] Audio stream server could not bind {host}:{get_stream_port()}: {e}")
+                _server_failed = True
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            print(f"[INFO] Audio stream server listening on {host}:{get_stream_port()}")
+    return _server
+
+
+def streaming_audio_enabled() -> bool:
+    """Streaming is on when configured (by default, when AUDIO_STREAM_URL is set) and the TTS backend can stream."""
+    return (
+        get_bool_setting("STREAMING_AUDIO", bool(get_setting("AUDIO_STREAM_URL")))
+        and get_tts_backend().capabilities()["streaming"]
+    )
+
+
+def _produce(stream: AudioStream, text: str, voice_settings: Dict, profile: Optional[AudioProfile] = None):
+    with span("tts_stream", chars=len(text), profile=profile.name if profile else "standard") as s, \
+            track_inflight("tts"):
+        try:
+            backend = get_tts_backend()
+            chunks = stream_speech(backend, text, voice_settings)
+            if profile:
+                chunks = transcode_stream(chunks, profile)
+            total = 0
+            for chunk in chunks:
+                if not total:
+                    s.set(first_chunk_ms=round(s.duration_ms, 1))
+                total += len(chunk)
+                stream.append(chunk)
+            s.set(bytes=total)
+            stream.finish()
+            # Later requests for the same line replay from the audio cache
+            audio = stream.audio_bytes()
+            if audio:
+                key = backend.audio_cache_key(text, voice_settings)
+                if profile:
+                    key = f"{key}|{profile.name}"
+                get_cache("audio").set(key, base64.b64encode(audio).decode())
+        except Exception as e:
+            print(f"Speech stream error: {e}")
+            stream.finish(failed=True)
+
+
+def start_speech_stream(text: str, voice_settings: Dict, profile: Optional[AudioProfile] = None) -> Optional[str]:
+    """
+    Start synthesizing in the background and return a stream token.
+    The browser can begin playback as soon as the first chunk is produced.
+    Returns None if the stream server is unavailable.
+    """
+    if ensure_stream_server() is None:
+        return None
+    token = secrets.token_urlsafe(12)
+    stream = AudioStream(profile.mime_type if profile else get_tts_backend().capabilities()["mime_type"])
+    with _streams_lock:
+        _streams[token] = stream
+        while len(_streams) > MAX_RETAINED_STREAMS:
+            _streams.popitem(last=False)
+    threading.Thread(target=_produce, args=(stream, text, voice_settings, profile), daemon=True).start()
+    return token
+
+
+def has_stream(token: str) -> bool:
+    with _streams_lock:
+        return token in _streams
+
+
+def get_stream_audio_b64(token: str) -> Optional[str]:
+    """Base64 of the complete audio once the stream has finished, else None."""
+    with _streams_lock:
+        stream = _streams.get(token)
+    audio = stream.audio_bytes() if stream else None
+    return base64.b64encode(audio).decode() if audio else None
+
+
+def render_stream_player(token: str, autoplay: bool = True):
+    """Render the streaming player; keyed by token so reruns don't restart playback."""
+    return _audio_stream_component(
+        token=token,
+        port=get_stream_port(),
+        base_url=get_setting("AUDIO_STREAM_URL"),
+        autoplay=autoplay,
+        key=f"audio_stream_{token}",
+        default=None
+    )
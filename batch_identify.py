@@ -0,0 +1,175 @@
+"""
+Batch identification for TimeTraveler AI.
+Identifies a whole itinerary of photos at once: near-duplicates are dropped by
+perceptual hash, images are packed several per multimodal request when there
+are more than the concurrency cap can run in parallel, and requests run on a
+bounded thread pool. Results are reported per image as soon as they arrive.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from config import get_setting
+from tracing import traced, current_span, response_usage
+from models import Landmark
+from model_registry import report_model_error
+from utils import (
+    analyze_image, clean_json_from_response, json_generation_config, LANDMARK_SCHEMA
+)
+
+# Requests in flight at once (Gemini free tier allows ~15 RPM)
+DEFAULT_CONCURRENCY = 4
+# Images per packed request
+DEFAULT_PACK_SIZE = 4
+# dHash bits that may differ for two photos to count as the same shot
+DUPLICATE_DISTANCE = 6
+# Packed images are downscaled to keep the request small
+PACKED_MAX_SIDE = 768
+
+
+def perceptual_hash(image) -> int:
+    """64-bit difference hash (dHash) of a PIL image."""
+    from PIL import Image
+
+    small = image.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def dedupe_images(images: List, max_distance: int = DUPLICATE_DISTANCE) -> Dict[int, int]:
+    """
+    Map each image index to the index of the first near-identical image.
+    Unique images map to themselves.
+    """
+    hashes = []
+    canonical = {}
+    for i, image in enumerate(images):
+        try:
+            h = perceptual_hash(image)
+        except Exception as e:
+            print(f"[WARNING] Could not hash image {i}: {e}")
+            canonical[i] = i
+            continue
+        match = next((j for j, other in hashes if bin(h ^ other).count("1") <= max_distance), None)
+        canonical[i] = i if match is None else match
+        if match is None:
+            hashes.append((i, h))
+    return canonical
+
+
+def plan_packs(indices: List[int], pack_size: int, max_concurrency: int) -> List[List[int]]:
+    """
+    Group image indices into requests.
+    Packing only pays off once there are more images than parallel slots;
+    below that, one image per request gives the lowest latency.
+    """
+    if pack_size <= 1 or len(indices) <= max_concurrency:
+        return [[i] for i in indices]
+    return [indices[i:i + pack_size] for i in range(0, len(indices), pack_size)]
+
+
+def _downscale(image):
+    if max(image.size) <= PACKED_MAX_SIDE:
+        return image
+    copy = image.copy()
+    copy.thumbnail((PACKED_MAX_SIDE, PACKED_MAX_SIDE))
+    return copy
+
+
+@traced()
+def analyze_image_pack(images: List, model) -> List[Landmark]:
+    """
+    Identify several images in one multimodal request.
+    Falls back to one request per image if the reply does not line up.
+    """
+    current_span().set(images=len(images))
+    prompt = f"""Identify the historical landmark in EACH of the {len(images)} images that follow, in order.
+
+Respond with a JSON array of exactly {len(images)} objects, one per image in the same order, each with:
+identified, landmark_name, location, confidence, visual_elements, architectural_style, era.
+If an image cannot be identified, set identified to false and landmark_name to "Unknown Monument"."""
+
+    try:
+        response = model.generate_content(
+            [prompt, *[_downscale(img) for img in images]],
+            generation_config=json_generation_config({"type": "ARRAY", "items": LANDMARK_SCHEMA})
+        )
+        current_span().set(**response_usage(response))
+        parsed = clean_json_from_response(response.text)
+        if isinstance(parsed, list) and len(parsed) == len(images) and all(isinstance(p, dict) for p in parsed):
+            return [Landmark.from_dict(p) for p in parsed]
+        print(f"[WARNING] Packed identification returned a mismatched reply, retrying singly")
+    except Exception as e:
+        report_model_error(e, model)
+        print(f"[ERROR] analyze_image_pack exception: {str(e)}")
+
+    current_span().set(fallback=True)
+    return [analyze_image(img, model) for img in images]
+
+
+@traced()
+def identify_batch(
+    images: List,
+    model,
+    on_result: Optional[Callable[[int, Landmark], None]] = None,
+    max_concurrency: int = None,
+    pack_size: int = None
+) -> Dict:
+    """
+    Identify many images.
+    on_result(index, analysis) is called from the calling thread as each image
+    (duplicates included) gets its result, so it may update Streamlit elements.
+    Returns {"results": [...], "duplicates": n, "requests": n, "images_per_minute": x}.
+    """
+    max_concurrency = max_concurrency or int(get_setting("BATCH_CONCURRENCY", DEFAULT_CONCURRENCY))
+    pack_size = pack_size or int(get_setting("BATCH_PACK_SIZE", DEFAULT_PACK_SIZE))
+    started = time.perf_counter()
+
+    canonical = dedupe_images(images)
+    unique = sorted(set(canonical.values()))
+    copies: Dict[int, List[int]] = {}
+    for i, c in canonical.items():
+        copies.setdefault(c, []).append(i)
+
+    packs = plan_packs(unique, pack_size, max_concurrency)
+    results: List[Optional[Landmark]] = [None] * len(images)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        futures = {}
+        for pack in packs:
+            if len(pack) == 1:
+                future = pool.submit(lambda i: [analyze_image(images[i], model)], pack[0])
+            else:
+                future = pool.submit(analyze_image_pack, [images[i] for i in pack], model)
+            futures[future] = pack
+
+        for future in as_completed(futures):
+            pack = futures[future]
+            try:
+                analyses = future.result()
+            except Exception as e:
+                print(f"[ERROR] Batch request failed: {e}")
+                analyses = [Landmark(confidence="none") for _ in pack]
+            for index, analysis in zip(pack, analyses):
+                for copy_index in copies[index]:
+                    results[copy_index] = analysis
+                    if on_result:
+                        on_result(copy_index, analysis)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "results": results,
+        "duplicates": len(images) - len(unique),
+        "requests": len(packs),
+        "seconds": round(elapsed, 2),
+        "images_per_minute": round(len(images) / elapsed * 60, 1) if elapsed else 0.0,
+    }
+    current_span().set(images=len(images), duplicates=summary["duplicates"], requests=len(packs))
+    return summary
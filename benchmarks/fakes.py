@@ -0,0 +1,286 @@
+"""
+Deterministic local fakes for benchmarking TimeTraveler AI without API keys.
+Stands in for genai.GenerativeModel, edge_tts.Communicate and the MediaWiki API.
+"""
+
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+LANDMARK_JSON = {
+    "identified": True,
+    "landmark_name": "Nellaiappar Temple",
+    "location": "Tirunelveli, India",
+    "confidence": "high",
+    "visual_elements": "Dravidian gopuram, granite mandapam, musical pillars",
+    "architectural_style": "Dravidian",
+    "era": "7th century CE"
+}
+
+PERSONA_JSON = {
+    "name": "Ninra Seer Nedumaran",
+    "title": "Pandya King",
+    "era": "7th century CE",
+    "region": "Pandya Kingdom, Tamil Nadu",
+    "avatar": "👑",
+    "voice_gender": "male",
+    "voice_age": "middle",
+    "relationship_to_landmark": "Patron of the temple's early construction",
+    "personality_traits": ["devout", "proud", "generous"],
+    "speaking_style": "regal and poetic",
+    "historical_facts": ["Ruled from Madurai", "Patron of Shaivism", "Endowed the temple"],
+    "system_prompt": "You are Ninra Seer Nedumaran, Pandya King. Never break character.",
+    "greeting": "Vanakkam, traveller! I am Ninra Seer Nedumaran, King of the Pandyas. "
+                "These halls rose under my patronage. Sit, and I shall tell you their stories."
+}
+
+RELATED_JSON = [
+    {"name": "Ninra Seer Nedumaran", "title": "Pandya King", "era": "7th century", "avatar": "👑", "connection": "Patron", "voice_gender": "male"},
+    {"name": "Mangayarkkarasi", "title": "Pandya Queen", "era": "7th century", "avatar": "👸", "connection": "Devotee", "voice_gender": "female"},
+    {"name": "Thirugnana Sambandar", "title": "Saint", "era": "7th century", "avatar": "🙏", "connection": "Sang hymns here", "voice_gender": "male"},
+]
+
+SUGGESTIONS_JSON = ["Why did you endow this temple?", "Do the pillars really sing?", "What was Madurai like?"]
+
+FILLER_WORDS = (
+    "the temple bells rang across the river as artisans carved granite pillars "
+    "that sing when struck and kings came to pray beneath the gopuram"
+).split()
+
+
+class FakeResponse:
+    """Mimics a google.generativeai GenerateContentResponse (or one stream chunk)."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+_checked_configs = set()
+_checked_lock = threading.Lock()
+
+
+def check_generation_config(generation_config) -> None:
+    """
+    Convert a config the way genai.GenerativeModel does, so a bad schema fails
+    here too. Each distinct config is converted once.
+    """
+    if not generation_config:
+        return
+    key = json.dumps(generation_config, sort_keys=True, default=str)
+    with _checked_lock:
+        if key in _checked_configs:
+            return
+        from google.generativeai.types import generation_types
+        generation_types.to_generation_config_dict(generation_config)
+        _checked_configs.add(key)
+
+
+class FakeChat:
+    def __init__(self, model: "FakeGenerativeModel", history: List[Dict]):
+        self.model = model
+        self.history = history
+
+    def send_message(self, message, stream: bool = False):
+        return self.model._respond(self.model.filler(self.model.reply_tokens), stream)
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel with configurable latency and output size.
+    Latency = base_latency + per_token_latency * output tokens.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "fake-gemini",
+        base_latency: float = 0.05,
+        per_token_latency: float = 0.0005,
+        reply_tokens: int = 120,
+        stream_chunk_tokens: int = 8,
+        generation_config: Optional[Dict] = None
+    ):
+        self.model_name = model_name
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.reply_tokens = reply_tokens
+        self.stream_chunk_tokens = stream_chunk_tokens
+        check_generation_config(generation_config)
+        self.generation_config = generation_config
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def filler(tokens: int) -> str:
+        return " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(tokens)).capitalize() + "."
+
+    def _payload_for(self, prompt: str, images: int = 0) -> str:
+        if "in EACH of the" in prompt:
+            return json.dumps([LANDMARK_JSON] * images)
+        if "identify the historical landmark" in prompt:
+            return json.dumps(LANDMARK_JSON)
+        if "questions a curious visitor" in prompt:
+            return json.dumps(SUGGESTIONS_JSON)
+        if "historical figures DIRECTLY connected" in prompt or "List 3-5" in prompt:
+            return json.dumps(RELATED_JSON)
+        if "persona" in prompt.lower() or "SINGLE MOST" in prompt:
+            return json.dumps(PERSONA_JSON, ensure_ascii=False)
+        return self.filler(self.reply_tokens)
+
+    def _respond(self, text: str, stream: bool):
+        with self._lock:
+            self.calls += 1
+        tokens = max(1, len(text) // 4)
+        if not stream:
+            time.sleep(self.base_latency + self.per_token_latency * tokens)
+            return FakeResponse(text)
+        return self._stream(text)
+
+    def _stream(self, text: str):
+        time.sleep(self.base_latency)
+        step = self.stream_chunk_tokens * 4
+        for i in range(0, len(text), step):
+            piece = text[i:i + step]
+            time.sleep(self.per_token_latency * max(1, len(piece) // 4))
+            yield FakeResponse(piece)
+
+    def generate_content(self, contents, stream: bool = False, generation_config=None, **kwargs):
+        check_generation_config(generation_config)
+        parts = contents if isinstance(contents, list) else [contents]
+        prompt = " ".join(p for p in parts if isinstance(p, str))
+        images = sum(1 for p in parts if not isinstance(p, str))
+        return self._respond(self._payload_for(prompt, images), stream)
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history or [])
+
+    def count_tokens(self, contents):
+        return FakeResponse("")
+
+
+class FakeCommunicate:
+    """
+    Drop-in for edge_tts.Communicate producing deterministic MP3-sized chunks.
+    Emulates first-chunk latency plus a steady per-character synthesis rate.
+    """
+
+    first_chunk_latency = 0.08
+    seconds_per_char = 0.0004
+    bytes_per_char = 160
+    chunk_size = 4096
+
+    def __init__(self, text: str, voice: str = "", rate: str = "+0%", pitch: str = "+0Hz", **kwargs):
+        self.text = text
+        self.voice = voice
+
+    async def stream(self):
+        import asyncio
+        total = len(self.text) * self.bytes_per_char
+        await asyncio.sleep(self.first_chunk_latency)
+        sent = 0
+        while sent < total:
+            size = min(self.chunk_size, total - sent)
+            await asyncio.sleep(self.seconds_per_char * size / self.bytes_per_char)
+            # Bytes are an MPEG frame sync header followed by padding
+            yield {"type": "audio", "data": b"\xff\xfb" + b"\x00" * (size - 2)}
+            sent += size
+        yield {"type": "WordBoundary", "offset": 0, "duration": 0, "text": ""}
+
+
+async def fake_list_voices():
+    return [
+        {"ShortName": "en-IN-PrabhatNeural", "Locale": "en-IN", "Gender": "Male"},
+        {"ShortName": "en-IN-NeerjaNeural", "Locale": "en-IN", "Gender": "Female"},
+        {"ShortName": "en-GB-RyanNeural", "Locale": "en-GB", "Gender": "Male"},
+        {"ShortName": "en-GB-SoniaNeural", "Locale": "en-GB", "Gender": "Female"},
+        {"ShortName": "en-US-GuyNeural", "Locale": "en-US", "Gender": "Male"},
+        {"ShortName": "en-US-JennyNeural", "Locale": "en-US", "Gender": "Female"},
+    ]
+
+
+class _FakeWikiHandler(BaseHTTPRequestHandler):
+    """Answers the three MediaWiki queries image_fetcher makes."""
+
+    latency = 0.02
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        time.sleep(self.latency)
+
+        if params.get("list") == "search":
+            body = {"query": {"search": [{"title": params.get("srsearch", "Monument")}]}}
+        elif params.get("prop") == "images":
+            body = {"query": {"pages": {"1": {"images": [
+                {"title": f"File:View_{i}.jpg"} for i in range(8)
+            ] + [{"title": "File:Commons-logo.svg"}]}}}}
+        elif params.get("prop") == "imageinfo":
+            name = params.get("titles", "File:View.jpg").replace("File:", "")
+            body = {"query": {"pages": {"1": {"imageinfo": [{
+                "url": f"https://upload.example.org/{name}",
+                "thumburl": f"https://upload.example.org/thumb/{name}/800px-{name}"
+            }]}}}}
+        else:
+            body = {}
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeWikiServer:
+    """Local MediaWiki stand-in on an ephemeral port."""
+
+    def __init__(self, latency: float = 0.02):
+        handler = type("Handler", (_FakeWikiHandler,), {"latency": latency})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/w/api.php"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def install_fakes(model_kwargs: Optional[Dict] = None, wiki_url: Optional[str] = None) -> FakeGenerativeModel:
+    """
+    Patch edge_tts, the model registry and image_fetcher to use the fakes.
+    Returns the shared fake model.
+    """
+    import os
+    import edge_tts
+    import model_registry
+
+    os.environ.setdefault("TTS_BACKEND", "edge")
+    os.environ.setdefault("STREAMING_AUDIO", "false")
+    # Keep the fake voice list out of the real catalog file
+    os.environ.setdefault("VOICE_CATALOG_FILE", os.path.join(tempfile.mkdtemp(prefix="tt-bench-"), "voice_catalog.json"))
+
+    edge_tts.Communicate = FakeCommunicate
+    edge_tts.list_voices = fake_list_voices
+
+    model = FakeGenerativeModel(**(model_kwargs or {}))
+    model_registry._build_model = lambda *args, **kwargs: model
+    model_registry._build_model.clear = lambda *args: None
+
+    if wiki_url:
+        import image_fetcher
+        image_fetcher.WIKIPEDIA_API = wiki_url
+    return model
@@ -0,0 +1,99 @@
+"""
+Import-time profile for TimeTraveler AI cold start.
+Imports the modules app.py loads in a fresh interpreter under
+`python -X importtime` and reports total import time, the slowest packages and
+whether any heavy SDK was loaded eagerly.
+
+Usage (from the repository root):
+    python -m benchmarks.import_profile --top 15
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+# SDKs that must only load on first use
+LAZY_MODULES = ["google.generativeai", "grpc", "edge_tts", "requests", "PIL.Image", "sentence_transformers"]
+
+
+def app_modules(path: str = APP_PATH) -> List[str]:
+    """The modules app.py imports at module level, in import order."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(n for n in names if n not in modules)
+    return modules
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append({
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+            })
+        except ValueError:
+            continue
+    return rows
+
+
+def profile_imports(modules: List[str] = None, top: int = 15) -> Dict:
+    """Import modules in a fresh interpreter and summarize the import cost."""
+    modules = modules or app_modules()
+    probe = (
+        "import sys\n"
+        + "".join(f"import {m}\n" for m in modules)
+        + f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=300
+    )
+    rows = parse_importtime(result.stderr)
+    # Top-level entries add up to the total time spent importing
+    top_level = [r for r in rows if r["depth"] == 0]
+    slowest = sorted(top_level, key=lambda r: -r["cumulative_us"])[:top]
+
+    return {
+        "modules": modules,
+        "ok": result.returncode == 0,
+        "error": result.stderr.strip().splitlines()[-1] if result.returncode else None,
+        "total_ms": round(sum(r["cumulative_us"] for r in top_level) / 1000, 1),
+        "slowest": [{"module": r["module"], "cumulative_ms": round(r["cumulative_us"] / 1000, 1)} for r in slowest],
+        "eager_heavy_imports": [m for m in result.stdout.strip().split(",") if m],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time profile of the app's modules")
+    parser.add_argument("--modules", nargs="*", help="Modules to import (default: app.py's imports)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to report")
+    args = parser.parse_args(argv)
+
+    report = profile_imports(args.modules, args.top)
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+Multi-session load generator for TimeTraveler AI.
+Drives app.py headlessly with Streamlit's AppTest against the local fakes,
+simulating visitors doing upload -> greeting -> K chat turns -> narrator switch.
+
+AppTest cannot drive st.file_uploader, so the upload step runs the same
+identification pipeline app.py runs (analyze, persona, related, images) and
+seeds session_state with the results before the greeting rerun.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --levels 1 2 4 8 16 --turns 3 --output load.json
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.fakes import FakeWikiServer, install_fakes
+from benchmarks.run_benchmarks import make_test_image, peak_rss_mb, percentile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+# Replies and summons finish in background jobs; reruns poll until they land
+SETTLE_TIMEOUT = 60.0
+PENDING_KEYS = ["pending_reply", "pending_summon"]
+QUESTIONS = [
+    "Why did you build this?",
+    "What was your life like?",
+    "Tell me a secret about this place",
+    "Why are the pillars musical?",
+]
+# Session state keys that make up a visitor's journey
+JOURNEY_KEYS = [
+    "chat_history", "current_persona", "related_personas",
+    "landmark_info", "landmark_images", "voice_settings",
+]
+
+
+def prepare_concurrent_sessions():
+    """
+    Make AppTest safe to run from several threads at once:
+
+    - AppTest.run switches test mode on by patching config.get_option and
+      restores it on exit, so one visitor finishing could switch it off under
+      another mid-run (its widgets then lack test data, e.g. a KeyError on a
+      selectbox's format_func). Test mode is set for the whole process instead.
+    - Every run compiles app.py afresh, and concurrent ast parsing can fail on
+      CPython 3.11 with "SystemError: AST constructor recursion depth
+      mismatch" (gh-106905), so compiles take turns.
+    """
+    from streamlit import config
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    config.set_option("global.appTest", True)
+
+    get_bytecode = ScriptCache.get_bytecode
+    lock = threading.Lock()
+
+    def locked_get_bytecode(self, script_path):
+        with lock:
+            return get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def current_rss_mb() -> float:
+    """Current resident set size in MB (Linux), falling back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def session_state_bytes(at) -> int:
+    """Approximate size of a visitor's journey state in bytes."""
+    state = {}
+    for key in JOURNEY_KEYS:
+        try:
+            state[key] = at.session_state[key]
+        except KeyError:
+            pass
+    return len(pickle.dumps(state))
+
+
+class Visitor:
+    """One simulated visitor with its own AppTest session."""
+
+    def __init__(self, model, turns: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.model = model
+        self.turns = turns
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.at.secrets["GEMINI_API_KEY"] = "fake-key"
+        self.rerun_times: List[float] = []
+        self.errors = 0
+
+    def _run(self, action=None):
+        t0 = time.perf_counter()
+        (action or self.at).run()
+        self.rerun_times.append(time.perf_counter() - t0)
+        if self.at.exception:
+            self.errors += 1
+
+    def _pending(self) -> bool:
+        for key in PENDING_KEYS:
+            try:
+                if self.at.session_state[key]:
+                    return True
+            except KeyError:
+                pass
+        return False
+
+    def settle(self):
+        """Rerun until no background job is pending for this visitor."""
+        deadline = time.perf_counter() + SETTLE_TIMEOUT
+        while self._pending() and time.perf_counter() < deadline:
+            self._run()
+        if self._pending():
+            self.errors += 1
+
+    def upload(self):
+        """Run the identification pipeline and seed the session like app.py does."""
+        from utils import analyze_image, generate_dynamic_persona, generate_related_personas
+        from image_fetcher import fetch_landmark_images
+        from voice_engine import get_voice_settings_for_dynamic_persona
+        from models import ChatHistory
+
+        analysis = analyze_image(make_test_image(), self.model)
+        persona = generate_dynamic_persona(analysis, self.model)
+        related = generate_related_personas(analysis, self.model)
+        name = analysis.get("landmark_name", "monument")
+        images = fetch_landmark_images(name, {"wikipedia_search": name})
+
+        self.at.session_state["landmark_info"] = analysis
+        self.at.session_state["current_persona"] = persona
+        self.at.session_state["voice_settings"] = get_voice_settings_for_dynamic_persona(persona)
+        self.at.session_state["related_personas"] = related
+        self.at.session_state["landmark_images"] = images
+        self.at.session_state["chat_history"] = ChatHistory()
+        self.at.session_state["greeted"] = False
+
+    def chat(self, question: str):
+        self.at.text_input[0].input(question)
+        send = next(b for b in self.at.button if "Send" in b.label)
+        self._run(send.click())
+        self.settle()
+
+    def switch_narrator(self):
+        buttons = [b for b in self.at.sidebar.button if b.key and b.key.startswith("persona_")]
+        if len(buttons) > 1:
+            self._run(buttons[1].click())
+            # The new narrator is summoned, then greets
+            self.settle()
+
+    def journey(self) -> Dict:
+        started = time.perf_counter()
+        self._run()                 # landing page
+        self.upload()
+        self._run()                 # greeting
+        self.settle()
+        for i in range(self.turns):
+            self.chat(QUESTIONS[i % len(QUESTIONS)])
+        self.switch_narrator()
+        return {
+            "duration_s": time.perf_counter() - started,
+            "state_bytes": session_state_bytes(self.at),
+        }
+
+
+def run_level(model, concurrency: int, turns: int, timeout: float) -> Dict:
+    """Run `concurrency` visitors at once and summarize the level."""
+    rss_before = current_rss_mb()
+    visitors = [Visitor(model, turns, timeout) for _ in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        journeys = list(pool.map(lambda v: v.journey(), visitors))
+    wall = time.perf_counter() - started
+    rss_after = current_rss_mb()
+
+    reruns = [t for v in visitors for t in v.rerun_times]
+    return {
+        "concurrency": concurrency,
+        "journeys": len(journeys),
+        "errors": sum(v.errors for v in visitors),
+        "rerun_p50_ms": round(percentile(reruns, 50) * 1000, 1),
+        "rerun_p95_ms": round(percentile(reruns, 95) * 1000, 1),
+        "rerun_p99_ms": round(percentile(reruns, 99) * 1000, 1),
+        "journey_p95_s": round(percentile([j["duration_s"] for j in journeys], 95), 3),
+        "journeys_per_min": round(len(journeys) / wall * 60, 2),
+        "state_bytes_per_session": int(sum(j["state_bytes"] for j in journeys) / len(journeys)),
+        "rss_mb_per_session": round(max(0.0, rss_after - rss_before) / concurrency, 2),
+        "rss_mb": round(rss_after, 1),
+    }
+
+
+def find_saturation(levels: List[Dict], slo_ms: float, min_gain: float) -> Dict:
+    """
+    The saturation point is the last level that still meets the p95 rerun SLO
+    and improved throughput by at least min_gain over the previous level.
+    """
+    best = None
+    for prev, level in zip([None] + levels[:-1], levels):
+        if level["rerun_p95_ms"] > slo_ms or level["errors"]:
+            break
+        if prev and level["journeys_per_min"] < prev["journeys_per_min"] * (1 + min_gain):
+            break
+        best = level
+    return {
+        "max_concurrency": best["concurrency"] if best else 0,
+        "journeys_per_min": best["journeys_per_min"] if best else 0.0,
+        "slo_p95_rerun_ms": slo_ms,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless multi-session load test for app.py")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--turns", type=int, default=3, help="Chat turns per visitor")
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    parser.add_argument("--wiki-latency", type=float, default=0.02)
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 rerun SLO")
+    parser.add_argument("--min-gain", type=float, default=0.05, help="Throughput gain to keep ramping")
+    parser.add_argument("--timeout", type=float, default=60.0, help="AppTest per-run timeout (s)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    with FakeWikiServer(latency=args.wiki_latency) as wiki:
+        model = install_fakes({"base_latency": args.model_latency}, wiki_url=wiki.url)
+        prepare_concurrent_sessions()
+        levels = []
+        for concurrency in args.levels:
+            print(f"[load] {concurrency} concurrent visitors...", file=sys.stderr)
+            levels.append(run_level(model, concurrency, args.turns, args.timeout))
+            if levels[-1]["rerun_p95_ms"] > args.slo_ms:
+                break
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "levels": levels,
+        "saturation": find_saturation(levels, args.slo_ms, args.min_gain),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Offline benchmark suite for TimeTraveler AI.
+Runs the hot paths against local fakes and reports latency percentiles,
+throughput and peak RSS as JSON for regression comparison.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --iterations 20 --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json
+
+The report also includes a `-X importtime` cold start profile of app.py's
+imports (see benchmarks/import_profile.py).
+"""
+
+import argparse
+import json
+import math
+import platform
+import resource
+import sys
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.fakes import FakeWikiServer, install_fakes
+from benchmarks.import_profile import profile_imports
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(fn: Callable, iterations: int, warmup: int = 1, setup: Callable = None) -> Dict:
+    """Time fn() over several iterations and summarize the distribution."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "throughput_per_s": round(iterations / wall, 3) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def make_test_image(shade: int = 0):
+    """A small in-memory image for analyze_image (distinct shades hash differently)."""
+    try:
+        from PIL import Image, ImageDraw
+        image = Image.new("RGB", (640, 480), (180, 140, 90))
+        if shade:
+            # A gradient band whose position differs per shade
+            draw = ImageDraw.Draw(image)
+            for x in range(0, 640, 8):
+                draw.rectangle([x, 0, x + 7, 479], fill=((x * shade) % 256, (x + shade * 37) % 256, 90))
+        return image
+    except ImportError:
+        return b"fake-image"
+
+
+def build_scenarios(model) -> Dict[str, Dict]:
+    """
+    Benchmark scenarios keyed by name: {'fn': callable, 'setup': callable}.
+    Scenarios run cold (shared caches cleared before each iteration) unless
+    they set setup to None; the *_cached ones measure warm hits.
+    """
+    from utils import (
+        analyze_image, generate_dynamic_persona, generate_related_personas,
+        generate_full_persona_from_brief, generate_persona_response, generate_greeting
+    )
+    from image_fetcher import fetch_landmark_images
+    from batch_identify import identify_batch
+    from voice_engine import generate_speech, get_voice_settings_for_dynamic_persona
+    from benchmarks.fakes import LANDMARK_JSON, PERSONA_JSON, RELATED_JSON
+    from models import ChatHistory, ChatTurn, Landmark, Persona
+
+    image = make_test_image()
+    # An itinerary of 20 photos, 4 of them repeat shots
+    itinerary = [make_test_image(shade) for shade in range(1, 17)]
+    itinerary += itinerary[:4]
+    history = ChatHistory([
+        ChatTurn("user" if i % 2 == 0 else "assistant", model.filler(40))
+        for i in range(6)
+    ])
+    reply_text = model.filler(400)[:2000]
+    landmark = Landmark.from_dict(LANDMARK_JSON)
+    persona = Persona.from_dict(PERSONA_JSON)
+    voice = get_voice_settings_for_dynamic_persona(persona)
+
+    def full_flow():
+        analysis = analyze_image(image, model)
+        persona = generate_dynamic_persona(analysis, model)
+        generate_related_personas(analysis, model)
+        name = analysis.get("landmark_name", "monument")
+        fetch_landmark_images(name, {"wikipedia_search": name})
+        greeting = generate_greeting(None, None, model, persona, analysis)
+        generate_speech(greeting, get_voice_settings_for_dynamic_persona(persona))
+
+    return {
+        "analyze_image": {"fn": lambda: analyze_image(image, model)},
+        "generate_dynamic_persona": {"fn": lambda: generate_dynamic_persona(landmark, model)},
+        "generate_dynamic_persona_streamed": {"fn": lambda: generate_dynamic_persona(
+            landmark, model, on_field=lambda key, value: None
+        )},
+        "generate_related_personas": {"fn": lambda: generate_related_personas(landmark, model)},
+        "generate_full_persona_from_brief": {"fn": lambda: generate_full_persona_from_brief(RELATED_JSON[1], landmark, model)},
+        "generate_persona_response": {"fn": lambda: generate_persona_response(
+            None, None, "Why are the pillars musical?", history, model, persona, landmark
+        )},
+        "generate_dynamic_persona_cached": {"fn": lambda: generate_dynamic_persona(landmark, model), "setup": None},
+        "fetch_landmark_images": {
+            "fn": lambda: fetch_landmark_images("Nellaiappar Temple", {"wikipedia_search": "Nellaiappar Temple"}),
+        },
+        "generate_speech": {"fn": lambda: generate_speech(reply_text, voice)},
+        "generate_speech_cached": {"fn": lambda: generate_speech(reply_text, voice), "setup": None},
+        "upload_to_greeting": {"fn": full_flow},
+        "identify_batch_20": {"fn": lambda: identify_batch(itinerary, model), "images": len(itinerary)},
+    }
+
+
+def check_structured_calls(model) -> List[str]:
+    """
+    Run each schema-constrained call once and return what fell back. The fake
+    model converts generation configs like the SDK does, so a schema the SDK
+    rejects shows up here instead of as a fast fallback in the timings.
+    """
+    from utils import analyze_image, generate_dynamic_persona, generate_related_personas, generate_suggested_questions
+    from batch_identify import analyze_image_pack
+    from benchmarks.fakes import LANDMARK_JSON, PERSONA_JSON, SUGGESTIONS_JSON
+    from models import Landmark
+    from shared_cache import clear_caches
+
+    clear_caches()
+    image = make_test_image()
+    landmark = Landmark.from_dict(LANDMARK_JSON)
+    persona = generate_dynamic_persona(landmark, model)
+    streamed = generate_dynamic_persona(landmark, model, on_field=lambda key, value: None)
+    clear_caches()
+    checks = {
+        "analyze_image": analyze_image(image, model).identified,
+        "analyze_image_pack": all(r.identified for r in analyze_image_pack([image, make_test_image(1)], model)),
+        "generate_dynamic_persona": persona.name == PERSONA_JSON["name"] and bool(persona.greeting),
+        "generate_dynamic_persona_streamed": streamed.name == PERSONA_JSON["name"],
+        "generate_related_personas": bool(generate_related_personas(landmark, model)),
+        "generate_suggested_questions": generate_suggested_questions(persona, landmark, model) == SUGGESTIONS_JSON,
+    }
+    clear_caches()
+    return [name for name, ok in checks.items() if not ok]
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List scenarios whose p95 regressed by more than threshold (fraction)."""
+    regressions = []
+    for name, stats in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or not base.get("p95_ms"):
+            continue
+        change = (stats["p95_ms"] - base["p95_ms"]) / base["p95_ms"]
+        marker = "REGRESSION" if change > threshold else "ok"
+        print(f"{name:34s} p95 {base['p95_ms']:9.2f} -> {stats['p95_ms']:9.2f} ms ({change:+.1%}) {marker}", file=sys.stderr)
+        if change > threshold:
+            regressions.append(name)
+
+    cold, base_cold = current.get("cold_start"), baseline.get("cold_start")
+    if cold and base_cold and base_cold.get("total_ms"):
+        change = (cold["total_ms"] - base_cold["total_ms"]) / base_cold["total_ms"]
+        marker = "REGRESSION" if change > threshold else "ok"
+        print(f"{'cold_start_imports':34s} total {base_cold['total_ms']:7.1f} -> {cold['total_ms']:9.1f} ms ({change:+.1%}) {marker}", file=sys.stderr)
+        if change > threshold:
+            regressions.append("cold_start_imports")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline TimeTraveler AI benchmarks")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="Scenario names to run")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Fake model base latency (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0005, help="Fake model per-token latency (s)")
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--wiki-latency", type=float, default=0.02)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON to compare p95 against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p95 regression (fraction)")
+    parser.add_argument("--skip-import-profile", action="store_true", help="Skip the -X importtime cold start profile")
+    args = parser.parse_args(argv)
+
+    with FakeWikiServer(latency=args.wiki_latency) as wiki:
+        model = install_fakes({
+            "base_latency": args.model_latency,
+            "per_token_latency": args.token_latency,
+            "reply_tokens": args.reply_tokens,
+        }, wiki_url=wiki.url)
+
+        from shared_cache import clear_caches
+
+        failed = check_structured_calls(model)
+        if failed:
+            print(f"[ERROR] Structured calls fell back: {', '.join(failed)}", file=sys.stderr)
+            return 1
+
+        scenarios = build_scenarios(model)
+        results = {}
+        for name, scenario in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            print(f"[bench] {name}...", file=sys.stderr)
+            results[name] = measure(scenario["fn"], args.iterations, setup=scenario.get("setup", clear_caches))
+            if scenario.get("images"):
+                results[name]["images_per_min"] = round(results[name]["throughput_per_s"] * scenario["images"] * 60, 1)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "scenarios": results,
+    }
+    if not args.skip_import_profile:
+        print("[bench] cold start import profile...", file=sys.stderr)
+        report["cold_start"] = profile_imports()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
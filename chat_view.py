@@ -0,0 +1,141 @@
+"""
+Chat rendering for TimeTraveler AI.
+Renders only a live window of recent turns; older turns are collapsed into a
+paginated archive so a rerun costs O(window) instead of O(conversation).
+"""
+
+import streamlit as st
+import base64
+from typing import Dict, List, Optional
+
+from immersive_view import render_immersive_view
+from voice_engine import get_audio_mime
+from audio_profiles import sniff_audio_mime
+from audio_stream import has_stream, get_stream_audio_b64, render_stream_player
+from journey_store import load_turn_audio
+from models import ChatHistory, ChatTurn
+from tracing import traced, current_span
+from templates import compile_template, render
+
+# Most recent messages rendered in full (with audio players)
+LIVE_MESSAGES = 6
+# Messages per page in the collapsed archive
+ARCHIVE_PAGE_SIZE = 10
+
+USER_MESSAGE_TEMPLATE = compile_template(
+    "chat_user", '<div class="chat-user"><strong>🧑 You:</strong><br>{{ content }}</div>'
+)
+ASSISTANT_MESSAGE_TEMPLATE = compile_template(
+    "chat_assistant", '<div class="chat-ai"><strong>{{ avatar }} {{ name }}:</strong><br>{{ content }}</div>'
+)
+
+
+def render_message(
+    msg: ChatTurn,
+    index: int,
+    persona: Dict,
+    audio_enabled: bool = True,
+    autoplay: bool = False,
+    show_audio: bool = True
+):
+    """Render a single chat message in its own keyed container."""
+    with st.container(key=f"chat_msg_{index}"):
+        if msg.role == "user":
+            st.markdown(render(USER_MESSAGE_TEMPLATE, content=msg.content), unsafe_allow_html=True)
+            return
+
+        st.markdown(render(
+            ASSISTANT_MESSAGE_TEMPLATE,
+            avatar=persona.get("avatar", "👤"), name=persona.get("name", "Guide"), content=msg.content
+        ), unsafe_allow_html=True)
+        if show_audio:
+            render_message_audio(msg, audio_enabled, autoplay)
+
+
+def render_message_audio(msg: ChatTurn, audio_enabled: bool, autoplay: bool = False):
+    """Render the audio player for an assistant message, if it has audio."""
+    if not audio_enabled:
+        return
+    
+    token = msg.audio_stream
+    if token and has_stream(token):
+        # Keep the full audio once synthesis finishes, for replay after the stream expires
+        if not msg.audio:
+            msg.audio = get_stream_audio_b64(token)
+        render_stream_player(token, autoplay=autoplay)
+        return
+    
+    if load_turn_audio(msg):
+        # st.audio serves bytes through the media file manager instead of
+        # re-sending a base64 data URI in the page delta on every rerun
+        audio = base64.b64decode(msg.audio)
+        # Turns of one chat can differ in format when the audio profile changes
+        st.audio(audio, format=sniff_audio_mime(audio, get_audio_mime()), autoplay=autoplay)
+
+
+def render_archive(history: ChatHistory, persona: Dict, end: int):
+    """Render messages [0, end) as a collapsed, paginated archive (text only)."""
+    if end <= 0:
+        return
+
+    with st.expander(f"📜 Earlier conversation ({end} messages)", expanded=False):
+        pages = (end + ARCHIVE_PAGE_SIZE - 1) // ARCHIVE_PAGE_SIZE
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                "Page", min_value=1, max_value=pages, value=pages,
+                key="chat_archive_page"
+            )
+        start = (page - 1) * ARCHIVE_PAGE_SIZE
+        for i in range(start, min(start + ARCHIVE_PAGE_SIZE, end)):
+            render_message(history[i], i, persona, show_audio=False)
+
+
+@traced()
+def render_chat_history(
+    history: ChatHistory,
+    persona: Dict,
+    audio_enabled: bool = True,
+    immersive_mode: bool = False,
+    landmark_images: Optional[List[Dict]] = None,
+    latest_index: Optional[int] = None
+):
+    """
+    Render the conversation: archive of older turns, then the live window.
+    latest_index marks the message that autoplays / gets the immersive view;
+    pass None while a reply is still pending.
+    """
+    live_start = max(0, len(history) - LIVE_MESSAGES)
+    current_span().set(messages=len(history), rendered=len(history) - live_start)
+    render_archive(history, persona, live_start)
+
+    for i in range(live_start, len(history)):
+        msg = history[i]
+        if i == latest_index and msg.role != "user":
+            render_latest_reply(msg, i, persona, audio_enabled, immersive_mode, landmark_images)
+        else:
+            render_message(msg, i, persona, audio_enabled, autoplay=False)
+
+
+def render_latest_reply(
+    msg: ChatTurn,
+    index: int,
+    persona: Dict,
+    audio_enabled: bool = True,
+    immersive_mode: bool = False,
+    landmark_images: Optional[List[Dict]] = None
+):
+    """Render the newest assistant reply, in the immersive view if enabled."""
+    if immersive_mode and landmark_images:
+        with st.container(key=f"chat_msg_{index}"):
+            render_immersive_view(
+                images=landmark_images,
+                persona_data=persona,
+                subtitle_text=msg.content,
+                show_audio_visualizer=audio_enabled and bool(msg.audio or msg.audio_stream),
+                audio_ref=f"msg_{index}"
+            )
+            # Audio player below immersive view
+            render_message_audio(msg, audio_enabled, autoplay=True)
+    else:
+        render_message(msg, index, persona, audio_enabled, autoplay=True)
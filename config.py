@@ -0,0 +1,29 @@
+"""
+Deployment configuration for TimeTraveler AI.
+Settings are read from environment variables first, then Streamlit secrets.
+"""
+
+import os
+import streamlit as st
+from typing import Any
+
+
+def get_setting(name: str, default: Any = None) -> Any:
+    """Read a deployment setting from the environment or st.secrets."""
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        # No secrets.toml present
+        pass
+    return default
+
+
+def get_bool_setting(name: str, default: bool = False) -> bool:
+    """Read a boolean setting ("1", "true", "yes", "on" are truthy)."""
+    value = get_setting(name, default)
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
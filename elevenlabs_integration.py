@@ -1,11 +1,13 @@
 import requests
-def elevenlabs_tts(text, api_key, voice_id="21m00Tcm4TlvDq8ikWAM"):
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    headers = {
-        "xi-api-key": api_key,
-        "Content-Type": "application/json"
-    }
-    data = {
+from io import BytesIO
+from typing import Iterator
+
+ELEVENLABS_API = "https://api.elevenlabs.io/v1"
+DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"
+
+
+def _request_body(text):
+    return {
         "text": text,
         "model_id": "eleven_monolingual_v1",
         "voice_settings":  {
@@ -13,7 +15,38 @@ def elevenlabs_tts(text, api_key, voice_id="21m00Tcm4TlvDq8ikWAM"):
             "similarity_boost": 0.75
         }
     }
-    response = requests.post(url, json=data, headers=headers)
+
+
+def elevenlabs_tts(text, api_key, voice_id=DEFAULT_VOICE_ID):
+    url = f"{ELEVENLABS_API}/text-to-speech/{voice_id}"
+    headers = {
+        "xi-api-key": api_key,
+        "Content-Type": "application/json"
+    }
+    response = requests.post(url, json=_request_body(text), headers=headers)
     if response.status_code == 200:
         return BytesIO(response.content)
     return None
+
+
+def elevenlabs_tts_stream(text, api_key, voice_id=DEFAULT_VOICE_ID) -> Iterator[bytes]:
+    """Stream MP3 chunks from the ElevenLabs streaming endpoint as they arrive."""
+    url = f"{ELEVENLABS_API}/text-to-speech/{voice_id}/stream"
+    headers = {
+        "xi-api-key": api_key,
+        "Content-Type": "application/json"
+    }
+    with requests.post(url, json=_request_body(text), headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            return
+        for chunk in response.iter_content(chunk_size=4096):
+            if chunk:
+                yield chunk
+
+
+def elevenlabs_voices(api_key):
+    """List voices available to this ElevenLabs account."""
+    response = requests.get(f"{ELEVENLABS_API}/voices", headers={"xi-api-key": api_key})
+    if response.status_code == 200:
+        return response.json().get("voices", [])
+    return []
@@ -3,11 +3,14 @@ Image Fetcher for TimeTraveler AI.
 Fetches real images from Wikipedia/Wikimedia Commons with reliable fallbacks.
 """
 
-import requests
-import streamlit as st
-from typing import List, Dict
+from typing import List, Dict, Optional
+import re
 import time
 import hashlib
+from functools import lru_cache
+
+from tracing import traced, current_span
+from shared_cache import get_cache, cache_key
 
 
 # Wikipedia API endpoint
@@ -22,11 +25,54 @@ PLACEHOLDER_IMAGES = [
     "https://images.unsplash.com/photo-1545126550-ece49ce5ca40?w=800",  # Historical building
 ]
 
+# Widths offered to the browser through srcset (never above the fetched width)
+RENDITION_WIDTHS = [320, 640, 960, 1280]
+# Tiny rendition used as a blurred placeholder while the real image loads
+PLACEHOLDER_WIDTH = 32
+
+_WIKIMEDIA_THUMB = re.compile(r"^(https://upload\.wikimedia\.org/.+/)(\d+)px-([^/?]+)$")
+# Only seeded picsum URLs return the same picture at every size
+_PICSUM = re.compile(r"^(https://picsum\.photos/seed/[^/]+/)(\d+)/(\d+)$")
+_UNSPLASH_WIDTH = re.compile(r"([?&])\s*w=(\d+)")
+
+
+def _rendition(url: str, width: int) -> Optional[str]:
+    """URL of the same image scaled to width, for hosts that support it."""
+    match = _WIKIMEDIA_THUMB.match(url)
+    if match:
+        return f"{match.group(1)}{width}px-{match.group(3)}"
+    match = _PICSUM.match(url)
+    if match:
+        w, h = int(match.group(2)), int(match.group(3))
+        return f"{match.group(1)}{width}/{max(1, round(h * width / w))}"
+    if "images.unsplash.com" in url and _UNSPLASH_WIDTH.search(url):
+        return _UNSPLASH_WIDTH.sub(lambda m: f"{m.group(1)}w={width}", url)
+    return None
+
+
+def _base_width(url: str) -> Optional[int]:
+    for pattern, group in ((_WIKIMEDIA_THUMB, 2), (_PICSUM, 2), (_UNSPLASH_WIDTH, 2)):
+        match = pattern.search(url)
+        if match:
+            return int(match.group(group))
+    return None
 
-def init_image_cache():
-    """Initialize image cache in session state."""
-    if 'image_cache' not in st.session_state:
-        st.session_state.image_cache = {}
+
+@lru_cache(maxsize=1024)
+def get_image_renditions(url: str) -> Dict:
+    """
+    Responsive variants of an image URL: a srcset string and a tiny placeholder.
+    Both are empty for hosts without on-the-fly resizing.
+    Memoized per URL; callers must not mutate the result.
+    """
+    base = _base_width(url)
+    if not base or not _rendition(url, base):
+        return {"srcset": "", "placeholder": ""}
+    widths = [w for w in RENDITION_WIDTHS if w < base] + [base]
+    return {
+        "srcset": ", ".join(f"{_rendition(url, w)} {w}w" for w in widths),
+        "placeholder": _rendition(url, PLACEHOLDER_WIDTH),
+    }
 
 
 def get_reliable_fallback_images(landmark_name: str = "", count: int = 4) -> List[Dict]:
@@ -49,18 +95,21 @@ def get_reliable_fallback_images(landmark_name: str = "", count: int = 4) -> Lis
     return images
 
 
+@traced()
 def search_wikipedia_images(search_term: str, limit: int = 5) -> List[Dict]:
     """
     Search for images on Wikipedia.
     Returns list of dicts with 'url' and 'caption'. 
     """
     try: 
-        init_image_cache()
-        
-        # Check cache
-        cache_key = f"wiki_{search_term}_{limit}"
-        if cache_key in st.session_state. image_cache:
-            return st.session_state.image_cache[cache_key]
+        # Check cache (shared by every session and worker)
+        cache = get_cache("wikipedia")
+        key = cache_key(search_term, limit)
+        cached = cache.get(key)
+        current_span().set(cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+        import requests
         
         images = []
         
@@ -150,9 +199,11 @@ def search_wikipedia_images(search_term: str, limit: int = 5) -> List[Dict]:
             except Exception:
                 continue
         
+        current_span().set(images=len(images))
+        
         # Cache results
         if images:
-            st.session_state.image_cache[cache_key] = images
+            cache.set(key, images[: limit])
         
         return images[: limit]
         
@@ -166,8 +217,6 @@ def fetch_landmark_images(landmark_name: str, landmark_info: Dict = None) -> Lis
     Main function to fetch images for a landmark.
     Tries Wikipedia first, falls back to reliable placeholders.
     """
-    init_image_cache()
-    
     # Determine search term
     if landmark_info:
         search_term = landmark_info.get("wikipedia_search") or landmark_info.get("name") or landmark_name
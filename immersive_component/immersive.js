@@ -0,0 +1,231 @@
+// Immersive view component for TimeTraveler AI.
+// Loaded once per iframe; Streamlit only sends small JSON props on each rerun.
+
+(function () {
+    const SLIDE_INTERVAL_MS = 6000;
+    const FRAME_HEIGHT = 750;
+
+    // Slides switch only once the next image is decoded, so transitions never
+    // show a half-painted frame; the slide after the visible one is preloaded.
+    const PRELOAD_AHEAD = 1;
+    // Rendered width of a slide image (see .slide img max-width)
+    const IMAGE_SIZES = "80vw";
+
+    let images = [];
+    let imagesKey = "";
+    let current = 0;
+    let timer = null;
+    let lastSubtitle = null;
+    let slides = [];        // [{el, img, state, promise}]
+    let tabHidden = document.hidden;
+    let offscreen = false;
+
+    function sendMessage(type, data) {
+        window.parent.postMessage(
+            Object.assign({ isStreamlitMessage: true, type: type }, data),
+            "*"
+        );
+    }
+
+    function buildSlides() {
+        const slideshow = document.getElementById("slideshow");
+        const indicators = document.getElementById("indicators");
+        slideshow.textContent = "";
+        indicators.textContent = "";
+        slides = [];
+
+        images.forEach((img, i) => {
+            const slide = document.createElement("div");
+            slide.className = "slide" + (i === current ? " active" : "");
+
+            if (img.placeholder) {
+                // Low-quality placeholder, blurred, shown until the image decodes
+                const lqip = document.createElement("div");
+                lqip.className = "lqip";
+                lqip.style.backgroundImage = "url(\"" + img.placeholder + "\")";
+                slide.appendChild(lqip);
+            }
+
+            // src/srcset are assigned in loadSlide(), not here, so hidden slides
+            // cost nothing until they are about to be shown
+            const el = document.createElement("img");
+            el.alt = img.caption;
+            el.decoding = "async";
+            slide.appendChild(el);
+            slideshow.appendChild(slide);
+            slides.push({ el: slide, img: el, state: "idle", promise: null });
+
+            const dot = document.createElement("div");
+            dot.className = "indicator" + (i === current ? " active" : "");
+            dot.onclick = () => goTo(i, false);
+            indicators.appendChild(dot);
+        });
+
+        updateCaption();
+        if (slides.length) {
+            loadSlide(current, true).then(preloadAhead);
+        }
+        scheduleNext();
+    }
+
+    function loadSlide(i, priority) {
+        const slide = slides[i];
+        if (slide.promise) return slide.promise;
+
+        const info = images[i];
+        const img = slide.img;
+        img.fetchPriority = priority ? "high" : "low";
+        img.sizes = IMAGE_SIZES;
+        if (info.srcset) img.srcset = info.srcset;
+        img.src = info.url;
+        slide.state = "loading";
+
+        slide.promise = img.decode()
+            .catch(() => {
+                // A missing rendition: retry once with the plain URL
+                if (!img.srcset) throw new Error("image failed");
+                img.removeAttribute("srcset");
+                img.src = info.url;
+                return img.decode();
+            })
+            .then(() => {
+                slide.state = "ready";
+                slide.el.classList.add("loaded");
+            })
+            .catch(() => {
+                // Keep the placeholder (if any) and skip this slide when rotating
+                slide.state = "broken";
+                slide.el.classList.add("broken");
+            });
+        return slide.promise;
+    }
+
+    function preloadAhead() {
+        for (let step = 1; step <= PRELOAD_AHEAD && step < slides.length; step++) {
+            loadSlide((current + step) % slides.length, false);
+        }
+    }
+
+    function paused() {
+        return tabHidden || offscreen || images.length < 2;
+    }
+
+    function scheduleNext() {
+        if (timer) clearTimeout(timer);
+        timer = null;
+        if (paused()) return;
+        timer = setTimeout(() => changeSlide(1, true), SLIDE_INTERVAL_MS);
+    }
+
+    function show(i) {
+        const dots = document.querySelectorAll(".indicator");
+        if (!slides.length) return;
+
+        slides[current].el.classList.remove("active");
+        dots[current].classList.remove("active");
+
+        current = i;
+
+        slides[current].el.classList.add("active");
+        dots[current].classList.add("active");
+        updateCaption();
+        preloadAhead();
+    }
+
+    function goTo(i, waitForDecode) {
+        if (!slides.length) return;
+        const ready = loadSlide(i, true);
+        if (waitForDecode) {
+            // Automatic rotation: switch only when the frame is ready to paint
+            ready.then(() => {
+                if (slides[i] && slides[i].state === "ready") show(i);
+                scheduleNext();
+            });
+        } else {
+            // User navigation: switch now; the placeholder covers the load
+            show(i);
+            scheduleNext();
+        }
+    }
+
+    function changeSlide(dir, waitForDecode) {
+        if (!images.length) return;
+        let next = current;
+        for (let step = 0; step < slides.length; step++) {
+            next = (next + dir + slides.length) % slides.length;
+            if (slides[next].state !== "broken") break;
+        }
+        goTo(next, waitForDecode);
+    }
+
+    function updateCaption() {
+        document.getElementById("caption").textContent = images.length ? images[current].caption : "";
+    }
+
+    function setVisualizer(active) {
+        const viz = document.getElementById("visualizer");
+        if (active && !viz.childElementCount) {
+            for (let i = 0; i < 20; i++) {
+                const bar = document.createElement("div");
+                bar.className = "viz-bar";
+                bar.style.animationDelay = (i * 0.05) + "s";
+                viz.appendChild(bar);
+            }
+        }
+        viz.classList.toggle("active", !!active);
+    }
+
+    function render(args) {
+        const nextImages = args.images || [];
+        const nextKey = JSON.stringify(nextImages);
+        // Only rebuild the slideshow when the image set actually changes
+        if (nextKey !== imagesKey) {
+            images = nextImages;
+            imagesKey = nextKey;
+            current = Math.min(args.current_index || 0, Math.max(images.length - 1, 0));
+            buildSlides();
+        }
+
+        const persona = args.persona || {};
+        document.getElementById("avatar").textContent = persona.avatar || "";
+        document.getElementById("name").textContent = persona.name || "";
+        document.getElementById("title").textContent = persona.title || "";
+        document.getElementById("era").textContent = persona.era || "";
+
+        if (args.subtitle !== lastSubtitle) {
+            const subtitle = document.getElementById("subtitle");
+            subtitle.textContent = args.subtitle || "";
+            // Restart the fade animation for a new line
+            subtitle.style.animation = "none";
+            void subtitle.offsetHeight;
+            subtitle.style.animation = "";
+            lastSubtitle = args.subtitle;
+        }
+
+        setVisualizer(args.show_audio_visualizer && args.audio_ref);
+    }
+
+    document.getElementById("prev").onclick = () => changeSlide(-1, false);
+    document.getElementById("next").onclick = () => changeSlide(1, false);
+
+    // Pause rotation while the tab is hidden or the view is scrolled away
+    document.addEventListener("visibilitychange", () => {
+        tabHidden = document.hidden;
+        scheduleNext();
+    });
+    if ("IntersectionObserver" in window) {
+        new IntersectionObserver((entries) => {
+            offscreen = !entries[0].isIntersecting;
+            scheduleNext();
+        }).observe(document.querySelector(".container"));
+    }
+
+    window.addEventListener("message", (event) => {
+        if (event.data && event.data.type === "streamlit:render") {
+            render(event.data.args || {});
+        }
+    });
+
+    sendMessage("streamlit:componentReady", { apiVersion: 1 });
+    sendMessage("streamlit:setFrameHeight", { height: FRAME_HEIGHT });
+})();
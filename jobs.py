@@ -0,0 +1,154 @@
+"""
+Background jobs for TimeTraveler AI.
+Model and TTS work runs on a process-wide worker pool instead of inside the
+Streamlit script thread, so a rerun (another click, a reconnect) no longer
+abandons a half-finished reply. Jobs have stable IDs derived from what they
+compute: submitting the same work twice returns the existing job. The UI
+keeps the ID in session_state and polls until the job is done.
+
+Speculative work (answers prepared before anyone asks) runs on its own small
+pool, so prefetching can never hold every worker while a visitor waits for a
+reply. A speculative job that someone starts waiting on is promoted to the
+interactive pool if it hasn't started yet.
+
+Job functions run without a Streamlit script context: they must not touch
+st.* and should receive everything they need as arguments.
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import streamlit as st
+
+from config import get_setting
+from metrics import track_inflight
+
+DEFAULT_WORKERS = 4
+DEFAULT_SPECULATIVE_WORKERS = 1
+# Finished jobs are kept this long for late pollers, then pruned
+JOB_TTL_SECONDS = 15 * 60
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class Job:
+    """One unit of background work and its outcome."""
+
+    __slots__ = ("id", "kind", "status", "result", "error", "progress", "created", "finished", "_done", "_call")
+
+    def __init__(self, job_id: str, kind: str):
+        self.id = job_id
+        self.kind = kind
+        self.status = PENDING
+        self.result = None
+        self.error: Optional[str] = None
+        # Partial results a job publishes while running (e.g. streamed fields)
+        self.progress: Dict[str, Any] = {}
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self._done = threading.Event()
+        # (fn, args, kwargs) until the job starts
+        self._call = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+
+class JobQueue:
+    """Deduplicating job registry on top of an interactive and a speculative thread pool."""
+
+    def __init__(self, workers: int, speculative_workers: int = DEFAULT_SPECULATIVE_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.speculative_pool = ThreadPoolExecutor(max_workers=max(1, speculative_workers), thread_name_prefix="speculative")
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, key: str, fn: Callable, *args, progress_arg: str = None,
+               speculative: bool = False, **kwargs) -> str:
+        """
+        Run fn(*args, **kwargs) in the background and return the job ID.
+        Work with the same kind and key is only queued once (failed jobs may be retried).
+        With progress_arg, fn also gets a callback(key, value) under that name
+        that records partial results in job.progress. Speculative jobs run on
+        the speculative pool.
+        """
+        job_id = job_id_for(kind, key)
+        with self._lock:
+            self._prune()
+            existing = self.jobs.get(job_id)
+            if existing and existing.status != FAILED:
+                return job_id
+            job = self.jobs[job_id] = Job(job_id, kind)
+
+        if progress_arg:
+            kwargs[progress_arg] = job.progress.__setitem__
+        job._call = (fn, args, kwargs)
+        (self.speculative_pool if speculative else self.pool).submit(self._run, job)
+        return job_id
+
+    def promote(self, job_id: str):
+        """Also queue a job that hasn't started on the interactive pool; the first pool to reach it runs it."""
+        job = self.jobs.get(job_id)
+        if job and job.status == PENDING:
+            self.pool.submit(self._run, job)
+
+    def _run(self, job: Job):
+        with self._lock:
+            if job.status != PENDING:
+                return
+            job.status = RUNNING
+            fn, args, kwargs = job._call
+            job._call = None
+        try:
+            with track_inflight("jobs"):
+                job.result = fn(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            print(f"[ERROR] Job {job.kind} {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            job._done.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished < cutoff]:
+            del self.jobs[job_id]
+
+
+def job_id_for(kind: str, key: str) -> str:
+    """Stable job ID for a kind of work and its identifying key."""
+    return f"{kind}-{hashlib.sha256(key.encode()).hexdigest()[:16]}"
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue shared by all sessions."""
+    return JobQueue(
+        int(get_setting("JOB_WORKERS", DEFAULT_WORKERS)),
+        int(get_setting("SPECULATIVE_WORKERS", DEFAULT_SPECULATIVE_WORKERS))
+    )
+
+
+def submit_job(kind: str, key: str, fn: Callable, *args, **kwargs) -> str:
+    return get_job_queue().submit(kind, key, fn, *args, **kwargs)
+
+
+def promote_job(job_id: Optional[str]):
+    if job_id:
+        get_job_queue().promote(job_id)
+
+
+def get_job(job_id: Optional[str]) -> Optional[Job]:
+    return get_job_queue().get(job_id) if job_id else None
@@ -0,0 +1,225 @@
+"""
+Journey Store for TimeTraveler AI.
+Persists a visit (landmark, narrator, images and chat turns) to SQLite with
+audio in a content-addressed blob directory, keyed by the journey ID in the
+URL query params. A reconnecting tablet rehydrates from here instead of
+re-identifying the photo or regenerating personas and audio.
+
+Turns are written incrementally as they happen. Audio for turns outside the
+live chat window is dropped from session_state once saved and loaded back
+from its blob only when it is rendered again.
+
+Journeys idle for JOURNEY_TTL_DAYS are deleted, along with audio blobs no
+remaining turn refers to, in a sweep that runs at most hourly when a new
+journey starts.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import streamlit as st
+
+from config import get_setting
+from models import ChatHistory, ChatTurn, Landmark, Persona, VoiceSettings
+
+DEFAULT_JOURNEY_DIR = "journeys"
+DEFAULT_TTL_DAYS = 30
+# Expired journeys and unreferenced blobs are swept at most this often
+SWEEP_INTERVAL = 3600
+# Unreferenced blobs younger than this are kept: their turn may not be saved yet
+BLOB_GRACE_SECONDS = 3600
+# Session keys saved with a journey (chat turns are stored separately)
+JOURNEY_FIELDS = ["landmark_info", "current_persona", "related_personas", "landmark_images", "voice_settings"]
+# Fields stored as records in session_state
+RECORD_FIELDS = {"landmark_info": Landmark, "current_persona": Persona, "voice_settings": VoiceSettings}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journeys (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS turns (
+    journey_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    audio_ref TEXT,
+    PRIMARY KEY (journey_id, idx)
+);
+"""
+
+
+class JourneyStore:
+    """SQLite journey metadata and turns plus a blob directory for audio."""
+
+    def __init__(self, root: str, ttl_days: float = DEFAULT_TTL_DAYS):
+        self.root = root
+        self.ttl = ttl_days * 24 * 3600
+        self._last_sweep = 0.0
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db_path = os.path.join(root, "journeys.db")
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    # Journeys
+    def create(self, fields: Dict) -> str:
+        if time.time() - self._last_sweep >= SWEEP_INTERVAL:
+            self._last_sweep = time.time()
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[WARNING] Journey sweep failed: {e}")
+        journey_id = secrets.token_urlsafe(9)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO journeys (id, created, updated, data) VALUES (?, ?, ?, ?)",
+                (journey_id, now, now, json.dumps(fields, ensure_ascii=False))
+            )
+        return journey_id
+
+    def update(self, journey_id: str, fields: Dict, clear_turns: bool = False):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE journeys SET updated = ?, data = ? WHERE id = ?",
+                (time.time(), json.dumps(fields, ensure_ascii=False), journey_id)
+            )
+            if clear_turns:
+                conn.execute("DELETE FROM turns WHERE journey_id = ?", (journey_id,))
+
+    def sweep(self):
+        """Delete journeys idle past the TTL, their turns, and audio blobs no turn refers to."""
+        cutoff = time.time() - self.ttl
+        with self._lock, self._connect() as conn:
+            expired = conn.execute(
+                "DELETE FROM turns WHERE journey_id IN (SELECT id FROM journeys WHERE updated < ?)", (cutoff,)
+            ).rowcount
+            journeys = conn.execute("DELETE FROM journeys WHERE updated < ?", (cutoff,)).rowcount
+            referenced = {
+                ref for (ref,) in conn.execute("SELECT DISTINCT audio_ref FROM turns WHERE audio_ref IS NOT NULL")
+            }
+
+        grace = time.time() - BLOB_GRACE_SECONDS
+        blobs = 0
+        for name in os.listdir(self.blob_dir):
+            path = os.path.join(self.blob_dir, name)
+            try:
+                if name not in referenced and os.path.getmtime(path) < grace:
+                    os.remove(path)
+                    blobs += 1
+            except OSError:
+                pass
+        if journeys or blobs:
+            print(f"[INFO] Journey sweep removed {journeys} journeys ({expired} turns) and {blobs} audio blobs")
+
+    def load(self, journey_id: str) -> Optional[Dict]:
+        """Journey fields plus text-only turns (audio stays in blobs)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM journeys WHERE id = ?", (journey_id,)).fetchone()
+            if not row:
+                return None
+            turns = conn.execute(
+                "SELECT role, content, audio_ref FROM turns WHERE journey_id = ? ORDER BY idx",
+                (journey_id,)
+            ).fetchall()
+        data = json.loads(row[0])
+        for key, record in RECORD_FIELDS.items():
+            if data.get(key):
+                data[key] = record.from_dict(data[key])
+        data["chat_history"] = ChatHistory([
+            ChatTurn(role, content, audio_ref=audio_ref, saved=True)
+            for role, content, audio_ref in turns
+        ])
+        return data
+
+    # Turns
+    def save_turn(self, journey_id: str, index: int, msg: ChatTurn):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO turns (journey_id, idx, role, content, audio_ref) VALUES (?, ?, ?, ?, ?)",
+                (journey_id, index, msg.role, msg.content, msg.audio_ref)
+            )
+            # The TTL counts from the last activity
+            conn.execute("UPDATE journeys SET updated = ? WHERE id = ?", (time.time(), journey_id))
+
+    # Audio blobs
+    def put_audio(self, audio_b64: str) -> str:
+        """Store base64 audio as a content-addressed blob and return its ref."""
+        data = base64.b64decode(audio_b64)
+        ref = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.blob_dir, ref)
+        if os.path.exists(path):
+            # Reused: restart the grace period so a sweep can't take it before its turn is saved
+            os.utime(path)
+        else:
+            tmp = f"{path}.{secrets.token_hex(4)}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return ref
+
+    def get_audio(self, ref: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.blob_dir, ref), "rb") as f:
+                return base64.b64encode(f.read()).decode()
+        except OSError:
+            return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_journey_store() -> JourneyStore:
+    """Process-wide journey store."""
+    return JourneyStore(
+        get_setting("JOURNEY_DIR", DEFAULT_JOURNEY_DIR),
+        float(get_setting("JOURNEY_TTL_DAYS", DEFAULT_TTL_DAYS))
+    )
+
+
+def journey_fields(state) -> Dict:
+    """JSON-ready journey fields from session_state."""
+    fields = {}
+    for key in JOURNEY_FIELDS:
+        value = state.get(key)
+        fields[key] = value.to_dict() if hasattr(value, "to_dict") else value
+    return fields
+
+
+def save_turns(journey_id: str, history: ChatHistory, live_window: int):
+    """
+    Write new turns and newly available audio, then drop audio that is saved
+    and outside the live window from memory.
+    """
+    store = get_journey_store()
+    live_start = len(history) - live_window
+    for i, msg in enumerate(history):
+        dirty = not msg.saved
+        if msg.audio and not msg.audio_ref:
+            msg.audio_ref = store.put_audio(msg.audio)
+            dirty = True
+        if dirty:
+            store.save_turn(journey_id, i, msg)
+            msg.saved = True
+        if i < live_start and msg.audio_ref:
+            msg.audio = None
+
+
+def load_turn_audio(msg: ChatTurn) -> Optional[str]:
+    """Lazily bring a saved turn's audio back into memory."""
+    if not msg.audio and msg.audio_ref:
+        msg.audio = get_journey_store().get_audio(msg.audio_ref)
+    return msg.audio
@@ -0,0 +1,97 @@
+"""
+Incremental JSON parsing for TimeTraveler AI.
+Reads a streamed model reply chunk by chunk and emits each top-level field of
+the JSON object as soon as its value closes, so the UI can use early fields
+(name, title, avatar, voice) while later ones are still being generated.
+"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JSONFieldStream:
+    """
+    Feed text chunks of one JSON object; get back (key, value) pairs as they complete.
+
+        stream = JSONFieldStream()
+        for chunk in response:
+            for key, value in stream.feed(chunk.text):
+                ...
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._pos = 0               # next character to scan
+        self._depth = 0             # nesting depth; the object itself is depth 1
+        self._in_string = False
+        self._escaped = False
+        self._started = False       # seen the opening brace
+        self._key: Optional[str] = None
+        self._key_start = None      # buffer index of the current key's opening quote
+        self._value_start = None    # buffer index just after the ':'
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add text and return fields completed by it, in order."""
+        self.buffer += chunk or ""
+        completed = []
+        buf = self.buffer
+
+        while self._pos < len(buf) and not self.done:
+            i = self._pos
+            ch = buf[i]
+            self._pos += 1
+
+            if not self._started:
+                # Skip anything before the object (e.g. a ```json fence)
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None:
+                        self._key = self._decode(buf[self._key_start:i + 1])
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(buf[self._value_start:i] if self._value_start is not None else None, completed)
+                    self.done = True
+            elif ch == ":" and self._depth == 1 and self._value_start is None:
+                self._value_start = i + 1
+            elif ch == "," and self._depth == 1:
+                self._emit(buf[self._value_start:i] if self._value_start is not None else None, completed)
+
+        return completed
+
+    def _emit(self, raw: Optional[str], completed: List):
+        if self._key is not None and raw is not None and raw.strip():
+            value = self._decode(raw)
+            if value is not None:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    @staticmethod
+    def _decode(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
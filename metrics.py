@@ -0,0 +1,191 @@
+"""
+In-process metrics registry for TimeTraveler AI.
+Fed by tracing spans (latency per stage, cache hits, token usage) plus a few
+gauges (active sessions, TTS work in flight). Read by the performance page.
+"""
+
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List
+
+from config import get_setting
+from tracing import add_span_listener
+
+# Rolling window for latency samples
+WINDOW_SECONDS = 15 * 60
+MAX_SAMPLES_PER_STAGE = 2000
+# Sessions not seen for this long are no longer "active"
+SESSION_IDLE_SECONDS = 10 * 60
+# Session footprint is re-measured at most this often
+SESSION_SIZE_INTERVAL = 30
+# Histogram bucket upper bounds in ms
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+
+# Span name -> cache the span's cache_hit attribute reports on
+CACHE_SPANS = {
+    "analyze_image": "image_analysis",
+    "generate_dynamic_persona": "persona",
+    "generate_full_persona_from_brief": "persona",
+    "generate_speech": "audio",
+    "search_wikipedia_images": "wikipedia",
+    "generate_suggested_questions": "suggestions",
+    # A miss is counted as a model call by its generate_persona_response span
+    "answer_suggested_question": "suggestions",
+    "lookup_answer": "answers",
+}
+# Spans that are one Gemini request each
+MODEL_SPANS = {
+    "analyze_image", "analyze_image_pack", "generate_dynamic_persona", "generate_related_personas",
+    "generate_full_persona_from_brief", "generate_persona_response", "generate_suggested_questions",
+}
+
+_lock = threading.Lock()
+_latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES_PER_STAGE))
+_cache_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+_model_calls: deque = deque(maxlen=100000)
+_inflight: Dict[str, int] = defaultdict(int)
+_sessions: Dict[str, Dict] = {}
+
+
+def record_span(span):
+    """Tracing listener: fold a finished span into the registry."""
+    now = time.time()
+    attrs = span.attrs
+    with _lock:
+        _latencies[span.name].append((now, span.duration_ms))
+        cache = CACHE_SPANS.get(span.name)
+        if cache and "cache_hit" in attrs:
+            _cache_counts[cache]["hits" if attrs["cache_hit"] else "misses"] += 1
+        if span.name in MODEL_SPANS and not attrs.get("cache_hit"):
+            _model_calls.append((now, attrs.get("prompt_tokens", 0) + attrs.get("output_tokens", 0)))
+
+
+@contextmanager
+def track_inflight(queue_name: str):
+    """Count work in progress (e.g. TTS syntheses) for queue depth gauges."""
+    with _lock:
+        _inflight[queue_name] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _inflight[queue_name] -= 1
+
+
+def estimate_size(obj, _seen=None) -> int:
+    """Rough deep size of session data (dicts, lists, strings, bytes)."""
+    _seen = _seen if _seen is not None else set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_size(v, _seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(estimate_size(getattr(obj, s, None), _seen) for s in obj.__slots__)
+    return size
+
+
+def record_session(session_id: str, state: Dict):
+    """Mark a session active and (throttled) measure its session_state footprint."""
+    now = time.time()
+    with _lock:
+        entry = _sessions.setdefault(session_id, {"first_seen": now, "bytes": 0, "measured": 0.0})
+        entry["last_seen"] = now
+        measure = now - entry["measured"] >= SESSION_SIZE_INTERVAL
+    if measure:
+        size = estimate_size(dict(state))
+        with _lock:
+            entry["bytes"] = size
+            entry["measured"] = now
+
+
+def _window(samples) -> List[float]:
+    cutoff = time.time() - WINDOW_SECONDS
+    return [ms for ts, ms in samples if ts >= cutoff]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def _bucket_label(bound: float) -> str:
+    return f"≤{int(bound)}ms" if bound != float("inf") else f">{int(LATENCY_BUCKETS_MS[-2])}ms"
+
+
+def stage_stats() -> Dict[str, Dict]:
+    """Per-stage latency summary and histogram over the rolling window."""
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _latencies.items()}
+    stats = {}
+    for name, samples in snapshot.items():
+        values = _window(samples)
+        if not values:
+            continue
+        buckets = {_bucket_label(bound): 0 for bound in LATENCY_BUCKETS_MS}
+        for ms in values:
+            bound = next(b for b in LATENCY_BUCKETS_MS if ms <= b)
+            buckets[_bucket_label(bound)] += 1
+        stats[name] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1),
+            "p99_ms": round(_percentile(values, 99), 1),
+            "histogram": buckets,
+        }
+    return stats
+
+
+def cache_stats() -> Dict[str, Dict]:
+    with _lock:
+        counts = {name: dict(c) for name, c in _cache_counts.items()}
+    for c in counts.values():
+        total = c["hits"] + c["misses"]
+        c["hit_rate"] = round(c["hits"] / total, 3) if total else 0.0
+    return counts
+
+
+def quota_stats() -> Dict:
+    """Gemini requests/tokens in the last minute and day against configured limits."""
+    now = time.time()
+    with _lock:
+        calls = list(_model_calls)
+    last_minute = [t for ts, t in calls if ts >= now - 60]
+    last_day = [t for ts, t in calls if ts >= now - 86400]
+    return {
+        "requests_per_minute": len(last_minute),
+        "tokens_per_minute": sum(last_minute),
+        "requests_per_day": len(last_day),
+        "rpm_limit": int(get_setting("GEMINI_RPM_LIMIT", 15)),
+        "rpd_limit": int(get_setting("GEMINI_RPD_LIMIT", 1000)),
+    }
+
+
+def session_stats() -> List[Dict]:
+    """Active sessions with their last measured session_state footprint."""
+    cutoff = time.time() - SESSION_IDLE_SECONDS
+    with _lock:
+        for sid in [sid for sid, s in _sessions.items() if s["last_seen"] < cutoff]:
+            del _sessions[sid]
+        return [{
+            "session": sid[:8],
+            "state_kb": round(s["bytes"] / 1024, 1),
+            "idle_s": int(time.time() - s["last_seen"]),
+            "age_min": round((time.time() - s["first_seen"]) / 60, 1),
+        } for sid, s in _sessions.items()]
+
+
+def queue_depths() -> Dict[str, int]:
+    with _lock:
+        return dict(_inflight)
+
+
+add_span_listener(record_span)
@@ -0,0 +1,111 @@
+"""
+Model Registry for TimeTraveler AI.
+Builds Gemini model clients once per (API key, model name, generation config)
+and shares them across Streamlit reruns and sessions.
+"""
+
+import streamlit as st
+import hashlib
+import json
+import threading
+from typing import Dict, Optional
+
+# genai.configure() mutates process-wide client state, so builds are serialized.
+_CONFIGURE_LOCK = threading.Lock()
+
+# ErrorInfo reasons of InvalidArgument errors that mean the key itself is bad
+AUTH_ERROR_REASONS = ("API_KEY_INVALID",)
+
+# id(model) -> _build_model arguments, so one client can be invalidated
+_build_args: Dict[int, tuple] = {}
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key so it never appears in cache keys or logs."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def _config_key(generation_config: Optional[Dict]) -> str:
+    """Stable string form of a generation config for use as a cache key."""
+    return json.dumps(generation_config or {}, sort_keys=True, default=str)
+
+
+def check_model_health(model) -> bool:
+    """
+    Cheap liveness probe for a freshly built model.
+    count_tokens is a metadata call and does not consume generation quota.
+    """
+    model.count_tokens("ping")
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def _build_model(key_hash: str, model_name: str, config_key: str, _api_key: str):
+    """
+    Build and health-check a model client.
+    Cached by (key_hash, model_name, config_key); the raw key is excluded from hashing.
+    Exceptions are not cached, so a failed build is retried on the next rerun.
+    """
+    # Imported here: the SDK pulls in grpc/protobuf and dominates cold start
+    import google.generativeai as genai
+
+    generation_config = json.loads(config_key) or None
+    with _CONFIGURE_LOCK:
+        genai.configure(api_key=_api_key)
+        model = genai.GenerativeModel(model_name, generation_config=generation_config)
+        # The client binds to the configured key on its first call, so probe
+        # before another thread can configure a different key
+        check_model_health(model)
+    _build_args[id(model)] = (key_hash, model_name, config_key, _api_key)
+    print(f"[INFO] Built Gemini model {model_name} for key {key_hash}")
+    return model
+
+
+def get_model(api_key: str, model_name: str, generation_config: Optional[Dict] = None):
+    """Get a shared, health-checked model client for this key/model/config."""
+    return _build_model(
+        hash_api_key(api_key),
+        model_name,
+        _config_key(generation_config),
+        api_key
+    )
+
+
+def is_auth_error(error: Exception) -> bool:
+    """
+    Check whether an exception from the Gemini SDK is an authentication failure.
+    Matched on the SDK's exception types only: other errors (quota, proxy,
+    transient failures) must not evict a working client.
+    """
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return False
+    if isinstance(error, (api_exceptions.Unauthenticated, api_exceptions.PermissionDenied)):
+        return True
+    return isinstance(error, api_exceptions.InvalidArgument) and getattr(error, "reason", None) in AUTH_ERROR_REASONS
+
+
+def invalidate_models(model=None):
+    """
+    Drop a cached model client (every client when model is None or unknown)
+    so the next rerun rebuilds it.
+    """
+    args = _build_args.pop(id(model), None) if model is not None else None
+    if args:
+        _build_model.clear(*args)
+    else:
+        _build_args.clear()
+        _build_model.clear()
+
+
+def report_model_error(error: Exception, model=None) -> bool:
+    """
+    Inspect a model call failure and invalidate the failing client on auth errors.
+    Returns True if the cache was invalidated.
+    """
+    if is_auth_error(error):
+        print(f"[WARNING] Gemini auth error, rebuilding model client: {error}")
+        invalidate_models(model)
+        return True
+    return False
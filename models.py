@@ -0,0 +1,196 @@
+"""
+Data model for TimeTraveler AI.
+Compact slotted records for landmarks, personas, voice settings and chat
+turns. Model output is validated and defaulted once, when a record is built;
+afterwards fields are plain attributes.
+
+Records also answer the dict-style reads (record.get("name"), record["name"])
+that templates and TTS backends use, so they can be passed where a dict was.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Dict, Iterator, List, Optional, Tuple
+
+GENDERS = ("male", "female")
+VOICE_AGES = ("young", "middle", "old")
+CONFIDENCE_LEVELS = ("high", "medium", "low", "none")
+
+
+class _Record:
+    """Dict-style read/write access to a slotted dataclass's fields."""
+
+    __slots__ = ()
+
+    def get(self, key: str, default=None):
+        """Field value, or default for unknown and unset (None) fields."""
+        if key not in self.__dataclass_fields__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__dataclass_fields__
+
+    def to_dict(self) -> Dict:
+        """Plain JSON-ready dict (tuples become lists)."""
+        out = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            out[f.name] = list(value) if isinstance(value, tuple) else value
+        return out
+
+
+def _text(value, default: str = "") -> str:
+    if value is None:
+        return default
+    value = str(value).strip()
+    return value or default
+
+
+def _choice(value, options: Tuple[str, ...], default: str) -> str:
+    value = _text(value).lower()
+    return value if value in options else default
+
+
+def _strings(value) -> Tuple[str, ...]:
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(str(v) for v in value if v)
+
+
+@dataclass(slots=True)
+class Landmark(_Record):
+    identified: bool = False
+    landmark_name: str = "Unknown"
+    location: str = "Unknown"
+    confidence: str = "low"
+    visual_elements: str = ""
+    architectural_style: str = "Unknown"
+    era: str = "Unknown"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Landmark":
+        identified = data.get("identified", False)
+        if isinstance(identified, str):
+            identified = identified.strip().lower() == "true"
+        return cls(
+            identified=bool(identified),
+            landmark_name=_text(data.get("landmark_name"), "Unknown"),
+            location=_text(data.get("location"), "Unknown"),
+            confidence=_choice(data.get("confidence"), CONFIDENCE_LEVELS, "low"),
+            visual_elements=_text(data.get("visual_elements")),
+            architectural_style=_text(data.get("architectural_style"), "Unknown"),
+            era=_text(data.get("era"), "Unknown"),
+        )
+
+
+@dataclass(slots=True)
+class Persona(_Record):
+    name: str = "Historical Guide"
+    title: str = "Keeper of History"
+    era: str = "Unknown Era"
+    region: str = "Unknown"
+    avatar: str = "👤"
+    relationship_to_landmark: str = ""
+    personality_traits: Tuple[str, ...] = ("wise", "knowledgeable", "dignified")
+    speaking_style: str = "formal and dignified"
+    voice_gender: str = "male"
+    voice_age: str = "middle"
+    historical_facts: Tuple[str, ...] = ()
+    system_prompt: str = ""
+    # Opening lines written with the persona; empty means generate one
+    greeting: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict, defaults: Optional[Dict] = None) -> "Persona":
+        """
+        Build a persona from model output.
+        Missing or empty fields take values from defaults, then the class defaults.
+        """
+        merged = dict(defaults or {})
+        merged.update({k: v for k, v in data.items() if v not in (None, "", [])})
+        base = cls()
+        persona = cls(
+            name=_text(merged.get("name"), base.name),
+            title=_text(merged.get("title"), base.title),
+            era=_text(merged.get("era"), base.era),
+            region=_text(merged.get("region"), base.region),
+            avatar=_text(merged.get("avatar"), base.avatar),
+            relationship_to_landmark=_text(merged.get("relationship_to_landmark")),
+            personality_traits=_strings(merged.get("personality_traits")) or base.personality_traits,
+            speaking_style=_text(merged.get("speaking_style"), base.speaking_style),
+            voice_gender=_choice(merged.get("voice_gender"), GENDERS, "male"),
+            voice_age=_choice(merged.get("voice_age"), VOICE_AGES, "middle"),
+            historical_facts=_strings(merged.get("historical_facts")),
+            system_prompt=_text(merged.get("system_prompt")),
+            greeting=_text(merged.get("greeting")),
+        )
+        if not persona.system_prompt:
+            persona.system_prompt = f"You are {persona.name}, {persona.title}. Share your knowledge authentically."
+        return persona
+
+
+@dataclass(slots=True)
+class VoiceSettings(_Record):
+    voice: str = "en-US-GuyNeural"
+    rate: str = "-10%"
+    pitch: str = "-5Hz"
+    gender: str = "male"
+    slow: bool = False
+    elevenlabs_voice_id: Optional[str] = None
+    gtts_tld: Optional[str] = None     # gTTS accent domain, e.g. "co.in"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "VoiceSettings":
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+@dataclass(slots=True)
+class ChatTurn(_Record):
+    role: str
+    content: str
+    audio: Optional[str] = None         # base64 audio, when resident in memory
+    audio_stream: Optional[str] = None  # live stream token (audio_stream)
+    audio_ref: Optional[str] = None     # blob ref in the journey store
+    saved: bool = False                 # written to the journey store
+
+
+class ChatHistory:
+    """
+    Append-only list of chat turns.
+    Passed by reference to the model and renderers; nothing copies it, and
+    a new journey or narrator starts a new history instead of clearing one.
+    """
+
+    __slots__ = ("_turns",)
+
+    def __init__(self, turns: Optional[List[ChatTurn]] = None):
+        self._turns = list(turns or [])
+
+    def append(self, turn: ChatTurn):
+        self._turns.append(turn)
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __getitem__(self, index):
+        return self._turns[index]
+
+    def __iter__(self) -> Iterator[ChatTurn]:
+        return iter(self._turns)
+
+    def __bool__(self) -> bool:
+        return bool(self._turns)
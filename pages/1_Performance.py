@@ -0,0 +1,85 @@
+"""
+Performance dashboard for TimeTraveler AI operators.
+Admin-only view of the in-process metrics registry: latency per pipeline
+stage, cache hit rates, Gemini quota usage, active sessions and TTS queue depth.
+"""
+
+import hmac
+
+import streamlit as st
+
+from config import get_setting
+from metrics import cache_stats, queue_depths, quota_stats, session_stats, stage_stats
+
+REFRESH_SECONDS = 5
+
+st.set_page_config(page_title="Performance • TimeTraveler AI", page_icon="📊", layout="wide")
+
+
+def check_admin() -> bool:
+    """Gate the page behind ADMIN_PASSWORD."""
+    password = get_setting("ADMIN_PASSWORD")
+    if not password:
+        st.error("Set ADMIN_PASSWORD in secrets or the environment to enable this page.")
+        return False
+    if st.session_state.get("admin_ok"):
+        return True
+
+    entered = st.text_input("Admin password", type="password")
+    if entered:
+        if hmac.compare_digest(entered, str(password)):
+            st.session_state.admin_ok = True
+            st.rerun()
+        st.error("Wrong password")
+    return False
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def dashboard():
+    stages = stage_stats()
+    caches = cache_stats()
+    quota = quota_stats()
+    sessions = session_stats()
+    queues = queue_depths()
+
+    # Headline numbers
+    cols = st.columns(4)
+    cols[0].metric("Active sessions", len(sessions))
+    cols[1].metric("TTS in flight", queues.get("tts", 0), f"{queues.get('jobs', 0)} jobs running", delta_color="off")
+    cols[2].metric("Gemini req/min", f"{quota['requests_per_minute']} / {quota['rpm_limit']}")
+    cols[3].metric("Gemini req/day", f"{quota['requests_per_day']} / {quota['rpd_limit']}")
+    st.progress(min(1.0, quota["requests_per_minute"] / max(1, quota["rpm_limit"])), text=f"{quota['tokens_per_minute']} tokens in the last minute")
+
+    # Latency per stage
+    st.markdown("### ⏱️ Pipeline latency (last 15 min)")
+    if not stages:
+        st.info("No spans recorded yet.")
+    else:
+        st.dataframe(
+            [{"stage": name, **{k: v for k, v in s.items() if k != "histogram"}}
+             for name, s in sorted(stages.items(), key=lambda item: -item[1]["p95_ms"])],
+            use_container_width=True,
+            hide_index=True
+        )
+        stage = st.selectbox("Histogram for stage", sorted(stages))
+        st.bar_chart(stages[stage]["histogram"])
+
+    # Caches
+    st.markdown("### 🗄️ Cache hit rates")
+    if caches:
+        cache_cols = st.columns(len(caches))
+        for col, (name, c) in zip(cache_cols, sorted(caches.items())):
+            col.metric(name, f"{c['hit_rate']:.0%}", f"{c['hits']} hits / {c['misses']} misses", delta_color="off")
+    else:
+        st.caption("No cache lookups recorded yet.")
+
+    # Sessions
+    st.markdown("### 👥 Active sessions")
+    if sessions:
+        st.dataframe(sorted(sessions, key=lambda s: -s["state_kb"]), use_container_width=True, hide_index=True)
+        st.caption(f"Total session_state ≈ {sum(s['state_kb'] for s in sessions) / 1024:.1f} MB")
+
+
+st.markdown("## 📊 Performance")
+if check_admin():
+    dashboard()
@@ -1,16 +1,18 @@
 """
 Immersive Presentation Mode for TimeTraveler AI.
 Creates fullscreen cinematic experience with images, avatar, and subtitles.
+
+Markup comes from templates compiled once at import (see templates.py);
+dynamic fields are HTML-escaped and rendered fragments are memoized. CSS is
+injected into the page once per session rather than on every rerun.
 """
 
 import streamlit as st
-from typing import Dict, List, Optional
-import time
+from typing import Dict
 
-def get_presentation_css() -> str:
-    """Get CSS for immersive presentation mode."""
-    return """
-    <style>
+from templates import compile_template, render, inject_css_once
+
+PRESENTATION_CSS = """
     /* Fullscreen overlay */
     .presentation-overlay {
         position: fixed;
@@ -56,7 +58,7 @@ def get_presentation_css() -> str:
     }
     
     /* Avatar section */
-    . avatar-container {
+    .avatar-container {
         position: absolute;
         bottom: 150px;
         left: 30px;
@@ -84,7 +86,7 @@ def get_presentation_css() -> str:
         50% { box-shadow: 0 0 50px rgba(233, 69, 96, 0.8); }
     }
     
-    . avatar-name {
+    .avatar-name {
         color: #e94560;
         font-size: 1.2rem;
         font-weight: bold;
@@ -139,7 +141,7 @@ def get_presentation_css() -> str:
         transition: all 0.3s;
     }
     
-    . close-button:hover {
+    .close-button:hover {
         background: #e94560;
         transform:  scale(1.1);
     }
@@ -223,8 +225,125 @@ def get_presentation_css() -> str:
         0%, 100% { opacity: 0.5; }
         50% { opacity: 1; }
     }
-    </style>
-    """
+"""
+
+MINI_PRESENTATION_CSS = """
+    .mini-presentation {
+        background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
+        border: 2px solid #e94560;
+        border-radius:  20px;
+        padding:  20px;
+        margin: 20px 0;
+        box-shadow: 0 0 30px rgba(233, 69, 96, 0.3);
+    }
+    .mini-header {
+        display: flex;
+        align-items: center;
+        gap: 15px;
+        margin-bottom: 15px;
+        padding-bottom: 15px;
+        border-bottom:  1px solid #333;
+    }
+    .mini-avatar {
+        font-size: 50px;
+    }
+    .mini-name {
+        color: #e94560;
+        font-size: 1.3rem;
+        font-weight: bold;
+    }
+    .mini-title {
+        color: #00fff5;
+        font-size: 0.9rem;
+    }
+    .mini-response {
+        color: #ffffff;
+        font-size: 1.1rem;
+        line-height: 1.8;
+        padding: 15px;
+        background: rgba(0,0,0,0.3);
+        border-radius: 10px;
+        border-left: 4px solid #e94560;
+    }
+    .mini-gallery {
+        display: flex;
+        gap: 10px;
+        margin-top: 15px;
+        overflow-x: auto;
+        padding: 10px 0;
+    }
+    .mini-gallery img {
+        height: 120px;
+        border-radius: 10px;
+        border: 2px solid #333;
+        transition: all 0.3s;
+    }
+    .mini-gallery img:hover {
+        border-color: #e94560;
+        transform: scale(1.05);
+    }
+"""
+
+AMBIENCE_TEMPLATE = compile_template("ambience", """
+        <div class="ambience-indicator">
+            <span class="ambience-icon">{{ icon }}</span>
+            <span>{{ description }}</span>
+        </div>
+""")
+
+# Static markup: built once
+VISUALIZER_HTML = '<div class="audio-visualizer">' + "".join(
+    f'<div class="visualizer-bar" style="animation-delay: {i*0.1}s;"></div>'
+    for i in range(15)
+) + '</div>'
+
+PRESENTATION_TEMPLATE = compile_template("presentation", """
+    <div class="presentation-content">
+        {{{ ambience }}}
+        
+        <div class="image-caption">{{ image_caption }}</div>
+        
+        <div class="presentation-gallery">
+            <img src="{{ image_url }}" class="gallery-image" alt="{{ image_caption }}">
+        </div>
+        
+        <div class="avatar-container">
+            <div style="font-size: 80px; margin-bottom: 10px;">{{ avatar_emoji }}</div>
+            <div class="avatar-name">{{ persona_name }}</div>
+            <div class="avatar-title">{{ persona_title }}</div>
+        </div>
+        
+        {{{ visualizer }}}
+        
+        <div class="subtitle-container">
+            <div class="subtitle-text">{{ subtitle_text }}</div>
+        </div>
+    </div>
+""")
+
+MINI_GALLERY_IMAGE_TEMPLATE = compile_template(
+    "mini_gallery_image",
+    '<img src="{{ url }}" alt="{{ caption }}" title="{{ caption }}">'
+)
+
+MINI_PRESENTATION_TEMPLATE = compile_template("mini_presentation", """
+    <div class="mini-presentation">
+        <div class="mini-header">
+            <div class="mini-avatar">{{ avatar }}</div>
+            <div>
+                <div class="mini-name">{{ name }}</div>
+                <div class="mini-title">{{ title }} • {{ era }}</div>
+            </div>
+        </div>
+        <div class="mini-response">{{ response_text }}</div>
+        {{{ gallery }}}
+    </div>
+""")
+
+
+def get_presentation_css() -> str:
+    """Get CSS for immersive presentation mode."""
+    return f"<style>{PRESENTATION_CSS}</style>"
 
 
 def get_ambience_icon(ambience_type: str) -> str:
@@ -268,50 +387,25 @@ def create_presentation_html(
     show_visualizer: bool = True
 ) -> str:
     """Create HTML for immersive presentation."""
-    
     ambience_html = ""
     if ambience_type: 
-        icon = get_ambience_icon(ambience_type)
-        desc = get_ambience_description(ambience_type)
-        ambience_html = f"""
-        <div class="ambience-indicator">
-            <span class="ambience-icon">{icon}</span>
-            <span>{desc}</span>
-        </div>
-        """
-    
-    visualizer_html = ""
-    if show_visualizer:
-        bars = "". join([
-            f'<div class="visualizer-bar" style="animation-delay: {i*0.1}s;"></div>'
-            for i in range(15)
-        ])
-        visualizer_html = f'<div class="audio-visualizer">{bars}</div>'
-    
-    html = f"""
-    <div class="presentation-content">
-        {ambience_html}
-        
-        <div class="image-caption">{image_caption}</div>
-        
-        <div class="presentation-gallery">
-            <img src="{image_url}" class="gallery-image" alt="{image_caption}">
-        </div>
-        
-        <div class="avatar-container">
-            <div style="font-size: 80px; margin-bottom: 10px;">{avatar_emoji}</div>
-            <div class="avatar-name">{persona_name}</div>
-            <div class="avatar-title">{persona_title}</div>
-        </div>
-        
-        {visualizer_html}
-        
-        <div class="subtitle-container">
-            <div class="subtitle-text">{subtitle_text}</div>
-        </div>
-    </div>
-    """
-    return html
+        ambience_html = render(
+            AMBIENCE_TEMPLATE,
+            icon=get_ambience_icon(ambience_type),
+            description=get_ambience_description(ambience_type)
+        )
+    
+    return render(
+        PRESENTATION_TEMPLATE,
+        ambience=ambience_html,
+        image_caption=image_caption,
+        image_url=image_url,
+        avatar_emoji=avatar_emoji,
+        persona_name=persona_name,
+        persona_title=persona_title,
+        visualizer=VISUALIZER_HTML if show_visualizer else "",
+        subtitle_text=subtitle_text
+    )
 
 
 def render_presentation_mode(
@@ -329,8 +423,8 @@ def render_presentation_mode(
     
     current_image = gallery[image_index % len(gallery)]
     
-    # CSS
-    st.markdown(get_presentation_css(), unsafe_allow_html=True)
+    # CSS (once per session)
+    inject_css_once("presentation", PRESENTATION_CSS)
     
     # Presentation HTML
     presentation_html = create_presentation_html(
@@ -357,86 +451,25 @@ def create_mini_presentation(
     
     gallery = landmark_data.get("gallery_images", []) if landmark_data else []
     
-    # Container with styling
-    st.markdown("""
-    <style>
-    .mini-presentation {
-        background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
-        border: 2px solid #e94560;
-        border-radius:  20px;
-        padding:  20px;
-        margin: 20px 0;
-        box-shadow: 0 0 30px rgba(233, 69, 96, 0.3);
-    }
-    . mini-header {
-        display: flex;
-        align-items: center;
-        gap: 15px;
-        margin-bottom: 15px;
-        padding-bottom: 15px;
-        border-bottom:  1px solid #333;
-    }
-    .mini-avatar {
-        font-size: 50px;
-    }
-    .mini-name {
-        color: #e94560;
-        font-size: 1.3rem;
-        font-weight: bold;
-    }
-    .mini-title {
-        color: #00fff5;
-        font-size: 0.9rem;
-    }
-    .mini-response {
-        color: #ffffff;
-        font-size: 1.1rem;
-        line-height: 1.8;
-        padding: 15px;
-        background: rgba(0,0,0,0.3);
-        border-radius: 10px;
-        border-left: 4px solid #e94560;
-    }
-    .mini-gallery {
-        display: flex;
-        gap: 10px;
-        margin-top: 15px;
-        overflow-x: auto;
-        padding: 10px 0;
-    }
-    . mini-gallery img {
-        height: 120px;
-        border-radius: 10px;
-        border: 2px solid #333;
-        transition: all 0.3s;
-    }
-    .mini-gallery img:hover {
-        border-color: #e94560;
-        transform: scale(1.05);
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Styling (once per session)
+    inject_css_once("mini_presentation", MINI_PRESENTATION_CSS)
     
     # Build gallery HTML
     gallery_html = ""
     if gallery:
         images_html = "".join([
-            f'<img src="{img["url"]}" alt="{img["caption"]}" title="{img["caption"]}">'
+            render(MINI_GALLERY_IMAGE_TEMPLATE, url=img["url"], caption=img["caption"])
             for img in gallery[: 4]
         ])
         gallery_html = f'<div class="mini-gallery">{images_html}</div>'
     
     # Main presentation
-    st.markdown(f"""
-    <div class="mini-presentation">
-        <div class="mini-header">
-            <div class="mini-avatar">{persona_data.get('avatar', '👤')}</div>
-            <div>
-                <div class="mini-name">{persona_data.get('name', 'Unknown')}</div>
-                <div class="mini-title">{persona_data.get('title', '')} • {persona_data.get('era', '')}</div>
-            </div>
-        </div>
-        <div class="mini-response">{response_text}</div>
-        {gallery_html}
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(render(
+        MINI_PRESENTATION_TEMPLATE,
+        avatar=persona_data.get('avatar', '👤'),
+        name=persona_data.get('name', 'Unknown'),
+        title=persona_data.get('title', ''),
+        era=persona_data.get('era', ''),
+        response_text=response_text,
+        gallery=gallery_html
+    ), unsafe_allow_html=True)
@@ -0,0 +1,175 @@
+"""
+Multi-worker launcher for TimeTraveler AI.
+Runs several Streamlit processes on one box behind an nginx reverse proxy so
+HTML building, JSON parsing and base64 work spread across cores instead of
+sharing one GIL.
+
+- Sessions are sticky: the proxy pins each browser to a worker with a cookie
+  (Streamlit session state lives in the worker's memory).
+- Workers share the analysis, persona, audio and image caches through the
+  SQLite cache (CACHE_BACKEND=sqlite) and journeys through the journey store.
+- Each worker runs its own audio stream server; the proxy exposes worker i's
+  streams under /w<i>/audio/.
+- The Performance page reports on the worker that serves it.
+
+Usage (from the repository root):
+    python serve.py --workers 4 --port 8080
+    python serve.py --workers 4 --no-proxy --nginx-conf deploy.conf   # external nginx
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+DEFAULT_WORKER_PORT = 8501
+DEFAULT_AUDIO_PORT = 8765
+
+NGINX_TEMPLATE = """# Generated by serve.py
+worker_processes auto;
+pid {run_dir}/nginx.pid;
+error_log {run_dir}/error.log warn;
+
+events {{
+    worker_connections 1024;
+}}
+
+http {{
+    access_log off;
+    client_body_temp_path {run_dir}/body;
+    proxy_temp_path {run_dir}/proxy;
+
+    # Sticky sessions: reuse the tt_worker cookie, or pin a new browser now
+    map $cookie_tt_worker $tt_affinity {{
+        ""      $request_id;
+        default $cookie_tt_worker;
+    }}
+
+    map $http_upgrade $connection_upgrade {{
+        default upgrade;
+        ""      close;
+    }}
+
+    upstream streamlit {{
+        hash $tt_affinity consistent;
+{upstream_servers}
+    }}
+
+    server {{
+        listen {port};
+
+        location / {{
+            proxy_pass http://streamlit;
+            proxy_http_version 1.1;
+            proxy_set_header Host $host;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection $connection_upgrade;
+            proxy_read_timeout 86400;
+            add_header Set-Cookie "tt_worker=$tt_affinity; Path=/; HttpOnly; SameSite=Lax";
+            # Ask browsers for the connection hint the audio profile is picked from
+            add_header Accept-CH "ECT, Save-Data";
+        }}
+{audio_locations}
+    }}
+}}
+"""
+
+AUDIO_LOCATION = """
+        location /w{index}/audio/ {{
+            proxy_pass http://127.0.0.1:{audio_port}/audio/;
+            proxy_http_version 1.1;
+            proxy_buffering off;
+        }}"""
+
+
+def worker_env(index: int, audio_port: int) -> Dict[str, str]:
+    """Settings for worker `index` (see config.get_setting)."""
+    env = dict(os.environ)
+    env.setdefault("CACHE_BACKEND", "sqlite")
+    env["AUDIO_STREAM_PORT"] = str(audio_port)
+    # Relative to the page, so the browser goes through the proxy
+    env["AUDIO_STREAM_URL"] = f"/w{index}"
+    return env
+
+
+def render_nginx_config(workers: int, port: int, worker_port: int, audio_port: int, run_dir: str) -> str:
+    return NGINX_TEMPLATE.format(
+        run_dir=run_dir,
+        port=port,
+        upstream_servers="\n".join(
+            f"        server 127.0.0.1:{worker_port + i};" for i in range(workers)
+        ),
+        audio_locations="".join(
+            AUDIO_LOCATION.format(index=i, audio_port=audio_port + i) for i in range(workers)
+        ),
+    )
+
+
+def start_workers(workers: int, worker_port: int, audio_port: int, app: str) -> List[subprocess.Popen]:
+    procs = []
+    for i in range(workers):
+        cmd = [
+            sys.executable, "-m", "streamlit", "run", app,
+            "--server.port", str(worker_port + i),
+            "--server.address", "127.0.0.1",
+            "--server.headless", "true",
+        ]
+        procs.append(subprocess.Popen(cmd, env=worker_env(i, audio_port + i)))
+        print(f"[INFO] Worker {i}: http://127.0.0.1:{worker_port + i} (audio :{audio_port + i})")
+    return procs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run TimeTraveler AI on several worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--port", type=int, default=8080, help="Public port of the proxy")
+    parser.add_argument("--worker-port", type=int, default=DEFAULT_WORKER_PORT, help="Port of worker 0")
+    parser.add_argument("--audio-port", type=int, default=DEFAULT_AUDIO_PORT, help="Audio stream port of worker 0")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--run-dir", default=".serve", help="Proxy config, pid and temp files")
+    parser.add_argument("--nginx-conf", help="Write the proxy config here (default: <run-dir>/nginx.conf)")
+    parser.add_argument("--no-proxy", action="store_true", help="Only start workers; run the proxy yourself")
+    args = parser.parse_args(argv)
+
+    run_dir = os.path.abspath(args.run_dir)
+    os.makedirs(run_dir, exist_ok=True)
+    conf_path = args.nginx_conf or os.path.join(run_dir, "nginx.conf")
+    with open(conf_path, "w") as f:
+        f.write(render_nginx_config(args.workers, args.port, args.worker_port, args.audio_port, run_dir))
+    print(f"[INFO] Proxy config written to {conf_path}")
+
+    nginx = None if args.no_proxy else shutil.which("nginx")
+    if not args.no_proxy and not nginx:
+        print("[ERROR] nginx not found; install it or pass --no-proxy and run a proxy with the generated config")
+        return 1
+
+    procs = start_workers(args.workers, args.worker_port, args.audio_port, args.app)
+    if nginx:
+        procs.append(subprocess.Popen([nginx, "-c", conf_path, "-g", "daemon off;"]))
+        print(f"[INFO] Serving on http://0.0.0.0:{args.port} ({args.workers} workers)")
+
+    def stop(*_):
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # Any process exiting takes the deployment down, like a single server would
+        while all(proc.poll() is None for proc in procs):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+        for proc in procs:
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Shared caches for TimeTraveler AI.
+One small get/set interface for the analysis, persona, audio and image
+metadata caches, with two backends:
+
+- memory: a bounded in-process LRU (default, single process)
+- sqlite: a WAL-mode SQLite file shared by every Streamlit worker on the box,
+  so a persona or clip generated by one worker is a hit in all the others
+
+Select with CACHE_BACKEND ("memory" or "sqlite") and CACHE_DIR. Values are
+pickled; the cache file is local and written only by this app.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import get_setting
+
+DEFAULT_BACKEND = "memory"
+DEFAULT_CACHE_DIR = "cache"
+# Entries per namespace in the memory backend
+MEMORY_MAX_ENTRIES = 512
+# Expired SQLite rows are swept every this many writes
+SWEEP_EVERY = 200
+
+# Namespace -> time to live in seconds (None keeps entries until evicted)
+CACHE_TTLS = {
+    "image_analysis": 30 * 24 * 3600,
+    "persona": 7 * 24 * 3600,
+    "audio": 30 * 24 * 3600,
+    "wikipedia": 24 * 3600,
+    "suggestions": 7 * 24 * 3600,
+    "answers": 24 * 3600,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires REAL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+def cache_key(*parts) -> str:
+    """Stable key from the values that determine a cached result."""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class Cache(ABC):
+    """A namespaced key-value cache with optional expiry."""
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Cached value, or None on a miss.
+        Callers report hits as the cache_hit span attribute (see metrics.CACHE_SPANS).
+        """
+        try:
+            return self._get(key)
+        except Exception as e:
+            print(f"[WARNING] Cache {self.namespace} read failed: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        if value is None:
+            return
+        try:
+            self._set(key, value, time.time() + self.ttl if self.ttl else None)
+        except Exception as e:
+            print(f"[WARNING] Cache {self.namespace} write failed: {e}")
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, value: Any, expires: Optional[float]):
+        ...
+
+
+class MemoryCache(Cache):
+    """Bounded LRU in this process."""
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None, max_entries: int = MEMORY_MAX_ENTRIES):
+        super().__init__(namespace, ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires and expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any, expires: Optional[float]):
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteStore:
+    """The WAL-mode database behind every SQLite cache namespace."""
+
+    def __init__(self, root: str):
+        os.makedirs(root, exist_ok=True)
+        self.db_path = os.path.join(root, "cache.db")
+        self._local = threading.local()
+        self._writes = 0
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets workers read while another writes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def sweep(self):
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            self.connect().execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+
+
+class SQLiteCache(Cache):
+    """One namespace of the shared SQLite cache."""
+
+    def __init__(self, namespace: str, store: SQLiteStore, ttl: Optional[float] = None):
+        super().__init__(namespace, ttl)
+        self.store = store
+
+    def clear(self):
+        self.store.connect().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def _get(self, key: str) -> Optional[Any]:
+        row = self.store.connect().execute(
+            "SELECT value, expires FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if not row or (row[1] and row[1] < time.time()):
+            return None
+        return pickle.loads(row[0])
+
+    def _set(self, key: str, value: Any, expires: Optional[float]):
+        self.store.connect().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires)
+        )
+        self.store.sweep()
+
+
+_caches: Dict[str, Cache] = {}
+_store: Optional[SQLiteStore] = None
+_lock = threading.Lock()
+
+
+def get_cache(namespace: str) -> Cache:
+    """
+    The process-wide cache for a namespace.
+    Usable from worker threads (no Streamlit context needed).
+    """
+    global _store
+    with _lock:
+        cache = _caches.get(namespace)
+        if cache:
+            return cache
+        ttl = CACHE_TTLS.get(namespace)
+        backend = str(get_setting("CACHE_BACKEND", DEFAULT_BACKEND)).lower()
+        if backend == "sqlite":
+            try:
+                if _store is None:
+                    _store = SQLiteStore(get_setting("CACHE_DIR", DEFAULT_CACHE_DIR))
+                cache = SQLiteCache(namespace, _store, ttl)
+            except Exception as e:
+                print(f"[ERROR] SQLite cache unavailable, using memory: {e}")
+        elif backend != "memory":
+            print(f"[WARNING] Unknown CACHE_BACKEND '{backend}', using memory")
+        cache = cache or MemoryCache(namespace, ttl)
+        _caches[namespace] = cache
+        return cache
+
+
+def clear_caches():
+    """Empty every namespace (benchmarks use this to measure cold paths)."""
+    for namespace in CACHE_TTLS:
+        get_cache(namespace).clear()
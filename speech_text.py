@@ -0,0 +1,296 @@
+"""
+Speech text preparation for TimeTraveler AI.
+Turns a chat reply into what a voice should read: markdown is stripped, era
+notation and numerals are spelled out, and Tamil-script names inside English
+sentences are transliterated (whole Tamil sentences are kept for a Tamil
+voice). The result is cut into chunks of bounded size at sentence, then
+clause, then word boundaries, so long replies are synthesized in parallel
+instead of being truncated.
+"""
+
+import re
+from typing import List, NamedTuple
+
+# Chunk sizes in characters. The first chunk is short so audio starts quickly.
+MAX_CHUNK_CHARS = 400
+FIRST_CHUNK_CHARS = 160
+
+
+class SpeechChunk(NamedTuple):
+    text: str
+    lang: str  # "en", or "ta" for Tamil script
+
+
+# Markdown and markup
+_CODE_BLOCK = re.compile(r"```.*?```", re.S)
+_INLINE_CODE = re.compile(r"`([^`]*)`")
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_URL = re.compile(r"https?://\S+")
+_HTML_TAG = re.compile(r"<[^>]+>")
+_RULE = re.compile(r"^\s*([-*_]\s*){3,}$", re.M)
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{2,}.*$", re.M)
+_LINE_PREFIX = re.compile(r"^\s*(#{1,6}\s+|>\s?|[-*+•]\s+|\d+[.)]\s+)", re.M)
+_EMPHASIS = re.compile(r"(\*\*|__|~~)(.+?)\1|(?<!\w)([*_])(?!\s)(.+?)(?<!\s)\3(?!\w)")
+_STRAY_MARKS = re.compile(r"[*_#~`|]")
+_EMOJI = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]")
+_SPACES = re.compile(r"[ \t]+")
+
+# Era notation and numerals
+_ERA_MARKS = {"BCE": "B C E", "BC": "B C", "CE": "C E", "AD": "A D"}
+_DOTTED_ERA = re.compile(r"\b(B\.C\.E|B\.C|C\.E|A\.D)\.")
+_SENTENCE_FOLLOWS = re.compile(r"\s+[A-Z]|\s*$")
+_ERA = r"(BCE|BC|CE|AD)\b"
+_RANGE = re.compile(r"\b(\d{1,4})\s*[-–—]\s*(\d{1,4})(?=\s*" + _ERA + r")")
+_ERA_AFTER = re.compile(r"\b(\d{1,4})\s*" + _ERA)
+_ERA_BEFORE = re.compile(r"\bAD\s*(\d{1,4})\b")
+_ERA_WORD = re.compile(r"\b(centur(?:y|ies)|millenni(?:um|a))\s+" + _ERA)
+_CIRCA = re.compile(r"\b(?:c|ca)\.\s*(?=\d)")
+_CENTURY_RANGE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)\s*[-–—]\s*(?=\d{1,2}(?:st|nd|rd|th))")
+_ORDINAL = re.compile(r"\b(\d+)(st|nd|rd|th)\b")
+_DECADE = re.compile(r"\b(1\d|20)(\d)0s\b")
+_PERCENT = re.compile(r"(\d)\s*%")
+_NUMBER = re.compile(r"\b\d{1,3}(?:,\d{3})+(?:\.\d+)?\b|\b\d+(?:\.\d+)?\b")
+
+_ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+_SCALES = [(10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand"), (100, "hundred")]
+_LAST_WORD = re.compile(r"^(.*[ -])?([a-z]+)$")
+_ORDINAL_WORDS = {
+    "one": "first", "two": "second", "three": "third", "five": "fifth",
+    "eight": "eighth", "nine": "ninth", "twelve": "twelfth",
+}
+
+# Tamil script (U+0B80-U+0BFF) -> Latin, spelled for an English voice
+_LATIN_WORD = re.compile(r"[A-Za-z]+")
+_TAMIL_WORD = re.compile("[\u0B80-\u0BFF]+")
+_TAMIL_VOWELS = {
+    "அ": "a", "ஆ": "aa", "இ": "i", "ஈ": "ee", "உ": "u", "ஊ": "oo", "எ": "e",
+    "ஏ": "e", "ஐ": "ai", "ஒ": "o", "ஓ": "o", "ஔ": "au", "ஃ": "h",
+}
+_TAMIL_CONSONANTS = {
+    "க": "k", "ங": "ng", "ச": "ch", "ஞ": "nj", "ட": "t", "ண": "n", "த": "th",
+    "ந": "n", "ப": "p", "ம": "m", "ய": "y", "ர": "r", "ல": "l", "வ": "v",
+    "ழ": "zh", "ள": "l", "ற": "r", "ன": "n", "ஜ": "j", "ஷ": "sh", "ஸ": "s", "ஹ": "h",
+}
+_TAMIL_SIGNS = {
+    "ா": "aa", "ி": "i", "ீ": "ee", "ு": "u", "ூ": "oo", "ெ": "e",
+    "ே": "e", "ை": "ai", "ொ": "o", "ோ": "o", "ௌ": "au",
+}
+_TAMIL_VIRAMA = "்"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+
+
+def number_to_words(n: int) -> str:
+    """Cardinal words for a non-negative integer."""
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens] + (f"-{_ONES[ones]}" if ones else "")
+    for scale, name in _SCALES:
+        if n >= scale:
+            head, rest = divmod(n, scale)
+            words = f"{number_to_words(head)} {name}"
+            if rest:
+                words += (" and " if rest < 100 else " ") + number_to_words(rest)
+            return words
+    return str(n)
+
+
+def ordinal_words(n: int) -> str:
+    head, last = _LAST_WORD.match(number_to_words(n)).groups()
+    if last in _ORDINAL_WORDS:
+        last = _ORDINAL_WORDS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return (head or "") + last
+
+
+def year_words(n: int) -> str:
+    """Years the way they are said: 1632 -> sixteen thirty-two, 1900 -> nineteen hundred."""
+    if n < 1000 or n >= 10000 or 2000 <= n < 2010 or n % 1000 == 0:
+        return number_to_words(n)
+    head, tail = divmod(n, 100)
+    if tail == 0:
+        return f"{number_to_words(head)} hundred"
+    return f"{number_to_words(head)} {'oh-' + _ONES[tail] if tail < 10 else number_to_words(tail)}"
+
+
+def _undot_era(match: re.Match) -> str:
+    """B.C. -> BC, keeping the final period only where it also ends a sentence."""
+    mark = match.group(1).replace(".", "")
+    return mark + "." if _SENTENCE_FOLLOWS.match(match.string, match.end()) else mark
+
+
+def expand_eras(text: str) -> str:
+    """
+    Spell out era notation and circa. Runs before sentence splitting, since
+    "c." and "B.C." would otherwise read as sentence ends.
+    """
+    text = _CIRCA.sub("circa ", text)
+    text = _DOTTED_ERA.sub(_undot_era, text)
+    text = _RANGE.sub(r"\1 to \2", text)
+    text = _ERA_AFTER.sub(lambda m: f"{year_words(int(m.group(1)))} {_ERA_MARKS[m.group(2)]}", text)
+    text = _ERA_BEFORE.sub(lambda m: f"{_ERA_MARKS['AD']} {year_words(int(m.group(1)))}", text)
+    return _ERA_WORD.sub(lambda m: f"{m.group(1)} {_ERA_MARKS[m.group(2)]}", text)
+
+
+def _spell_number(match: re.Match) -> str:
+    raw = match.group(0)
+    whole, _, fraction = raw.replace(",", "").partition(".")
+    value = int(whole)
+    # Plain four-digit numbers in prose are almost always years
+    words = year_words(value) if "," not in raw and 1000 <= value < 2100 else number_to_words(value)
+    if fraction:
+        words += " point " + " ".join(_ONES[int(d)] for d in fraction)
+    return words
+
+
+def expand_numbers(text: str) -> str:
+    """Spell out centuries, ordinals, decades, percents and numerals."""
+    text = _CENTURY_RANGE.sub(lambda m: f"{ordinal_words(int(m.group(1)))} to ", text)
+    text = _ORDINAL.sub(lambda m: ordinal_words(int(m.group(1))), text)
+    text = _DECADE.sub(lambda m: _decade_words(int(m.group(1)), int(m.group(2))), text)
+    text = _PERCENT.sub(r"\1 percent", text)
+    return _NUMBER.sub(_spell_number, text)
+
+
+def _decade_words(century: int, decade: int) -> str:
+    if decade == 0:
+        return f"{number_to_words(century)} hundreds"
+    tens = _TENS[decade] if decade > 1 else "ten"
+    return f"{number_to_words(century)} {tens[:-1] + 'ies' if tens.endswith('y') else tens + 's'}"
+
+
+def transliterate_tamil(word: str) -> str:
+    """Latin spelling of a Tamil-script word (e.g. நெல்லையப்பர் -> nellaiyappar)."""
+    out = []
+    i = 0
+    while i < len(word):
+        ch = word[i]
+        nxt = word[i + 1] if i + 1 < len(word) else ""
+        if ch in _TAMIL_CONSONANTS:
+            out.append(_TAMIL_CONSONANTS[ch])
+            if nxt == _TAMIL_VIRAMA:
+                i += 1
+            elif nxt in _TAMIL_SIGNS:
+                out.append(_TAMIL_SIGNS[nxt])
+                i += 1
+            else:
+                out.append("a")
+        elif ch in _TAMIL_VOWELS:
+            out.append(_TAMIL_VOWELS[ch])
+        i += 1
+    latin = "".join(out)
+    return latin[:1].upper() + latin[1:]
+
+
+def is_tamil(text: str) -> bool:
+    """True when most words are in Tamil script (a Tamil sentence, not a name)."""
+    tamil = len(_TAMIL_WORD.findall(text))
+    return tamil > 0 and tamil >= len(_LATIN_WORD.findall(text))
+
+
+def strip_markdown(text: str) -> str:
+    """Plain sentences from markdown: markup removed, lines ended as sentences."""
+    text = _CODE_BLOCK.sub(" ", text)
+    text = _INLINE_CODE.sub(r"\1", text)
+    text = _IMAGE.sub(r"\1", text)
+    text = _LINK.sub(r"\1", text)
+    text = _URL.sub("", text)
+    text = _HTML_TAG.sub(" ", text)
+    text = _RULE.sub("", text)
+    text = _TABLE_RULE.sub("", text)
+    text = _LINE_PREFIX.sub("", text)
+    for _ in range(2):
+        # Twice for nested emphasis like ***word***
+        text = _EMPHASIS.sub(lambda m: m.group(2) or m.group(4), text)
+    text = _STRAY_MARKS.sub(" ", text)
+    text = _EMOJI.sub("", text)
+
+    lines = []
+    for line in text.splitlines():
+        line = _SPACES.sub(" ", line).strip()
+        if not line:
+            continue
+        # Headings and list items become sentences of their own
+        if line[-1] not in ".!?।:;,\"')":
+            line += "."
+        lines.append(line)
+    return " ".join(lines)
+
+
+def _normalize_sentence(sentence: str, keep_tamil: bool) -> SpeechChunk:
+    if keep_tamil and is_tamil(sentence):
+        return SpeechChunk(sentence, "ta")
+    sentence = _TAMIL_WORD.sub(lambda m: transliterate_tamil(m.group(0)), sentence)
+    return SpeechChunk(expand_numbers(sentence), "en")
+
+
+def normalize_speech_text(text: str, keep_tamil: bool = True) -> str:
+    """The full reply as it should be read, without chunking."""
+    return " ".join(chunk.text for chunk in _sentences(text, keep_tamil))
+
+
+def _sentences(text: str, keep_tamil: bool) -> List[SpeechChunk]:
+    plain = expand_eras(strip_markdown(text or ""))
+    return [_normalize_sentence(s, keep_tamil) for s in _SENTENCE_END.split(plain) if s.strip()]
+
+
+def _split_long(sentence: str, limit: int) -> List[str]:
+    """Break an over-long sentence at clause boundaries, then between words."""
+    pieces = []
+    for clause in _CLAUSE_END.split(sentence):
+        while len(clause) > limit:
+            cut = clause.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            pieces.append(clause[:cut])
+            clause = clause[cut:].lstrip()
+        if clause:
+            pieces.append(clause)
+    return pieces
+
+
+def chunk_speech(
+    text: str,
+    max_chars: int = MAX_CHUNK_CHARS,
+    first_chars: int = FIRST_CHUNK_CHARS,
+    keep_tamil: bool = True
+) -> List[SpeechChunk]:
+    """
+    Normalized text in chunks of at most max_chars (first_chars for the first),
+    packed from whole sentences; a chunk never mixes Tamil and English.
+    """
+    chunks: List[SpeechChunk] = []
+    current, lang = "", "en"
+
+    def limit() -> int:
+        return first_chars if not chunks else max_chars
+
+    def flush():
+        nonlocal current
+        if current:
+            chunks.append(SpeechChunk(current, lang))
+            current = ""
+
+    for sentence in _sentences(text, keep_tamil):
+        if current and (sentence.lang != lang or len(current) + 1 + len(sentence.text) > limit()):
+            flush()
+        lang = sentence.lang
+        if len(sentence.text) > limit():
+            pieces = _split_long(sentence.text, limit())
+            for piece in pieces[:-1]:
+                current = piece
+                flush()
+            sentence = SpeechChunk(pieces[-1], lang)
+        current = f"{current} {sentence.text}" if current else sentence.text
+    flush()
+    return chunks
@@ -0,0 +1,92 @@
+"""
+HTML templates for TimeTraveler AI.
+Templates are compiled once at import into literal chunks and field slots.
+`{{ field }}` is HTML-escaped; `{{{ field }}}` inserts trusted markup built by
+another template. Rendered fragments are memoized by their inputs, and CSS is
+injected into the page head once per session instead of on every rerun.
+"""
+
+import html
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+_FIELD = re.compile(r"\{\{\{\s*(\w+)\s*\}\}\}|\{\{\s*(\w+)\s*\}\}")
+# Rendered fragments kept per process
+RENDER_CACHE_SIZE = 512
+
+
+class Template:
+    """A compiled template: render(**fields) is a single join."""
+
+    __slots__ = ("name", "_parts")
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        # Alternating literals and (field, escape) slots
+        self._parts: List = []
+        pos = 0
+        for match in _FIELD.finditer(source):
+            self._parts.append(source[pos:match.start()])
+            raw, escaped = match.group(1), match.group(2)
+            self._parts.append((raw or escaped, escaped is not None))
+            pos = match.end()
+        self._parts.append(source[pos:])
+
+    def render(self, **fields) -> str:
+        out = []
+        for part in self._parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            name, escape = part
+            value = fields.get(name, "")
+            value = "" if value is None else str(value)
+            out.append(html.escape(value, quote=True) if escape else value)
+        return "".join(out)
+
+
+_TEMPLATES: Dict[str, Template] = {}
+
+
+def compile_template(name: str, source: str) -> Template:
+    """Compile and register a template (call at import time)."""
+    template = Template(name, source)
+    _TEMPLATES[name] = template
+    return template
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_cached(name: str, fields: Tuple) -> str:
+    return _TEMPLATES[name].render(**dict(fields))
+
+
+def render(template: Template, **fields) -> str:
+    """Render with memoization keyed by template and field values."""
+    return _render_cached(template.name, tuple(sorted(fields.items())))
+
+
+def inject_css_once(key: str, css: str):
+    """
+    Add a <style> block to the page head once per session.
+    A st.markdown style would be re-sent in every rerun's delta; a style in
+    the head persists across reruns, so later calls are no-ops.
+    """
+    injected = st.session_state.setdefault("_injected_css", set())
+    if key in injected:
+        return
+    components.html(f"""<script>
+        const doc = window.parent.document;
+        const id = {json.dumps("tt-css-" + key)};
+        if (!doc.getElementById(id)) {{
+            const style = doc.createElement("style");
+            style.id = id;
+            style.textContent = {json.dumps(css)};
+            doc.head.appendChild(style);
+        }}
+    </script>""", height=0)
+    injected.add(key)
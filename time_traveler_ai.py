@@ -1,11 +1,14 @@
 import streamlit as st
-import google.generativeai as genai
-from gtts import gTTS
 import base64
 from io import BytesIO
 from PIL import Image
 import json
 from datetime import datetime
+
+from model_registry import get_model
+from tts_backends import get_tts_backend
+
+LEGACY_MODEL = "gemini-1.5-flash"
 PERSONAS = {
     "king_rama_pandya": {
         "name": "King Rama Pandya",
@@ -222,11 +225,8 @@ def get_persona_response(persona_key, landmark_key, user_message, model, chat_hi
         return f"*The spirit seems distant... * (Error: {str(e)})"
 def text_to_speech(text, slow=False):
     try:
-        tts = gTTS(text=text, lang='en', slow=slow)
-        audio_bytes = BytesIO()
-        tts.write_to_fp(audio_bytes)
-        audio_bytes. seek(0)
-        return audio_bytes
+        audio = get_tts_backend("gtts").synthesize(text, {"slow": slow})
+        return BytesIO(audio) if audio else None
     except Exception as e:
         st.error(f"Audio generation failed: {e}")
         return None
@@ -304,7 +304,7 @@ def main():
         api_key = st. text_input("Gemini API Key", type="password",
                                 help="Get your key from https://makersuite.google.com/app/apikey")
         if api_key:
-            genai.configure(api_key=api_key)
+            st.session_state.api_key = api_key
             st.session_state.api_key_set = True
             st.success("✅ API Key configured!")
         st.markdown("---")
@@ -359,7 +359,7 @@ def main():
             st.image(image, caption="Your captured moment", use_container_width=True)
             if st.session_state.api_key_set:
                 with st.spinner("🔮 The spirits are awakening..."):
-                    model = genai. GenerativeModel('gemini-1.5-flash')
+                    model = get_model(st.session_state.api_key, LEGACY_MODEL)
                     identification = identify_landmark(image, model)
                     st.markdown(f"**Detected:** {identification. get('features', 'Unknown')}")
                     landmark_key = match_landmark(identification)
@@ -413,7 +413,7 @@ def main():
             if not st.session_state.chat_history and st.session_state.api_key_set:
                 persona = PERSONAS[st.session_state.current_persona]
                 with st.spinner(f"{persona['avatar']} {persona['name']} is awakening..."):
-                    model = genai.GenerativeModel('gemini-1.5-flash')
+                    model = get_model(st.session_state.api_key, LEGACY_MODEL)
                     greeting_prompt = "Greet the traveler who just arrived.  Introduce yourself briefly and welcome them to this place.  Keep it to 2-3 sentences."
                     response = get_persona_response(
                         st.session_state.current_persona,
@@ -450,7 +450,7 @@ def main():
                     "content": user_input
                 })
                 with st.spinner("✨ Channeling the past..."):
-                    model = genai.GenerativeModel('gemini-1.5-flash')
+                    model = get_model(st.session_state.api_key, LEGACY_MODEL)
                     response = get_persona_response(
                         st.session_state. current_persona,
                         st.session_state.current_landmark,
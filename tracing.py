@@ -0,0 +1,256 @@
+"""
+Tracing for TimeTraveler AI.
+Lightweight spans around the hot path, exported as JSON lines (or to
+OpenTelemetry when installed). Off unless the TRACING setting is on; span
+listeners such as the metrics registry receive spans either way. The trace
+file is rotated at TRACE_MAX_BYTES, keeping one previous file (.1).
+
+Spans are queued and written by a background thread, so the request path
+only pays for two perf_counter() calls and a queue put. With tracing off,
+and no listeners, span() returns a shared no-op object.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional
+
+from config import get_setting, get_bool_setting
+
+DEFAULT_TRACE_FILE = "traces.jsonl"
+DEFAULT_TRACE_MAX_BYTES = 50 * 1024 * 1024
+# Largest batch written per flush
+EXPORT_BATCH = 256
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+# Callables receiving every finished span (e.g. the metrics registry)
+_listeners = []
+
+
+class Span:
+    """A timed operation with attributes."""
+
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "end", "_otel")
+
+    def __init__(self, name: str, attrs: Dict, parent: Optional["Span"]):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.perf_counter()
+        self.end = None
+        self._otel = None
+
+    def set(self, **attrs):
+        """Attach attributes (bytes, tokens, cache_hit, ...)."""
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "ts": time.time(),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _JsonLinesExporter:
+    """Writes finished spans to a file from a background thread."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)
+
+    def export(self, span: Span):
+        try:
+            self.queue.put_nowait(span.to_dict())
+        except queue.Full:
+            # Never block the request path on a slow disk
+            self.dropped += 1
+
+    def _drain(self):
+        batch = []
+        while len(batch) < EXPORT_BATCH:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in batch))
+
+    def _rotate(self):
+        try:
+            if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+        except FileNotFoundError:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()] + self._drain()
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Keep the writer alive; this batch is lost
+                self.dropped += len(batch)
+                print(f"[WARNING] Trace export failed ({self.dropped} spans dropped): {e}")
+
+    def flush(self):
+        try:
+            self._write(self._drain())
+        except Exception:
+            pass
+
+
+class _Tracer:
+    def __init__(self):
+        self.enabled = get_bool_setting("TRACING", False)
+        self.exporter = None
+        self.otel_tracer = None
+        if not self.enabled:
+            return
+
+        if get_setting("TRACE_EXPORTER", "jsonl") == "otel":
+            try:
+                from opentelemetry import trace
+                self.otel_tracer = trace.get_tracer("timetraveler-ai")
+            except ImportError:
+                print("[WARNING] opentelemetry not installed, exporting traces as JSON lines")
+        if self.otel_tracer is None:
+            self.exporter = _JsonLinesExporter(
+                get_setting("TRACE_FILE", DEFAULT_TRACE_FILE),
+                int(get_setting("TRACE_MAX_BYTES", DEFAULT_TRACE_MAX_BYTES))
+            )
+
+    def finish(self, s: Span):
+        s.end = time.perf_counter()
+        if s._otel is not None:
+            s._otel.set_attributes({k: v for k, v in s.attrs.items() if isinstance(v, (str, bool, int, float))})
+            s._otel.end()
+        if self.exporter:
+            self.exporter.export(s)
+        for listener in _listeners:
+            try:
+                listener(s)
+            except Exception as e:
+                print(f"[ERROR] span listener failed: {e}")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> _Tracer:
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = _Tracer()
+    return _tracer
+
+
+def tracing_enabled() -> bool:
+    return get_tracer().enabled
+
+
+def add_span_listener(listener):
+    """Receive every finished span, even when export is turned off."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a span:
+
+        with span("analyze_image", image_bytes=n) as s:
+            ...
+            s.set(tokens=count)
+    """
+    tracer = get_tracer()
+    if not tracer.enabled and not _listeners:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    s = Span(name, attrs, parent)
+    if tracer.otel_tracer is not None:
+        from opentelemetry import trace
+        # Nest under the parent's OTel span so exported traces keep their tree
+        context = trace.set_span_in_context(parent._otel) if parent is not None and parent._otel is not None else None
+        s._otel = tracer.otel_tracer.start_span(name, context=context)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(s)
+
+
+def current_span():
+    """The innermost active span (a no-op span when there is none)."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str = None):
+    """Decorator form of span() for whole functions."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def response_usage(response) -> Dict:
+    """Token counts from a Gemini response, when the SDK reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", 0),
+        "output_tokens": getattr(usage, "candidates_token_count", 0),
+    }
@@ -0,0 +1,444 @@
+"""
+Text-to-Speech backends for TimeTraveler AI.
+A common interface over Edge-TTS, gTTS, ElevenLabs and local offline engines
+(eSpeak-NG, Piper). The active backend is chosen per deployment via TTS_BACKEND.
+"""
+
+import asyncio
+import re
+import shutil
+import subprocess
+import threading
+import queue
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config import get_setting
+from shared_cache import cache_key
+from speech_text import SpeechChunk, chunk_speech
+
+DEFAULT_BACKEND = "edge"
+# Chunks of one utterance synthesized at once
+DEFAULT_TTS_PARALLELISM = 4
+
+
+def _run_async(coro):
+    """Run a coroutine to completion on a private event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _iterate_async(agen_factory) -> Iterator[bytes]:
+    """Bridge an async generator to a sync iterator using a worker thread."""
+    chunks = queue.Queue(maxsize=64)
+    done = object()
+
+    def worker():
+        async def pump():
+            async for chunk in agen_factory():
+                chunks.put(chunk)
+        try:
+            _run_async(pump())
+        except Exception as e:
+            print(f"TTS stream error: {e}")
+        finally:
+            chunks.put(done)
+
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        chunk = chunks.get()
+        if chunk is done:
+            return
+        yield chunk
+
+
+def _percent(value: str, default: float = 0.0) -> float:
+    """Parse an Edge-TTS style rate like "-15%" into a fraction."""
+    match = re.match(r"^([+-]?\d+)%$", str(value or "").strip())
+    return int(match.group(1)) / 100 if match else default
+
+
+def _hertz(value: str, default: int = 0) -> int:
+    """Parse an Edge-TTS style pitch like "-10Hz" into an integer offset."""
+    match = re.match(r"^([+-]?\d+)Hz$", str(value or "").strip())
+    return int(match.group(1)) if match else default
+
+
+class TTSBackend(ABC):
+    """
+    Base interface every TTS backend implements.
+    Backends receive speech-ready text (see speech_text); synthesize_speech
+    and stream_speech below prepare and chunk a reply for them.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def synthesize(self, text: str, voice_settings: Dict) -> Optional[bytes]:
+        """Synthesize the full utterance and return encoded audio bytes."""
+
+    def stream(self, text: str, voice_settings: Dict) -> Iterator[bytes]:
+        """Yield encoded audio chunks as they become available."""
+        audio = self.synthesize(text, voice_settings)
+        if audio:
+            yield audio
+
+    def list_voices(self) -> List[Dict]:
+        """List voices as dicts with at least 'id', 'locale' and 'gender'."""
+        return []
+
+    def audio_cache_key(self, text: str, voice_settings: Dict) -> str:
+        """Key of the synthesized clip in the shared audio cache."""
+        return cache_key(
+            self.name, text,
+            *(voice_settings.get(k) for k in ("voice", "rate", "pitch", "slow", "elevenlabs_voice_id"))
+        )
+
+    def capabilities(self) -> Dict:
+        """Describe what this backend supports."""
+        return {
+            "streaming": False,
+            "offline": False,
+            "rate_pitch": False,
+            "mime_type": "audio/mpeg",
+        }
+
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edge neural voices (remote)."""
+
+    name = "edge"
+
+    def synthesize(self, text: str, voice_settings: Dict) -> Optional[bytes]:
+        from voice_engine import _generate_speech_async
+        return _run_async(_generate_speech_async(
+            text,
+            voice_settings.get("voice", "en-US-GuyNeural"),
+            voice_settings.get("rate", "-10%"),
+            voice_settings.get("pitch", "-5Hz")
+        ))
+
+    def stream(self, text: str, voice_settings: Dict) -> Iterator[bytes]:
+        import edge_tts
+
+        clean_text = text.strip()
+        if not clean_text:
+            return iter(())
+
+        async def chunks():
+            communicate = edge_tts.Communicate(
+                text=clean_text,
+                voice=voice_settings.get("voice", "en-US-GuyNeural"),
+                rate=voice_settings.get("rate", "-10%"),
+                pitch=voice_settings.get("pitch", "-5Hz")
+            )
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    yield chunk["data"]
+
+        return _iterate_async(chunks)
+
+    def list_voices(self) -> List[Dict]:
+        import edge_tts
+        voices = _run_async(edge_tts.list_voices())
+        return [{
+            "id": v["ShortName"],
+            "locale": v["Locale"],
+            "gender": v["Gender"].lower(),
+            "styles": v.get("VoiceTag", {}).get("VoicePersonalities", []),
+        } for v in voices]
+
+    def capabilities(self) -> Dict:
+        return {
+            "streaming": True,
+            "offline": False,
+            "rate_pitch": True,
+            "mime_type": "audio/mpeg",
+            # Has voices for other scripts (Tamil sentences get a ta-IN voice)
+            "multilingual": True,
+        }
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS (remote, single voice per language)."""
+
+    name = "gtts"
+
+    def synthesize(self, text: str, voice_settings: Dict) -> Optional[bytes]:
+        from gtts import gTTS
+
+        clean_text = text.strip()
+        if not clean_text:
+            return None
+        # gTTS picks its accent through the Translate domain; regional ones
+        # (co.in, co.uk, com.au) only when the voice settings ask for one
+        tld = voice_settings.get("gtts_tld") or "com"
+        audio = BytesIO()
+        gTTS(text=clean_text, lang="en", tld=tld, slow=voice_settings.get("slow", False)).write_to_fp(audio)
+        return audio.getvalue()
+
+    def audio_cache_key(self, text: str, voice_settings: Dict) -> str:
+        return cache_key(super().audio_cache_key(text, voice_settings), voice_settings.get("gtts_tld"))
+
+    def list_voices(self) -> List[Dict]:
+        from gtts.lang import tts_langs
+        return [{"id": code, "locale": code, "gender": "female"} for code in tts_langs()]
+
+
+class ElevenLabsBackend(TTSBackend):
+    """ElevenLabs voices (remote); needs ELEVENLABS_API_KEY."""
+
+    name = "elevenlabs"
+
+    def __init__(self):
+        self.api_key = get_setting("ELEVENLABS_API_KEY")
+
+    def _voice_id(self, voice_settings: Dict) -> str:
+        from elevenlabs_integration import DEFAULT_VOICE_ID
+        return voice_settings.get("elevenlabs_voice_id", DEFAULT_VOICE_ID)
+
+    def synthesize(self, text: str, voice_settings: Dict) -> Optional[bytes]:
+        from elevenlabs_integration import elevenlabs_tts
+
+        clean_text = text.strip()
+        if not clean_text or not self.api_key:
+            return None
+        audio = elevenlabs_tts(clean_text, self.api_key, self._voice_id(voice_settings))
+        return audio.getvalue() if audio else None
+
+    def stream(self, text: str, voice_settings: Dict) -> Iterator[bytes]:
+        from elevenlabs_integration import elevenlabs_tts_stream
+
+        clean_text = text.strip()
+        if not clean_text or not self.api_key:
+            return iter(())
+        return elevenlabs_tts_stream(clean_text, self.api_key, self._voice_id(voice_settings))
+
+    def list_voices(self) -> List[Dict]:
+        from elevenlabs_integration import elevenlabs_voices
+        if not self.api_key:
+            return []
+        return [{
+            "id": v["voice_id"],
+            "locale": v.get("labels", {}).get("accent", ""),
+            "gender": v.get("labels", {}).get("gender", ""),
+        } for v in elevenlabs_voices(self.api_key)]
+
+    def capabilities(self) -> Dict:
+        return {
+            "streaming": True,
+            "offline": False,
+            "rate_pitch": False,
+            "mime_type": "audio/mpeg",
+        }
+
+
+class EspeakNGBackend(TTSBackend):
+    """eSpeak-NG command line synthesizer (local, CPU only, WAV output)."""
+
+    name = "espeak"
+
+    # Edge-TTS locale -> eSpeak-NG voice
+    LOCALE_VOICES = {
+        "en-GB": "en-gb",
+        "en-US": "en-us",
+        "en-IN": "en-gb-x-rp",
+    }
+    BASE_WPM = 175
+
+    def __init__(self):
+        self.binary = get_setting("ESPEAK_BINARY") or shutil.which("espeak-ng") or "espeak-ng"
+
+    def _args(self, voice_settings: Dict) -> List[str]:
+        voice_id = voice_settings.get("voice", "en-US")
+        locale = "-".join(voice_id.split("-")[:2])
+        variant = "+f3" if voice_settings.get("gender") == "female" else "+m3"
+        voice = self.LOCALE_VOICES.get(locale, "en-us") + variant
+        speed = int(self.BASE_WPM * (1 + _percent(voice_settings.get("rate"))))
+        # eSpeak pitch is 0-99 with 50 as neutral
+        pitch = max(0, min(99, 50 + 2 * _hertz(voice_settings.get("pitch"))))
+        return ["-v", voice, "-s", str(speed), "-p", str(pitch)]
+
+    def synthesize(self, text: str, voice_settings: Dict) -> Optional[bytes]:
+        clean_text = text.strip()
+        if not clean_text:
+            return None
+        result = subprocess.run(
+            [self.binary, "--stdout", *self._args(voice_settings)],
+            input=clean_text.encode(),
+            capture_output=True,
+            timeout=60
+        )
+        if result.returncode != 0:
+            print(f"TTS Error: espeak-ng exited {result.returncode}: {result.stderr.decode(errors='ignore')[:200]}")
+            return None
+        return result.stdout
+
+    def list_voices(self) -> List[Dict]:
+        result = subprocess.run([self.binary, "--voices=en"], capture_output=True, timeout=10)
+        voices = []
+        for line in result.stdout.decode(errors="ignore").splitlines()[1:]:
+            parts = line.split()
+            # Columns: Pty Language Age/Gender VoiceName File ...
+            if len(parts) >= 4:
+                voices.append({
+                    "id": parts[1],
+                    "name": parts[3],
+                    "locale": parts[1],
+                    "gender": "male" if parts[2].endswith("M") else "female",
+                })
+        return voices
+
+    def capabilities(self) -> Dict:
+        return {
+            "streaming": False,
+            "offline": True,
+            "rate_pitch": True,
+            "mime_type": "audio/wav",
+        }
+
+
+class PiperBackend(TTSBackend):
+    """Piper neural synthesizer (local, CPU only, WAV output); needs PIPER_MODEL."""
+
+    name = "piper"
+
+    def __init__(self):
+        self.binary = get_setting("PIPER_BINARY") or shutil.which("piper") or "piper"
+        self.model = get_setting("PIPER_MODEL")
+
+    def synthesize(self, text: str, voice_settings: Dict) -> Optional[bytes]:
+        clean_text = text.strip()
+        if not clean_text or not self.model:
+            return None
+        # Piper expresses speed as length_scale (>1 is slower)
+        length_scale = 1 / max(0.25, 1 + _percent(voice_settings.get("rate")))
+        result = subprocess.run(
+            [self.binary, "--model", self.model, "--length_scale", f"{length_scale:.2f}", "--output_file", "-"],
+            input=clean_text.encode(),
+            capture_output=True,
+            timeout=120
+        )
+        if result.returncode != 0:
+            print(f"TTS Error: piper exited {result.returncode}: {result.stderr.decode(errors='ignore')[:200]}")
+            return None
+        return result.stdout
+
+    def list_voices(self) -> List[Dict]:
+        return [{"id": self.model, "locale": "", "gender": ""}] if self.model else []
+
+    def capabilities(self) -> Dict:
+        return {
+            "streaming": False,
+            "offline": True,
+            "rate_pitch": False,
+            "mime_type": "audio/wav",
+        }
+
+
+TTS_BACKENDS = {
+    "edge": EdgeTTSBackend,
+    "gtts": GTTSBackend,
+    "elevenlabs": ElevenLabsBackend,
+    "espeak": EspeakNGBackend,
+    "piper": PiperBackend,
+}
+
+_instances: Dict[str, TTSBackend] = {}
+
+
+def get_tts_backend(name: str = None) -> TTSBackend:
+    """Get the named backend, or the deployment's TTS_BACKEND (default: edge)."""
+    name = (name or get_setting("TTS_BACKEND", DEFAULT_BACKEND)).lower()
+    if name not in TTS_BACKENDS:
+        print(f"[WARNING] Unknown TTS backend '{name}', using {DEFAULT_BACKEND}")
+        name = DEFAULT_BACKEND
+    if name not in _instances:
+        _instances[name] = TTS_BACKENDS[name]()
+    return _instances[name]
+
+
+def prepare_speech(backend: TTSBackend, text: str) -> List[SpeechChunk]:
+    """Normalized, chunked text; Tamil sentences are kept only for backends with Tamil voices."""
+    return chunk_speech(text, keep_tamil=backend.capabilities().get("multilingual", False))
+
+
+def _chunk_settings(chunk: SpeechChunk, voice_settings: Dict) -> Dict:
+    """Voice for a chunk: the narrator's, or a Tamil voice of the same gender."""
+    if chunk.lang == "ta":
+        from voice_catalog import voice_for_locale
+        voice = voice_for_locale("ta-IN", voice_settings.get("gender", "male"))
+        if voice:
+            settings = voice_settings.to_dict() if hasattr(voice_settings, "to_dict") else dict(voice_settings)
+            settings["voice"] = voice
+            return settings
+    return voice_settings
+
+
+def join_audio(parts: List[Optional[bytes]], mime_type: str) -> Optional[bytes]:
+    """Concatenate clips: MP3 frames join as-is, WAV needs one header."""
+    parts = [p for p in parts if p]
+    if len(parts) <= 1:
+        return parts[0] if parts else None
+    if mime_type != "audio/wav":
+        return b"".join(parts)
+    import wave
+    out = BytesIO()
+    with wave.open(BytesIO(parts[0])) as first:
+        params = first.getparams()
+    with wave.open(out, "wb") as writer:
+        writer.setparams(params)
+        for part in parts:
+            with wave.open(BytesIO(part)) as reader:
+                writer.writeframes(reader.readframes(reader.getnframes()))
+    return out.getvalue()
+
+
+def _parallelism(chunks: int) -> int:
+    return max(1, min(chunks, int(get_setting("TTS_PARALLELISM", DEFAULT_TTS_PARALLELISM))))
+
+
+def synthesize_speech(backend: TTSBackend, text: str, voice_settings: Dict) -> Optional[bytes]:
+    """Synthesize a whole reply, its chunks in parallel, as one clip."""
+    chunks = prepare_speech(backend, text)
+    if not chunks:
+        return None
+    if len(chunks) == 1:
+        return backend.synthesize(chunks[0].text, _chunk_settings(chunks[0], voice_settings))
+    with ThreadPoolExecutor(max_workers=_parallelism(len(chunks))) as pool:
+        parts = list(pool.map(lambda c: backend.synthesize(c.text, _chunk_settings(c, voice_settings)), chunks))
+    missing = sum(1 for p in parts if not p)
+    if missing:
+        print(f"[WARNING] {missing} of {len(chunks)} speech chunks failed to synthesize")
+    return join_audio(parts, backend.capabilities()["mime_type"])
+
+
+def stream_speech(backend: TTSBackend, text: str, voice_settings: Dict) -> Iterator[bytes]:
+    """
+    Stream a reply: the first (short) chunk streams from the backend while
+    the rest are synthesized in parallel and follow in order.
+    """
+    chunks = prepare_speech(backend, text)
+    if not chunks:
+        return
+    pool = ThreadPoolExecutor(max_workers=_parallelism(len(chunks) - 1))
+    try:
+        rest = [
+            pool.submit(backend.synthesize, c.text, _chunk_settings(c, voice_settings))
+            for c in chunks[1:]
+        ]
+        yield from backend.stream(chunks[0].text, _chunk_settings(chunks[0], voice_settings))
+        for i, future in enumerate(rest, start=1):
+            audio = future.result()
+            if audio:
+                yield audio
+            else:
+                print(f"[WARNING] Speech chunk {i} of {len(chunks)} failed to synthesize")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
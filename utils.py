@@ -3,11 +3,17 @@ Utility functions for TimeTraveler AI.
 Handles AI interactions, dynamic persona generation, and helper functions.
 """
 
-import streamlit as st
-import google.generativeai as genai
+import hashlib
 import json
-import re
-from typing import Optional, Dict, List
+import time
+from typing import Callable, Optional, Dict, List
+
+from config import get_setting
+from model_registry import get_model, report_model_error
+from tracing import traced, current_span, response_usage
+from json_stream import JSONFieldStream
+from models import ChatHistory, Landmark, Persona
+from shared_cache import get_cache, cache_key
 
 # Configuration
 DEFAULT_MODEL = "gemini-2.5-flash-lite"
@@ -15,85 +21,231 @@ DEFAULT_MODEL = "gemini-2.5-flash-lite"
 
 def configure_gemini(api_key:  str = None) -> bool:
     """Configure Gemini API."""
+    import google.generativeai as genai
+
     if api_key:  
         genai.configure(api_key=api_key)
         return True
-    elif "GEMINI_API_KEY" in st.secrets:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+    elif get_setting("GEMINI_API_KEY"):
+        genai.configure(api_key=get_setting("GEMINI_API_KEY"))
         return True
     return False
 
 
-def get_gemini_model(model_name: str = None):
-    """Get Gemini model instance."""
-    return genai.GenerativeModel(model_name or DEFAULT_MODEL)
+def get_gemini_model(model_name: str = None, api_key: str = None, generation_config: Dict = None):
+    """
+    Get Gemini model instance.
+    Served from the shared model registry, so reruns reuse the same client.
+    """
+    api_key = api_key or get_setting("GEMINI_API_KEY")
+    if not api_key:
+        import google.generativeai as genai
+        return genai.GenerativeModel(model_name or DEFAULT_MODEL, generation_config=generation_config)
+    return get_model(api_key, model_name or DEFAULT_MODEL, generation_config)
+
+
+# Typed response schemas for structured calls. With response_mime_type set to
+# application/json Gemini decodes against the schema, so replies are bare JSON.
+_STR = {"type": "STRING"}
+_STR_LIST = {"type": "ARRAY", "items": _STR}
+_GENDER = {"type": "STRING", "enum": ["male", "female"]}
+
+LANDMARK_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "identified": {"type": "BOOLEAN"},
+        "landmark_name": _STR,
+        "location": _STR,
+        "confidence": {"type": "STRING", "enum": ["high", "medium", "low"]},
+        "visual_elements": _STR,
+        "architectural_style": _STR,
+        "era": _STR,
+    },
+    "required": ["identified", "landmark_name", "location", "confidence", "era"],
+}
+
+# Short identity fields first, the long system prompt and the greeting
+# (written once the character is settled) last. The pinned SDK's Schema has no
+# property ordering, so the persona prompts list the fields in this order too.
+PERSONA_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "name": _STR,
+        "title": _STR,
+        "era": _STR,
+        "region": _STR,
+        "avatar": _STR,
+        "voice_gender": _GENDER,
+        "voice_age": {"type": "STRING", "enum": ["young", "middle", "old"]},
+        "relationship_to_landmark": _STR,
+        "personality_traits": _STR_LIST,
+        "speaking_style": _STR,
+        "historical_facts": _STR_LIST,
+        "system_prompt": _STR,
+        "greeting": _STR,
+    },
+    "required": ["name", "title", "era", "avatar", "voice_gender", "system_prompt"],
+}
+
+# The greeting is written in the same call as the persona, saving a round trip
+GREETING_FIELD_HINT = (
+    "In character, a warm 3-4 sentence welcome to a visitor who has just arrived: "
+    "introduce yourself (name and title), mention your connection to this place, "
+    "and offer to share your stories"
+)
+# Bumped when cached personas gain fields, so older entries are not reused
+PERSONA_CACHE_VERSION = 2
+
+SUGGESTIONS_SCHEMA = {"type": "ARRAY", "items": _STR}
+# Suggestion buttons shown under the chat
+SUGGESTION_COUNT = 3
+
+RELATED_PERSONAS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "name": _STR,
+            "title": _STR,
+            "era": _STR,
+            "avatar": _STR,
+            "connection": _STR,
+            "voice_gender": _GENDER,
+        },
+        "required": ["name", "title", "era", "avatar", "connection", "voice_gender"],
+    },
+}
+
+
+def json_generation_config(schema: Optional[Dict]) -> Dict:
+    """Per-call generation config for JSON output, schema-constrained when a schema is given."""
+    config = {"response_mime_type": "application/json"}
+    if schema:
+        config["response_schema"] = schema
+    return config
 
 
+def _repair_json(text: str, start: int) -> str:
+    """
+    One pass over text from start: copies the first JSON value, escaping raw
+    newlines inside strings, dropping trailing commas and closing anything a
+    truncated response left open.
+    """
+    out = []
+    closers = []
+    in_string = escaped = False
+    for ch in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                out.append("\\n")
+                continue
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n,":
+                out.pop()
+            if not closers:
+                break
+            closers.pop()
+            out.append(ch)
+            if not closers:
+                break
+            continue
+        out.append(ch)
+
+    if in_string:
+        out.append('"')
+    while out and out[-1] in " \t\r\n,:":
+        out.pop()
+    out.extend(reversed(closers))
+    return "".join(out)
+
+
+@traced()
 def clean_json_from_response(text: str) -> Optional[Dict]:
     """
-    Extract and parse JSON from AI response.
-    Tries multiple methods to handle different response formats.
+    Parse JSON from an AI response.
+    Schema-constrained replies parse directly; otherwise the first JSON value is
+    decoded in place (skipping prose or code fences around it) and, if that
+    fails, repaired in a single pass.
     """
     text = text.strip()
-    
-    # Method 1: Direct parse (if response is pure JSON)
+    current_span().set(chars=len(text))
+
     try:
         return json.loads(text)
     except json.JSONDecodeError:
         pass
-    
-    # Method 2: Extract from markdown code block ```json ...  ```
-    match = re.search(r'```(? : json)?\s*(\{.*?\})\s*```', text, re.DOTALL | re.IGNORECASE)
-    if match:
-        try: 
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            pass
-    
-    # Method 3: Extract from markdown code block ``` ... ```
-    match = re.search(r'```\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            pass
-    
-    # Method 4: Find JSON object with "identified" key
-    match = re.search(r'\{[^{}]*"identified"[^{}]*\}', text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(0))
-        except json. JSONDecodeError:
-            pass
-    
-    # Method 5: Find JSON object with "name" key (for persona)
-    match = re.search(r'\{[^{}]*"name"[^{}]*\}', text, re.DOTALL)
-    if match:
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    start = min(starts)
+
+    try:
+        return json.JSONDecoder().raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        parsed = json.loads(_repair_json(text, start))
+        current_span().set(repaired=True)
+        return parsed
+    except json.JSONDecodeError:
+        return None
+
+
+def stream_json_fields(model, prompt, generation_config: Dict, on_field: Callable[[str, object], None]):
+    """
+    Stream a JSON reply, calling on_field(key, value) as each top-level field closes.
+    Returns (full_text, last_chunk); the last chunk carries usage metadata.
+    """
+    started = time.perf_counter()
+    fields = JSONFieldStream()
+    parts = []
+    chunk = None
+    first_field_seen = False
+    for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
         try:
-            return json. loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
-    
-    # Method 6: Find any JSON object (greedy)
-    match = re.search(r'\{.*\}', text, re.DOTALL)
-    if match:
-        try: 
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
-    
-    # Method 7: Find JSON array
-    match = re.search(r'\[.*\]', text, re.DOTALL)
-    if match:
-        try: 
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
-    
-    return None
+            text = chunk.text or ""
+        except ValueError:
+            # Chunks without parts (e.g. the final finish_reason chunk)
+            text = ""
+        parts.append(text)
+        for key, value in fields.feed(text):
+            if not first_field_seen:
+                first_field_seen = True
+                current_span().set(first_field_ms=round((time.perf_counter() - started) * 1000, 1))
+            try:
+                on_field(key, value)
+            except Exception as e:
+                print(f"[WARNING] on_field callback failed for {key}: {e}")
+    return "".join(parts).strip(), chunk
+
+
+def image_cache_key(image) -> Optional[str]:
+    """Cache key from an image's pixels, or None if they cannot be read."""
+    try:
+        digest = hashlib.sha256(image.tobytes()).hexdigest()
+        return cache_key(image.mode, image.size, digest)
+    except Exception as e:
+        print(f"[WARNING] Could not fingerprint image: {e}")
+        return None
 
 
-def analyze_image(image, model) -> Dict:
+@traced()
+def analyze_image(image, model) -> Landmark:
     """Analyze image to identify landmarks."""
     prompt = """Look at this image carefully and identify the historical landmark, monument, or building shown. 
 
@@ -121,62 +273,51 @@ If you cannot identify the landmark, respond with:
 
 CRITICAL: Return ONLY the JSON object.  No explanations.  No markdown. Just the JSON."""
 
+    # Same photo (by pixels) -> same answer, across sessions and workers
+    cache = get_cache("image_analysis")
+    key = image_cache_key(image)
+    cached = cache.get(key) if key else None
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
     try:
-        response = model.generate_content([prompt, image])
+        response = model.generate_content([prompt, image], generation_config=json_generation_config(LANDMARK_SCHEMA))
         result_text = response.text. strip()
         
-        # Debug logging
-        print(f"[DEBUG] Image Analysis Raw Response:\n{result_text[: 800]}")
+        current_span().set(response_chars=len(result_text), **response_usage(response))
         
         # Parse JSON from response
         parsed = clean_json_from_response(result_text)
         
         if parsed and isinstance(parsed, dict):
-            # Ensure all required fields exist
-            parsed. setdefault("identified", False)
-            parsed.setdefault("landmark_name", "Unknown")
-            parsed.setdefault("location", "Unknown")
-            parsed.setdefault("confidence", "low")
-            parsed.setdefault("visual_elements", "")
-            parsed.setdefault("architectural_style", "Unknown")
-            parsed.setdefault("era", "Unknown")
-            
-            # Handle string "true"/"false" for identified field
-            if isinstance(parsed. get("identified"), str):
-                parsed["identified"] = parsed["identified"]. lower() == "true"
-            
-            print(f"[DEBUG] Parsed landmark: {parsed. get('landmark_name')} - Identified: {parsed.get('identified')}")
-            return parsed
+            landmark = Landmark.from_dict(parsed)
+            current_span().set(landmark=landmark.landmark_name, identified=landmark.identified)
+            if key:
+                cache.set(key, landmark)
+            return landmark
         
         # If parsing failed completely
         print(f"[ERROR] Failed to parse image analysis response")
-        return {
-            "identified": False,
-            "landmark_name": "Unknown",
-            "location": "Unknown",
-            "confidence": "none",
-            "visual_elements": f"Could not parse response",
-            "architectural_style": "Unknown",
-            "era": "Unknown"
-        }
+        return Landmark(confidence="none", visual_elements="Could not parse response")
     
     except Exception as e:
+        report_model_error(e, model)
         print(f"[ERROR] analyze_image exception: {str(e)}")
-        return {
-            "identified":  False,
-            "landmark_name": "Unknown",
-            "location": "Unknown",
-            "confidence": "none",
-            "visual_elements": f"Error: {str(e)}",
-            "architectural_style": "Unknown",
-            "era": "Unknown"
-        }
-
-
-def generate_dynamic_persona(landmark_info: Dict, model) -> Optional[Dict]:
+        return Landmark(confidence="none", visual_elements=f"Error: {str(e)}")
+
+
+@traced()
+def generate_dynamic_persona(
+    landmark_info: Landmark,
+    model,
+    on_field: Optional[Callable[[str, object], None]] = None
+) -> Optional[Persona]:
     """
     Generate the most appropriate historical persona for a landmark.
     This is the KEY function - it identifies WHO should narrate. 
+    With on_field, the reply is streamed and on_field(key, value) is called as
+    each field closes (name, title, avatar, voice first; system prompt last).
     """
     landmark_name = landmark_info.get("landmark_name", "Unknown Monument")
     location = landmark_info.get("location", "Unknown")
@@ -207,23 +348,41 @@ You MUST respond with ONLY this JSON (no other text):
     "era": "Time period they lived (e.g., 1592-1666 CE)",
     "region": "Where they were from (e.g., Mughal Empire, France)",
     "avatar": "Single emoji (👑 for royalty, 🏗️ for architects, ⚔️ for warriors)",
+    "voice_gender": "male or female",
+    "voice_age": "young, middle, or old",
     "relationship_to_landmark": "One sentence explaining their connection",
     "personality_traits": ["trait1", "trait2", "trait3"],
     "speaking_style": "How they speak (formal, poetic, military, etc.)",
-    "voice_gender": "male or female",
-    "voice_age": "young, middle, or old",
     "historical_facts": ["Fact 1 about them", "Fact 2 about the monument", "Fact 3"],
-    "system_prompt": "You are [NAME], [TITLE].  You [DID WHAT] for [LANDMARK]. You speak in a [STYLE] manner. You lived during [ERA]. Share your knowledge about [LANDMARK] and your life.  Never break character. If asked about events after your death, express confusion."
+    "system_prompt": "You are [NAME], [TITLE].  You [DID WHAT] for [LANDMARK]. You speak in a [STYLE] manner. You lived during [ERA]. Share your knowledge about [LANDMARK] and your life.  Never break character. If asked about events after your death, express confusion.",
+    "greeting": "{GREETING_FIELD_HINT}"
 }}
 
 CRITICAL: Return ONLY the JSON.  No explanations before or after."""
 
+    cache = get_cache("persona")
+    key = cache_key("dynamic", PERSONA_CACHE_VERSION, landmark_name, location, era)
+    cached = cache.get(key)
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        if on_field:
+            # Replay the fields so streaming callers update as usual
+            for field, value in cached.to_dict().items():
+                on_field(field, value)
+        return cached
+
     try:
-        response = model.generate_content(prompt)
-        result_text = response.text.strip()
+        if on_field:
+            # Without a response schema Gemini keeps the prompt's field order,
+            # so the identity and voice fields close first
+            config = json_generation_config(None)
+            result_text, response = stream_json_fields(model, prompt, config, on_field)
+        else:
+            config = json_generation_config(PERSONA_SCHEMA)
+            response = model.generate_content(prompt, generation_config=config)
+            result_text = response.text.strip()
         
-        # Debug logging
-        print(f"[DEBUG] Dynamic Persona Raw Response:\n{result_text[: 800]}")
+        current_span().set(response_chars=len(result_text), **response_usage(response))
         
         # Parse JSON from response
         persona = clean_json_from_response(result_text)
@@ -236,21 +395,13 @@ CRITICAL: Return ONLY the JSON.  No explanations before or after."""
             if missing:
                 print(f"[WARNING] Missing fields in persona: {missing}")
             
-            # Set defaults for all fields
-            persona.setdefault("name", "Historical Guide")
-            persona.setdefault("title", "Keeper of History")
-            persona.setdefault("era", "Unknown Era")
-            persona.setdefault("region", location)
-            persona.setdefault("avatar", "👤")
-            persona.setdefault("relationship_to_landmark", f"Associated with {landmark_name}")
-            persona.setdefault("personality_traits", ["wise", "knowledgeable", "dignified"])
-            persona.setdefault("speaking_style", "formal and dignified")
-            persona.setdefault("voice_gender", "male")
-            persona.setdefault("voice_age", "middle")
-            persona.setdefault("historical_facts", [])
-            persona.setdefault("system_prompt", f"You are {persona.get('name')}, {persona.get('title')}. You are connected to {landmark_name}. Share your knowledge authentically.")
+            persona = Persona.from_dict(persona, {
+                "region": location,
+                "relationship_to_landmark": f"Associated with {landmark_name}",
+            })
             
-            print(f"[DEBUG] Generated persona: {persona. get('name')} - {persona.get('title')}")
+            current_span().set(persona=persona.name)
+            cache.set(key, persona)
             return persona
         
         # Fallback if parsing failed
@@ -258,35 +409,37 @@ CRITICAL: Return ONLY the JSON.  No explanations before or after."""
         return create_fallback_persona(landmark_info)
         
     except Exception as e:
+        report_model_error(e, model)
         print(f"[ERROR] generate_dynamic_persona exception: {str(e)}")
         return create_fallback_persona(landmark_info)
 
 
-def create_fallback_persona(landmark_info: Dict) -> Dict:
+def create_fallback_persona(landmark_info: Landmark) -> Persona:
     """Create a fallback generic historian persona."""
     landmark_name = landmark_info.get("landmark_name", "this monument")
     location = landmark_info.get("location", "Unknown")
     
-    return {
-        "name": "Ancient Historian",
-        "title":  "Keeper of History",
-        "era": "Timeless",
-        "region": location,
-        "avatar": "📜",
-        "relationship_to_landmark": f"I have studied {landmark_name} extensively",
-        "personality_traits": ["scholarly", "wise", "patient"],
-        "speaking_style": "academic yet engaging",
-        "voice_gender":  "male",
-        "voice_age": "old",
-        "historical_facts":  [],
-        "system_prompt": f"""You are an ancient historian who has extensively studied {landmark_name}. 
+    return Persona(
+        name="Ancient Historian",
+        title="Keeper of History",
+        era="Timeless",
+        region=location,
+        avatar="📜",
+        relationship_to_landmark=f"I have studied {landmark_name} extensively",
+        personality_traits=("scholarly", "wise", "patient"),
+        speaking_style="academic yet engaging",
+        voice_gender="male",
+        voice_age="old",
+        historical_facts=(),
+        system_prompt=f"""You are an ancient historian who has extensively studied {landmark_name}. 
 You speak with scholarly wisdom and share fascinating historical details. 
 You are knowledgeable about the history, architecture, and cultural significance of this place. 
 Engage visitors with interesting stories and facts.  Be warm and welcoming."""
-    }
+    )
 
 
-def generate_related_personas(landmark_info: Dict, model) -> List[Dict]:
+@traced()
+def generate_related_personas(landmark_info: Landmark, model) -> List[Dict]:
     """
     Generate multiple related historical figures for a landmark.
     Allows user to choose different narrators.
@@ -321,28 +474,29 @@ Example for Taj Mahal:
 Return ONLY the JSON array. No other text."""
 
     try:
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, generation_config=json_generation_config(RELATED_PERSONAS_SCHEMA))
         result_text = response. text.strip()
         
-        # Debug logging
-        print(f"[DEBUG] Related Personas Raw Response:\n{result_text[: 600]}")
+        current_span().set(response_chars=len(result_text), **response_usage(response))
         
         # Parse JSON from response
         parsed = clean_json_from_response(result_text)
         
         if parsed and isinstance(parsed, list):
-            print(f"[DEBUG] Found {len(parsed)} related personas")
+            current_span().set(count=len(parsed))
             return parsed
         
         print(f"[WARNING] Could not parse related personas")
         return []
         
-    except Exception as e: 
+    except Exception as e:
+        report_model_error(e, model)
         print(f"[ERROR] generate_related_personas exception:  {str(e)}")
         return []
 
 
-def generate_full_persona_from_brief(brief_persona: Dict, landmark_info: Dict, model) -> Dict:
+@traced()
+def generate_full_persona_from_brief(brief_persona: Dict, landmark_info: Landmark, model) -> Persona:
     """
     Generate a full persona from a brief persona selection.
     Called when user selects a different narrator.
@@ -354,6 +508,17 @@ def generate_full_persona_from_brief(brief_persona: Dict, landmark_info: Dict, m
     avatar = brief_persona.get('avatar', '👤')
     voice_gender = brief_persona.get('voice_gender', 'male')
     landmark_name = landmark_info.get('landmark_name', 'the monument')
+    brief_defaults = {
+        "name": name,
+        "title": title,
+        "era": era,
+        "avatar": avatar,
+        "relationship_to_landmark": connection,
+        "personality_traits": ["wise", "dignified"],
+        "speaking_style": "formal",
+        "voice_gender": voice_gender,
+        "system_prompt": f"You are {name}, {title}. {connection}. Speak in character and share your knowledge of this place."
+    }
     
     prompt = f"""Create a detailed persona for: 
 - Name: {name}
@@ -368,88 +533,63 @@ You MUST respond with ONLY this JSON (no other text):
     "era": "{era}",
     "region": "Where they were from",
     "avatar": "{avatar}",
+    "voice_gender": "{voice_gender}",
+    "voice_age": "young/middle/old",
     "relationship_to_landmark": "{connection}",
     "personality_traits": ["trait1", "trait2", "trait3"],
     "speaking_style": "How they would speak",
-    "voice_gender": "{voice_gender}",
-    "voice_age": "young/middle/old",
     "historical_facts": ["fact1", "fact2", "fact3"],
-    "system_prompt": "You are {name}, {title}. {connection}. You speak in a [STYLE] manner. Share your knowledge about {landmark_name}. Never break character."
+    "system_prompt": "You are {name}, {title}. {connection}. You speak in a [STYLE] manner. Share your knowledge about {landmark_name}. Never break character.",
+    "greeting": "{GREETING_FIELD_HINT}"
 }}
 
 Return ONLY the JSON. No other text."""
 
+    cache = get_cache("persona")
+    key = cache_key("brief", PERSONA_CACHE_VERSION, name, title, era, connection, landmark_name)
+    cached = cache.get(key)
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
     try:
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, generation_config=json_generation_config(PERSONA_SCHEMA))
         result_text = response.text.strip()
         
-        # Debug logging
-        print(f"[DEBUG] Full Persona Raw Response:\n{result_text[:600]}")
+        current_span().set(response_chars=len(result_text), **response_usage(response))
         
         # Parse JSON from response
         persona = clean_json_from_response(result_text)
         
         if persona and isinstance(persona, dict):
-            # Set defaults
-            persona.setdefault("name", name)
-            persona.setdefault("title", title)
-            persona.setdefault("era", era)
-            persona.setdefault("region", "Unknown")
-            persona.setdefault("avatar", avatar)
-            persona.setdefault("relationship_to_landmark", connection)
-            persona.setdefault("personality_traits", ["wise", "dignified"])
-            persona.setdefault("speaking_style", "formal")
-            persona.setdefault("voice_gender", voice_gender)
-            persona.setdefault("voice_age", "middle")
-            persona.setdefault("historical_facts", [])
-            persona.setdefault("system_prompt", f"You are {name}, {title}. {connection}.  Speak in character and share your knowledge.")
-            
+            persona = Persona.from_dict(persona, brief_defaults)
+            cache.set(key, persona)
             return persona
         
         # Return brief persona with defaults if parsing failed
-        return {
-            "name": name,
-            "title": title,
-            "era": era,
-            "region": "Unknown",
-            "avatar": avatar,
-            "relationship_to_landmark": connection,
-            "personality_traits": ["wise", "dignified"],
-            "speaking_style": "formal",
-            "voice_gender": voice_gender,
-            "voice_age": "middle",
-            "historical_facts": [],
-            "system_prompt": f"You are {name}, {title}. {connection}. Speak in character and share your knowledge of this place."
-        }
+        return Persona.from_dict(brief_defaults)
         
     except Exception as e:
+        report_model_error(e, model)
         print(f"[ERROR] generate_full_persona_from_brief exception: {str(e)}")
-        return {
-            "name": name,
-            "title":  title,
-            "era": era,
-            "region": "Unknown",
-            "avatar": avatar,
-            "relationship_to_landmark": connection,
-            "personality_traits": ["wise", "dignified"],
-            "speaking_style":  "formal",
-            "voice_gender": voice_gender,
-            "voice_age": "middle",
-            "historical_facts": [],
-            "system_prompt": f"You are {name}, {title}. {connection}. Speak in character."
-        }
+        return Persona.from_dict(brief_defaults)
 
 
+@traced()
 def generate_persona_response(
     persona_key: str,
     landmark_key: str,
     user_message: str,
-    chat_history: List[Dict],
+    chat_history: ChatHistory,
     model,
-    dynamic_persona: Optional[Dict] = None,
-    landmark_info: Optional[Dict] = None
+    dynamic_persona: Optional[Persona] = None,
+    landmark_info: Optional[Landmark] = None,
+    raise_errors: bool = False
 ) -> str:
-    """Generate response from historical persona."""
+    """
+    Generate response from historical persona.
+    Errors become an in-character apology unless raise_errors is set.
+    """
     
     # Get system context from dynamic persona
     if dynamic_persona: 
@@ -481,26 +621,41 @@ Keep responses conversational and engaging (2-4 paragraphs max).
     ]
     
     for msg in chat_history:
-        role = "user" if msg["role"] == "user" else "model"
-        conversation.append({"role":  role, "parts": [msg["content"]]})
+        role = "user" if msg.role == "user" else "model"
+        conversation.append({"role":  role, "parts": [msg.content]})
     
     try:
         chat = model.start_chat(history=conversation)
         response = chat.send_message(user_message)
+        current_span().set(history_turns=len(chat_history), response_chars=len(response.text), **response_usage(response))
         return response.text
     except Exception as e:
+        report_model_error(e, model)
         print(f"[ERROR] generate_persona_response exception: {str(e)}")
-        return f"*{persona_name}'s voice fades momentarily... * I apologize, could you repeat that? (Error: {str(e)})"
+        if raise_errors:
+            raise
+        return fading_reply(persona_name, e)
+
+
+def fading_reply(persona_name: str, error: Exception) -> str:
+    """In-character apology shown when the model call fails."""
+    return f"*{persona_name}'s voice fades momentarily... * I apologize, could you repeat that? (Error: {str(error)})"
 
 
 def generate_greeting(
     persona_key: str,
     landmark_key: str,
     model,
-    dynamic_persona: Optional[Dict] = None,
-    landmark_info: Optional[Dict] = None
+    dynamic_persona: Optional[Persona] = None,
+    landmark_info: Optional[Landmark] = None
 ) -> str:
-    """Generate initial greeting from persona."""
+    """
+    Generate initial greeting from persona.
+    Uses the greeting written with the persona when there is one.
+    """
+    if dynamic_persona and dynamic_persona.greeting:
+        return dynamic_persona.greeting
+
     greeting_prompt = """A new visitor has just arrived at this historical site. 
 Give a warm, engaging greeting IN CHARACTER: 
 1. Introduce yourself (your name and title)
@@ -525,7 +680,7 @@ def get_suggested_questions(persona_key: str = None, landmark_key: str = None, d
     if dynamic_persona:
         return [
             "Why did you build this monument?",
-            "What was your life like? ",
+            "What was your life like?",
             "Tell me a secret about this place"
         ]
     
@@ -534,3 +689,65 @@ def get_suggested_questions(persona_key: str = None, landmark_key: str = None, d
         "What is special about this place?",
         "Share a story from your time"
     ]
+
+
+@traced()
+def generate_suggested_questions(persona: Persona, landmark_info: Landmark, model, count: int = SUGGESTION_COUNT) -> List[str]:
+    """
+    Questions a visitor would likely ask this narrator at this landmark.
+    Cached process-wide per (persona, landmark); generic questions are the fallback.
+    """
+    landmark_name = landmark_info.get("landmark_name", "this monument")
+    cache = get_cache("suggestions")
+    key = cache_key("questions", PERSONA_CACHE_VERSION, persona.name, persona.title, landmark_name, count)
+    cached = cache.get(key)
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    prompt = f"""A visitor at {landmark_name} ({landmark_info.get('location', 'Unknown')}) is talking with
+{persona.name}, {persona.title} ({persona.era}). {persona.relationship_to_landmark}
+
+Write the {count} questions a curious visitor would most likely ask {persona.name} about this place and their life.
+Each question must be specific to this person and monument, and at most 8 words.
+
+Respond with ONLY a JSON array of {count} strings."""
+
+    try:
+        response = model.generate_content(prompt, generation_config=json_generation_config(SUGGESTIONS_SCHEMA))
+        result_text = response.text.strip()
+        current_span().set(response_chars=len(result_text), **response_usage(response))
+        parsed = clean_json_from_response(result_text)
+        if parsed and isinstance(parsed, list):
+            questions = [str(q).strip() for q in parsed if str(q).strip()][:count]
+            if questions:
+                cache.set(key, questions)
+                return questions
+        print(f"[WARNING] Could not parse suggested questions")
+    except Exception as e:
+        report_model_error(e, model)
+        print(f"[ERROR] generate_suggested_questions exception: {str(e)}")
+    return get_suggested_questions(dynamic_persona=persona)[:count]
+
+
+@traced()
+def answer_suggested_question(question: str, persona: Persona, landmark_info: Landmark, model) -> str:
+    """
+    The narrator's reply to a suggested question at the start of a conversation.
+    Shared by every visitor through the cache; failures raise instead of being cached.
+    """
+    cache = get_cache("suggestions")
+    key = cache_key(
+        "answer", PERSONA_CACHE_VERSION, persona.name, persona.title,
+        landmark_info.get("landmark_name", ""), question
+    )
+    cached = cache.get(key)
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    text = generate_persona_response(
+        None, None, question, ChatHistory(), model, persona, landmark_info, raise_errors=True
+    )
+    cache.set(key, text)
+    return text
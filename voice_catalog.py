@@ -0,0 +1,258 @@
+"""
+Voice Catalog for TimeTraveler AI.
+Picks a narrator voice from the full Edge-TTS voice list instead of a handful
+of presets. The catalog is fetched ahead of time and saved to disk:
+
+    python voice_catalog.py            # refresh VOICE_CATALOG_FILE
+
+At load, voices are indexed by (locale, gender) and the best voice for every
+(accent, gender, age) is precomputed, so selecting a voice for a persona is a
+few dict lookups. Requests never fetch the list: a stale file is refreshed on
+a background thread, and a built-in list covers a missing file (which is
+only written by an explicit refresh).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import get_setting
+from models import VoiceSettings
+
+DEFAULT_CATALOG_FILE = "voice_catalog.json"
+# A catalog older than this is refreshed in the background
+CATALOG_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+# Accent -> locales to try, best first. Personas speak English, so English
+# accents are preferred; regions without one use their own language's voices.
+ACCENT_LOCALES = {
+    "indian": ("en-IN",),
+    "arabic": ("ar-SA", "ar-EG", "ar-AE"),
+    "egyptian": ("ar-EG", "ar-SA"),
+    "persian": ("fa-IR",),
+    "turkish": ("tr-TR",),
+    "british": ("en-GB",),
+    "irish": ("en-IE", "en-GB"),
+    "african": ("en-ZA", "en-NG", "en-KE"),
+    "east_asian": ("en-HK", "en-SG"),
+    "southeast_asian": ("en-SG", "en-PH"),
+    "australian": ("en-AU",),
+    "american": ("en-US",),
+}
+DEFAULT_ACCENT = "american"
+# Used when no other locale in an accent has a voice
+FALLBACK_LOCALES = ("en-GB", "en-US")
+
+# Words in a persona's region or era -> accent
+ACCENT_KEYWORDS = {
+    "indian": [
+        "india", "indian", "mughal", "delhi", "agra", "tamil", "bengal", "chola", "pandya",
+        "maurya", "gupta", "vijayanagara", "maratha", "rajput", "hindu", "madras", "kerala",
+    ],
+    "arabic": [
+        "arabia", "arab", "arabian", "abbasid", "umayyad", "caliphate", "mecca", "baghdad",
+        "damascus", "syria", "iraq", "jordan", "levant", "middle east", "andalus", "moorish",
+    ],
+    "egyptian": ["egypt", "egyptian", "pharaoh", "pharaonic", "ptolemaic", "cairo", "memphis", "thebes", "nubia"],
+    "persian": ["persia", "persian", "iran", "achaemenid", "sasanian", "safavid", "parthian", "isfahan"],
+    "turkish": ["ottoman", "turkey", "turkish", "anatolia", "constantinople", "istanbul", "seljuk", "byzantine"],
+    "british": [
+        "britain", "british", "england", "english", "scotland", "wales", "france", "french",
+        "italy", "italian", "rome", "roman", "greece", "greek", "europe", "european", "germany",
+        "spain", "medieval", "renaissance", "victorian", "tudor", "venice", "florence",
+    ],
+    "irish": ["ireland", "irish", "celtic", "gaelic"],
+    "african": [
+        "africa", "african", "mali", "ghana", "zulu", "ethiopia", "axum", "aksum",
+        "nigeria", "benin", "kenya", "zimbabwe", "swahili",
+    ],
+    "east_asian": ["china", "chinese", "ming", "qing", "tang", "han dynasty", "japan", "japanese", "korea", "mongol"],
+    "southeast_asian": ["khmer", "angkor", "cambodia", "siam", "thailand", "java", "majapahit", "philippines", "malaya"],
+    "australian": ["australia", "australian", "new zealand", "maori"],
+    "american": ["america", "american", "united states", "usa", "maya", "aztec", "inca", "mexico", "peru"],
+}
+
+# Age -> (rate, pitch offset in Hz) and the Edge voice personalities that suit it
+AGE_PROSODY = {
+    "young": ("-5%", 2),
+    "middle": ("-10%", -3),
+    "old": ("-20%", -6),
+}
+AGE_STYLES = {
+    "young": ("Lively", "Friendly", "Cheerful", "Passion"),
+    "middle": ("Confident", "Authoritative", "Reliable", "Warm"),
+    "old": ("Warm", "Authoritative", "Calm", "Considerate"),
+}
+
+# Shipped so the app works before the first refresh: (id, locale, gender)
+BUILTIN_VOICES = [
+    ("en-IN-PrabhatNeural", "en-IN", "male"), ("en-IN-NeerjaNeural", "en-IN", "female"),
+    ("ar-SA-HamedNeural", "ar-SA", "male"), ("ar-SA-ZariyahNeural", "ar-SA", "female"),
+    ("ar-EG-ShakirNeural", "ar-EG", "male"), ("ar-EG-SalmaNeural", "ar-EG", "female"),
+    ("fa-IR-FaridNeural", "fa-IR", "male"), ("fa-IR-DilaraNeural", "fa-IR", "female"),
+    ("tr-TR-AhmetNeural", "tr-TR", "male"), ("tr-TR-EmelNeural", "tr-TR", "female"),
+    ("en-GB-RyanNeural", "en-GB", "male"), ("en-GB-SoniaNeural", "en-GB", "female"),
+    ("en-GB-ThomasNeural", "en-GB", "male"), ("en-GB-LibbyNeural", "en-GB", "female"),
+    ("en-IE-ConnorNeural", "en-IE", "male"), ("en-IE-EmilyNeural", "en-IE", "female"),
+    ("en-ZA-LukeNeural", "en-ZA", "male"), ("en-ZA-LeahNeural", "en-ZA", "female"),
+    ("en-NG-AbeoNeural", "en-NG", "male"), ("en-NG-EzinneNeural", "en-NG", "female"),
+    ("en-HK-SamNeural", "en-HK", "male"), ("en-HK-YanNeural", "en-HK", "female"),
+    ("en-SG-WayneNeural", "en-SG", "male"), ("en-SG-LunaNeural", "en-SG", "female"),
+    ("en-AU-WilliamNeural", "en-AU", "male"), ("en-AU-NatashaNeural", "en-AU", "female"),
+    ("en-US-GuyNeural", "en-US", "male"), ("en-US-JennyNeural", "en-US", "female"),
+    # Tamil-script sentences (see speech_text)
+    ("ta-IN-ValluvarNeural", "ta-IN", "male"), ("ta-IN-PallaviNeural", "ta-IN", "female"),
+]
+
+_WORD = re.compile(r"[a-z]+")
+
+
+class VoiceCatalog:
+    """Voices indexed for constant-time selection."""
+
+    def __init__(self, voices: List[Dict], fetched: float = 0.0):
+        self.voices = voices
+        self.fetched = fetched
+        # (locale, gender) -> voices, in catalog order
+        self.by_locale_gender: Dict[Tuple[str, str], List[Dict]] = {}
+        for voice in voices:
+            key = (voice.get("locale", ""), voice.get("gender", "").lower())
+            self.by_locale_gender.setdefault(key, []).append(voice)
+        # (accent, gender, age) -> voice id
+        self.best: Dict[Tuple[str, str, str], str] = {
+            (accent, gender, age): self._pick(accent, gender, age)
+            for accent in ACCENT_LOCALES
+            for gender in ("male", "female")
+            for age in AGE_PROSODY
+        }
+
+    def _pick(self, accent: str, gender: str, age: str) -> str:
+        for locale in ACCENT_LOCALES[accent] + FALLBACK_LOCALES:
+            candidates = self.by_locale_gender.get((locale, gender))
+            if candidates:
+                styles = AGE_STYLES[age]
+                return max(candidates, key=lambda v: _style_score(v, styles))["id"]
+        return "en-US-JennyNeural" if gender == "female" else "en-US-GuyNeural"
+
+    def select(self, accent: str, gender: str, age: str) -> str:
+        return self.best.get((accent, gender, age)) or self.best[(DEFAULT_ACCENT, "male", "middle")]
+
+
+def _style_score(voice: Dict, styles: Tuple[str, ...]) -> int:
+    """Higher when the voice's personalities match the wanted ones (earlier wins)."""
+    tags = set(voice.get("styles") or [])
+    return sum(len(styles) - i for i, style in enumerate(styles) if style in tags)
+
+
+# Keyword -> accent, built once (multi-word keywords are matched as word pairs)
+_ACCENT_BY_WORD: Dict[str, str] = {
+    keyword: accent for accent, keywords in ACCENT_KEYWORDS.items() for keyword in keywords
+}
+
+
+def accent_for(*texts: str) -> str:
+    """The accent for a persona's region/era text, by word lookup."""
+    for text in texts:
+        words = _WORD.findall((text or "").lower())
+        for i, word in enumerate(words):
+            if i + 1 < len(words):
+                pair = _ACCENT_BY_WORD.get(f"{word} {words[i + 1]}")
+                if pair:
+                    return pair
+            accent = _ACCENT_BY_WORD.get(word)
+            if accent:
+                return accent
+    return DEFAULT_ACCENT
+
+
+def catalog_path() -> str:
+    return get_setting("VOICE_CATALOG_FILE", DEFAULT_CATALOG_FILE)
+
+
+def fetch_voices() -> List[Dict]:
+    """Download the Edge-TTS voice list (network; never call on the request path)."""
+    from tts_backends import get_tts_backend
+    return get_tts_backend("edge").list_voices()
+
+
+def refresh_catalog(path: str = None) -> VoiceCatalog:
+    """Fetch the voice list and write it to disk atomically."""
+    global _catalog
+    path = path or catalog_path()
+    voices = fetch_voices()
+    if not voices:
+        raise RuntimeError("Edge-TTS returned no voices")
+    fetched = time.time()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"fetched": fetched, "voices": voices}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    _catalog = VoiceCatalog(voices, fetched)
+    print(f"[INFO] Voice catalog refreshed: {len(voices)} voices -> {path}")
+    return _catalog
+
+
+def _load_catalog() -> VoiceCatalog:
+    try:
+        with open(catalog_path(), encoding="utf-8") as f:
+            data = json.load(f)
+        return VoiceCatalog(data["voices"], data.get("fetched", 0.0))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[WARNING] Could not read voice catalog: {e}")
+    # The built-in list counts as fresh: a missing file is not refreshed on the
+    # request path (run `python voice_catalog.py` to write one)
+    return VoiceCatalog([{"id": v, "locale": l, "gender": g} for v, l, g in BUILTIN_VOICES], time.time())
+
+
+def _refresh_in_background():
+    try:
+        refresh_catalog()
+    except Exception as e:
+        print(f"[WARNING] Voice catalog refresh failed: {e}")
+
+
+_catalog: Optional[VoiceCatalog] = None
+_lock = threading.Lock()
+
+
+def get_voice_catalog() -> VoiceCatalog:
+    """The loaded catalog; a stale one is refreshed on a background thread."""
+    global _catalog
+    with _lock:
+        if _catalog is None:
+            _catalog = _load_catalog()
+            if time.time() - _catalog.fetched > CATALOG_MAX_AGE_SECONDS:
+                threading.Thread(target=_refresh_in_background, daemon=True).start()
+        return _catalog
+
+
+def voice_for_locale(locale: str, gender: str) -> Optional[str]:
+    """First catalog voice for a locale and gender, if any."""
+    voices = get_voice_catalog().by_locale_gender.get((locale, (gender or "").lower()))
+    return voices[0]["id"] if voices else None
+
+
+def select_voice(persona: Dict) -> VoiceSettings:
+    """Voice settings for a persona from its region, era, gender and age."""
+    gender = (persona.get("voice_gender") or "male").lower()
+    gender = gender if gender in ("male", "female") else "male"
+    age = (persona.get("voice_age") or "middle").lower()
+    age = age if age in AGE_PROSODY else "middle"
+    accent = accent_for(persona.get("region", ""), persona.get("era", ""))
+
+    rate, pitch = AGE_PROSODY[age]
+    return VoiceSettings(
+        voice=get_voice_catalog().select(accent, gender, age),
+        rate=rate,
+        pitch=f"{pitch:+d}Hz",
+        gender=gender,
+    )
+
+
+if __name__ == "__main__":
+    refresh_catalog()
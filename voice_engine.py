@@ -1,62 +1,39 @@
 """
 Voice Engine for TimeTraveler AI.
-Uses Edge-TTS for character-appropriate voices.
+Uses Edge-TTS for character-appropriate voices by default; other engines
+plug in through tts_backends (selected with the TTS_BACKEND setting).
 """
 
-import asyncio
-import edge_tts
 import base64
 from io import BytesIO
 from typing import Optional, Dict
 import time
 
+from tts_backends import get_tts_backend, synthesize_speech
+from speech_text import normalize_speech_text
+from models import VoiceSettings
+from tracing import traced, current_span
+from metrics import track_inflight
+from shared_cache import get_cache
+from voice_catalog import select_voice
+from audio_stream import streaming_audio_enabled, start_speech_stream
+from audio_profiles import get_audio_profile, transcode, sniff_audio_mime
+
 
 # Voice presets based on characteristics
 VOICE_PRESETS = {
     # Indian voices
-    "indian_male_royal": {
-        "voice":  "en-IN-PrabhatNeural",
-        "rate": "-15%",
-        "pitch": "-10Hz"
-    },
-    "indian_male_old": {
-        "voice": "en-IN-PrabhatNeural",
-        "rate": "-20%",
-        "pitch": "-5Hz"
-    },
-    "indian_female":  {
-        "voice": "en-IN-NeerjaNeural",
-        "rate": "-10%",
-        "pitch": "+5Hz"
-    },
+    "indian_male_royal": VoiceSettings(voice="en-IN-PrabhatNeural", rate="-15%", pitch="-10Hz", gender="male"),
+    "indian_male_old": VoiceSettings(voice="en-IN-PrabhatNeural", rate="-20%", pitch="-5Hz", gender="male"),
+    "indian_female": VoiceSettings(voice="en-IN-NeerjaNeural", rate="-10%", pitch="+5Hz", gender="female"),
     # British/European voices
-    "british_male":  {
-        "voice": "en-GB-RyanNeural",
-        "rate":  "-5%",
-        "pitch": "-3Hz"
-    },
-    "british_female": {
-        "voice": "en-GB-SoniaNeural",
-        "rate": "-5%",
-        "pitch": "+2Hz"
-    },
+    "british_male": VoiceSettings(voice="en-GB-RyanNeural", rate="-5%", pitch="-3Hz", gender="male"),
+    "british_female": VoiceSettings(voice="en-GB-SoniaNeural", rate="-5%", pitch="+2Hz", gender="female"),
     # American voices (fallback)
-    "american_male": {
-        "voice": "en-US-GuyNeural",
-        "rate": "-10%",
-        "pitch": "-5Hz"
-    },
-    "american_female": {
-        "voice": "en-US-JennyNeural",
-        "rate": "-5%",
-        "pitch": "+3Hz"
-    },
+    "american_male": VoiceSettings(voice="en-US-GuyNeural", rate="-10%", pitch="-5Hz", gender="male"),
+    "american_female": VoiceSettings(voice="en-US-JennyNeural", rate="-5%", pitch="+3Hz", gender="female"),
     # Arabic/Middle Eastern style (using British as base)
-    "middle_eastern_male": {
-        "voice": "en-GB-RyanNeural",
-        "rate":  "-15%",
-        "pitch": "-8Hz"
-    },
+    "middle_eastern_male": VoiceSettings(voice="en-GB-RyanNeural", rate="-15%", pitch="-8Hz", gender="male"),
 }
 
 # Persona to voice mapping for preset personas
@@ -74,61 +51,31 @@ PERSONA_VOICE_MAP = {
 }
 
 
-def get_voice_settings_for_dynamic_persona(persona:  Dict) -> Dict:
+def get_voice_settings_for_dynamic_persona(persona:  Dict) -> VoiceSettings:
     """
     Generate voice settings based on dynamic persona characteristics.
+    Chooses from the full voice catalog by region, era, gender and age.
     """
-    region = persona.get("region", "").lower()
-    gender = persona.get("voice_gender", "male").lower()
-    age = persona.get("voice_age", "middle").lower()
-    
-    # Determine voice based on region and gender
-    if any(r in region for r in ["india", "mughal", "delhi", "agra", "tamil", "bengal"]):
-        if gender == "female":
-            return VOICE_PRESETS["indian_female"]
-        else: 
-            if age == "old":
-                return VOICE_PRESETS["indian_male_old"]
-            else:
-                return VOICE_PRESETS["indian_male_royal"]
-    
-    elif any(r in region for r in ["egypt", "persia", "arabia", "ottoman", "middle east"]):
-        if gender == "female":
-            return VOICE_PRESETS["british_female"]
-        else:
-            return VOICE_PRESETS["middle_eastern_male"]
-    
-    elif any(r in region for r in ["britain", "england", "france", "italy", "europe", "roman"]):
-        if gender == "female":
-            return VOICE_PRESETS["british_female"]
-        else:
-            return VOICE_PRESETS["british_male"]
-    
-    else: 
-        # Default fallback
-        if gender == "female":
-            return VOICE_PRESETS["american_female"]
-        else: 
-            return VOICE_PRESETS["american_male"]
+    return select_voice(persona)
 
 
-def generate_voice_settings_for_persona(persona: Dict) -> Dict:
+def generate_voice_settings_for_persona(persona: Dict) -> VoiceSettings:
     """Wrapper function for compatibility."""
     return get_voice_settings_for_dynamic_persona(persona)
 
 
+def clean_text_for_speech(text: str) -> str:
+    """The whole reply as it should be read (markdown stripped, eras and numbers spelled out)."""
+    return normalize_speech_text(text)
+
+
 async def _generate_speech_async(text: str, voice:  str, rate: str, pitch: str) -> Optional[bytes]:
-    """Generate speech asynchronously using Edge-TTS."""
+    """Generate speech asynchronously using Edge-TTS (text is already speech-ready)."""
+    import edge_tts
+
     try:
-        # Clean text for TTS
-        clean_text = text.replace("*", "").replace("_", "").replace("#", "")
-        clean_text = clean_text.replace("**", "").replace("__", "")
-        
-        # Limit length
-        if len(clean_text) > 2000:
-            clean_text = clean_text[:2000] + "..."
-        
-        if not clean_text. strip():
+        clean_text = text.strip()
+        if not clean_text:
             return None
         
         communicate = edge_tts.Communicate(
@@ -152,27 +99,43 @@ async def _generate_speech_async(text: str, voice:  str, rate: str, pitch: str)
         return None
 
 
-def generate_speech(text: str, voice_settings: Dict) -> Optional[str]:
+@traced()
+def generate_speech(text: str, voice_settings: Dict, profile: Optional[str] = None) -> Optional[str]:
     """
-    Generate speech and return base64 encoded audio. 
+    Generate speech with the configured TTS backend and return base64 encoded audio.
+    Clips are shared through the audio cache, so a repeated line is synthesized once.
+    A data-saving profile (see audio_profiles) transcodes the clip and caches that too.
     """
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        backend = get_tts_backend()
+        cache = get_cache("audio")
+        key = backend.audio_cache_key(text, voice_settings)
+        audio_profile = get_audio_profile(profile)
+        profile_key = _profile_cache_key(key, audio_profile)
+        cached = cache.get(profile_key)
+        current_span().set(backend=backend.name, chars=len(text), cache_hit=cached is not None,
+                           profile=audio_profile.name if audio_profile else "standard")
+        if cached is not None:
+            return cached
         
-        audio_bytes = loop.run_until_complete(
-            _generate_speech_async(
-                text,
-                voice_settings. get("voice", "en-US-GuyNeural"),
-                voice_settings.get("rate", "-10%"),
-                voice_settings.get("pitch", "-5Hz")
-            )
-        )
+        source_b64 = cache.get(key) if audio_profile else None
+        if source_b64:
+            audio_bytes = base64.b64decode(source_b64)
+        else:
+            with track_inflight("tts"):
+                audio_bytes = synthesize_speech(backend, text, voice_settings)
+            if audio_bytes:
+                cache.set(key, base64.b64encode(audio_bytes).decode())
         
-        loop.close()
+        if audio_bytes and audio_profile:
+            audio_bytes = transcode(audio_bytes, audio_profile)
+        current_span().set(bytes=len(audio_bytes or b""))
         
         if audio_bytes: 
-            return base64.b64encode(audio_bytes).decode()
+            audio_b64 = base64.b64encode(audio_bytes).decode()
+            if audio_profile:
+                cache.set(profile_key, audio_b64)
+            return audio_b64
         return None
         
     except Exception as e:
@@ -180,33 +143,68 @@ def generate_speech(text: str, voice_settings: Dict) -> Optional[str]:
         return None
 
 
-def generate_persona_speech(text: str, persona_key: str, voice_settings: Optional[Dict] = None) -> Optional[str]:
+def _profile_cache_key(key: str, audio_profile) -> str:
+    """Audio cache key of a clip in a delivery profile (the source clip for None)."""
+    return f"{key}|{audio_profile.name}" if audio_profile else key
+
+
+def get_audio_mime() -> str:
+    """MIME type of the audio produced by the configured TTS backend."""
+    return get_tts_backend().capabilities()["mime_type"]
+
+
+def resolve_voice_settings(persona_key: str, voice_settings: Optional[VoiceSettings] = None) -> VoiceSettings:
+    """Use provided voice_settings or look up from preset mapping."""
+    if voice_settings:
+        return voice_settings
+    if persona_key in PERSONA_VOICE_MAP:
+        preset_name = PERSONA_VOICE_MAP[persona_key]
+        return VOICE_PRESETS.get(preset_name, VOICE_PRESETS["american_male"])
+    return VOICE_PRESETS["american_male"]
+
+
+def generate_persona_speech(text: str, persona_key: str, voice_settings: Optional[Dict] = None,
+                            profile: Optional[str] = None) -> Optional[str]:
     """
     Generate speech for a persona. 
     Uses provided voice_settings or looks up from preset mapping.
     """
-    if voice_settings:
-        settings = voice_settings
-    elif persona_key in PERSONA_VOICE_MAP:
-        preset_name = PERSONA_VOICE_MAP[persona_key]
-        settings = VOICE_PRESETS. get(preset_name, VOICE_PRESETS["american_male"])
-    else:
-        settings = VOICE_PRESETS["american_male"]
-    
-    return generate_speech(text, settings)
+    return generate_speech(text, resolve_voice_settings(persona_key, voice_settings), profile)
+
+
+def stream_persona_speech(text: str, persona_key: str, voice_settings: Optional[Dict] = None,
+                          profile: Optional[str] = None) -> Optional[str]:
+    """
+    Start streaming speech for a persona and return the stream token.
+    Returns None when streaming is disabled or unavailable; callers then
+    fall back to generate_persona_speech.
+    """
+    if not streaming_audio_enabled():
+        return None
+    voice_settings = resolve_voice_settings(persona_key, voice_settings)
+    if is_speech_cached(text, voice_settings, profile):
+        # A cached clip plays at once; streaming would only synthesize it again
+        return None
+    return start_speech_stream(text, voice_settings, get_audio_profile(profile))
+
+
+def is_speech_cached(text: str, voice_settings: Dict, profile: Optional[str] = None) -> bool:
+    key = get_tts_backend().audio_cache_key(text, voice_settings)
+    return get_cache("audio").get(_profile_cache_key(key, get_audio_profile(profile))) is not None
 
 
-def get_audio_player_html(b64_audio: str, autoplay: bool = True) -> str:
+def get_audio_player_html(b64_audio: str, autoplay: bool = True, mime_type: str = None) -> str:
     """Create HTML audio player from base64 audio."""
     if not b64_audio:
         return ""
     
     unique_id = f"audio_{int(time.time() * 1000)}"
     autoplay_attr = "autoplay" if autoplay else ""
+    mime_type = mime_type or sniff_audio_mime(base64.b64decode(b64_audio[:16]), get_audio_mime())
     
     return f"""
     <audio id="{unique_id}" {autoplay_attr} controls style="width: 100%; margin: 10px 0; border-radius: 25px;">
-        <source src="data:audio/mp3;base64,{b64_audio}" type="audio/mp3">
+        <source src="data:{mime_type};base64,{b64_audio}" type="{mime_type}">
     </audio>
     <script>
         (function() {{